@@ -0,0 +1,188 @@
+"""Run client benchmarks and save their results as JSON.
+
+Processing benchmarks run on a telemetry recording (`--replay`) or on synthetic data.
+Communication benchmarks run against a Golem (`--address`) or an in-process `FakeGolem`.
+
+    python -m clone_client.bench --output results.json
+    python -m clone_client.bench --suite processing --replay session.rec
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import logging
+from pathlib import Path
+import tempfile
+from typing import AsyncIterator, Optional
+
+from clone_client.bench import processing, rpc, synthetic
+from clone_client.bench.core import BenchReport, BenchResult
+from clone_client.client import Client
+from clone_client.controller.client import ControllerClient
+from clone_client.fake_golem import FakeGolem
+from clone_client.pose_estimation.pose_estimator import MagInterpolConfig
+from clone_client.proto.state_store_pb2 import SystemInfo, TelemetryData
+from clone_client.recording.recorder import TelemetryRecorder
+from clone_client.recording.replay import RecordingReader, ReplayStateStore
+from clone_client.state_store.client import StateStoreClient
+from clone_client.state_store.telemetry_arrays import TelemetryArraysDecoder
+
+L = logging.getLogger(__name__)
+
+# pressures sent by communication benchmarks, the same as in scripts/comm_benchmark.py
+BENCH_PRESSURE = -1.0
+
+
+def _report(report: BenchReport, result: BenchResult) -> None:
+    report.add(result)
+    print(result.summary())
+
+
+def _load_frames(args: argparse.Namespace) -> tuple[SystemInfo, list[TelemetryData]]:
+    if args.replay is None:
+        return synthetic.system_info(), synthetic.telemetry(args.frames)
+    with RecordingReader(args.replay) as reader:
+        frames = []
+        for data in reader.telemetry():
+            frames.append(data)
+            if len(frames) == args.frames:
+                break
+        info = reader.header.system_info
+    return (SystemInfo() if info is None else info), frames
+
+
+async def run_processing(args: argparse.Namespace, report: BenchReport) -> None:
+    """Benchmarks of processing of telemetry"""
+    info, frames = _load_frames(args)
+    L.info("Processing benchmarks on %d frames", len(frames))
+    repeat = args.repeat
+
+    _report(report, processing.bench_telemetry_parse(frames, repeat))
+    _report(
+        report,
+        processing.bench_telemetry_decode(
+            frames, lambda: TelemetryArraysDecoder.from_system_info(info), repeat
+        ),
+    )
+
+    config = MagInterpolConfig()
+    has_magmap = info.HasField("pose_estimation") and info.pose_estimation.HasField("maginterp")
+    if has_magmap:
+        _report(report, processing.bench_pose_estimator(info.pose_estimation, frames, config, repeat))
+        lut_config = MagInterpolConfig(backend="lut")
+        _report(report, processing.bench_pose_estimator(info.pose_estimation, frames, lut_config, repeat))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = args.replay
+        if path is None:
+            # synthetic frames are replayed through a recording, as real ones would be
+            path = Path(tmp_dir) / "synthetic.rec"
+            with TelemetryRecorder(path, info) as recorder:
+                for data in frames:
+                    recorder.write(data)
+        store = ReplayStateStore(path, config, speed=None)
+        try:
+            await store.get_system_info()
+            _report(report, processing.bench_telemetry_ext(store, frames, repeat))
+        finally:
+            store.close()
+
+    n_muscles = len(frames[0].sensor_data.pressures)
+    _report(report, processing.bench_pressures_encode(n_muscles, repeat=repeat))
+    _report(report, processing.bench_pressures_encode(n_muscles, encoder=False, repeat=repeat))
+
+    n_nodes = len(info.pose_estimation.maginterp.magmap) if has_magmap else 15
+    _report(report, processing.bench_gauss_calculator(n_nodes, repeat=repeat))
+    _report(report, processing.bench_gauss_calculator(n_nodes, per_node=True, repeat=repeat))
+    if importlib.util.find_spec("numba") is not None:
+        _report(report, processing.bench_gauss_calculator(n_nodes, use_numba=True, repeat=repeat))
+
+
+@contextlib.asynccontextmanager
+async def _clients(
+    address: Optional[str], rate: float
+) -> AsyncIterator[tuple[ControllerClient, StateStoreClient]]:
+    if address is not None:
+        async with Client(address=address) as client:
+            yield client.controller, client.state_store
+        return
+    async with FakeGolem(FakeGolem.Config(telemetry_rate=rate, seed=0)) as golem:
+        socket_address = golem.addresses[0]
+        controller = await ControllerClient.new(socket_address)
+        state_store = await StateStoreClient.new(socket_address, MagInterpolConfig())
+        await state_store.get_system_info()
+        try:
+            yield controller, state_store
+        finally:
+            await controller.channel.close()
+            await state_store.channel.close()
+
+
+async def run_rpc(args: argparse.Namespace, report: BenchReport) -> None:
+    """Benchmarks of communication"""
+    async with _clients(args.address, args.rate) as (controller, state_store):
+        pressures = [BENCH_PRESSURE] * state_store.number_of_muscles
+        samples = args.samples
+        _report(report, await rpc.bench_unary_latency("controller_ping", controller.ping, samples))
+        _report(report, await rpc.bench_unary_latency("state_store_ping", state_store.ping, samples))
+        _report(report, await rpc.bench_unary_latency("get_telemetry", state_store.get_telemetry, samples))
+        _report(
+            report,
+            await rpc.bench_unary_latency(
+                "set_pressures", lambda: controller.set_pressures(pressures), samples
+            ),
+        )
+        _report(report, await rpc.bench_stream_set_pressures(controller, pressures, args.rate, samples))
+        _report(report, await rpc.bench_subscribe_telemetry(state_store, samples))
+
+
+async def main(args: argparse.Namespace) -> BenchReport:
+    """Run selected suites"""
+    report = BenchReport(
+        params={
+            "suites": args.suite,
+            "replay": None if args.replay is None else str(args.replay),
+            "address": args.address,
+            "frames": args.frames,
+            "repeat": args.repeat,
+            "samples": args.samples,
+            "rate": args.rate,
+        }
+    )
+    if "processing" in args.suite:
+        await run_processing(args, report)
+    if "rpc" in args.suite:
+        await run_rpc(args, report)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--suite",
+        nargs="+",
+        choices=("processing", "rpc"),
+        default=["processing", "rpc"],
+        help="Suites to run",
+    )
+    parser.add_argument("--replay", type=Path, help="Telemetry recording to run processing benchmarks on")
+    parser.add_argument(
+        "-a",
+        "--address",
+        help="IP or UNIX-socket address of a Golem, an in-process fake one is used by default",
+    )
+    parser.add_argument("--frames", type=int, default=2000, help="Number of frames of processing benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="Rounds of processing benchmarks")
+    parser.add_argument("--samples", type=int, default=1000, help="Samples of communication benchmarks")
+    parser.add_argument("--rate", type=float, default=100.0, help="Rate of streams, Hz")
+    parser.add_argument("-o", "--output", type=Path, help="Path of JSON results")
+    cli_args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    bench_report = asyncio.run(main(cli_args))
+    if cli_args.output is not None:
+        bench_report.save(cli_args.output)
+        print(f"Results saved to {cli_args.output}")
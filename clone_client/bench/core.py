@@ -0,0 +1,163 @@
+"""Timing helpers and machine-readable results of benchmarks.
+
+Each benchmark produces a `BenchResult` with statistics of per-operation times (in seconds).
+Results of a run are collected in a `BenchReport` together with a description of the
+environment, and saved as JSON, so they can be compared across releases and machines.
+"""
+
+from dataclasses import asdict, dataclass, field
+from importlib import metadata
+import json
+import os
+from pathlib import Path
+import platform
+import sys
+import time
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
+
+REPORT_FORMAT_VERSION = 1
+
+
+@dataclass
+class Stats:
+    """Statistics of samples (seconds)"""
+
+    count: int
+    mean: float
+    std: float
+    min: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+    @classmethod
+    def from_samples(cls, samples: Iterable[float]) -> "Stats":
+        """Compute statistics of samples"""
+        values = np.fromiter(samples, dtype=np.double)
+        if not len(values):
+            raise ValueError("No samples to compute statistics of")
+        p50, p90, p99 = np.percentile(values, [50.0, 90.0, 99.0])
+        return cls(
+            count=len(values),
+            mean=float(values.mean()),
+            std=float(values.std()),
+            min=float(values.min()),
+            p50=float(p50),
+            p90=float(p90),
+            p99=float(p99),
+            max=float(values.max()),
+        )
+
+
+@dataclass
+class BenchResult:
+    """Result of a single benchmark.
+
+    `stats` are statistics of time per operation (seconds), e.g. per frame or per request,
+    `throughput` is the number of operations per second. `params` describe the benchmarked
+    case (sizes, rates), `extra` holds additional benchmark specific values."""
+
+    name: str
+    stats: Stats
+    throughput: float
+    params: dict[str, Any] = field(default_factory=dict)
+    extra: dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        """Single line, human readable summary"""
+        stats = self.stats
+        return (
+            f"{self.name:<36} p50 {stats.p50 * 1e6:10.1f} us  p99 {stats.p99 * 1e6:10.1f} us"
+            f"  max {stats.max * 1e6:10.1f} us  {self.throughput:12.1f} /s"
+        )
+
+
+def time_per_op(
+    func: Callable[[], Any], number: int = 100, repeat: int = 20, warmup: int = 1
+) -> tuple[Stats, float]:
+    """Time `func`, called `number` times in each of `repeat` rounds (after `warmup` rounds).
+    Returns statistics of per-call times of rounds and the throughput (calls per second)
+    of the fastest round, which is the least disturbed by the rest of the system."""
+    if number <= 0 or repeat <= 0:
+        raise ValueError("Number of calls and rounds must be greater than zero")
+    rounds = []
+    for idx in range(warmup + repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if idx >= warmup:
+            rounds.append(elapsed / number)
+    return Stats.from_samples(rounds), 1.0 / min(rounds)
+
+
+def _version(package: str) -> Optional[str]:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def environment() -> dict[str, Any]:
+    """Description of the machine and software the benchmarks run on"""
+    return {
+        "clone_client": _version("clone-client"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "scipy": _version("scipy"),
+        "grpcio": _version("grpcio"),
+        "protobuf": _version("protobuf"),
+        "numba": _version("numba"),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+@dataclass
+class BenchReport:
+    """Results of a benchmark run"""
+
+    results: list[BenchResult] = field(default_factory=list)
+    environment: dict[str, Any] = field(default_factory=environment)
+    created: float = field(default_factory=time.time)  # UNIX time
+    params: dict[str, Any] = field(default_factory=dict)  # parameters of the whole run
+
+    def add(self, result: BenchResult) -> BenchResult:
+        """Add a result to the report"""
+        self.results.append(result)
+        return result
+
+    def to_dict(self) -> dict[str, Any]:
+        """Report as a JSON compatible dictionary"""
+        return {"format_version": REPORT_FORMAT_VERSION, **asdict(self)}
+
+    def save(self, path: str | Path) -> None:
+        """Save the report as JSON"""
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "BenchReport":
+        """Load a report saved with `save`"""
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("format_version") != REPORT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported benchmark report version {data.get('format_version')}")
+        return cls(
+            results=[
+                BenchResult(
+                    name=result["name"],
+                    stats=Stats(**result["stats"]),
+                    throughput=result["throughput"],
+                    params=result["params"],
+                    extra=result["extra"],
+                )
+                for result in data["results"]
+            ],
+            environment=data["environment"],
+            created=data["created"],
+            params=data["params"],
+        )
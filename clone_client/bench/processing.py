@@ -0,0 +1,207 @@
+"""Benchmarks of client-side processing of telemetry, run on recorded or synthetic frames.
+
+Frames are processed in order, in rounds over all given frames, with state (filters,
+velocity history) reset before each round, so stateful processing sees a realistic stream.
+Reported times are per frame.
+"""
+
+import time
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from clone_client.bench import synthetic
+from clone_client.bench.core import BenchResult, Stats, time_per_op
+from clone_client.controller.encoding import PressuresEncoder
+from clone_client.magnet import GaussCalculator, GaussCalculatorBank
+from clone_client.pose_estimation.pose_estimator import (
+    MagInterpolConfig,
+    pose_estimator_from_config,
+)
+from clone_client.proto.controller_pb2 import SetPressuresMessage
+from clone_client.proto.state_store_pb2 import (
+    PoseEstimationInfo,
+    TelemetryData,
+    TelemetryDataResponse,
+)
+from clone_client.state_store.client import StateStoreClient
+from clone_client.state_store.telemetry_arrays import TelemetryArraysDecoder
+
+
+def time_per_frame(
+    setup: Callable[[], Callable[[TelemetryData], object]],
+    frames: Sequence[TelemetryData],
+    repeat: int = 5,
+    warmup: int = 1,
+) -> tuple[Stats, float]:
+    """Time processing of `frames` in `repeat` rounds (after `warmup` rounds). `setup` is called
+    before each round and returns the function processing a single frame. Returns statistics
+    of per-frame times of rounds and the throughput (frames per second) of the fastest round."""
+    if not frames:
+        raise ValueError("No frames to process")
+    rounds = []
+    for idx in range(warmup + repeat):
+        process = setup()
+        start = time.perf_counter()
+        for data in frames:
+            process(data)
+        elapsed = time.perf_counter() - start
+        if idx >= warmup:
+            rounds.append(elapsed / len(frames))
+    return Stats.from_samples(rounds), 1.0 / min(rounds)
+
+
+def bench_telemetry_parse(frames: Sequence[TelemetryData], repeat: int = 5) -> BenchResult:
+    """Deserialization of telemetry responses, as received from the state store"""
+    payloads = [TelemetryDataResponse(data=data).SerializeToString() for data in frames]
+    stats, throughput = time_per_op(
+        lambda: [TelemetryDataResponse.FromString(payload) for payload in payloads], number=1, repeat=repeat
+    )
+    scale = len(payloads)
+    return BenchResult(
+        "telemetry_parse",
+        _scaled(stats, 1.0 / scale),
+        throughput * scale,
+        params={"frames": len(frames)},
+        extra={"bytes_per_frame": sum(map(len, payloads)) / scale},
+    )
+
+
+def bench_telemetry_decode(
+    frames: Sequence[TelemetryData], decoder: Callable[[], TelemetryArraysDecoder], repeat: int = 5
+) -> BenchResult:
+    """Decoding of `TelemetryData` into arrays (`TelemetryArraysDecoder`)"""
+    stats, throughput = time_per_frame(lambda: decoder().decode, frames, repeat)
+    return BenchResult("telemetry_decode", stats, throughput, params={"frames": len(frames)})
+
+
+def bench_telemetry_ext(
+    client: StateStoreClient, frames: Sequence[TelemetryData], repeat: int = 5
+) -> BenchResult:
+    """Wrapping telemetry into `TelemetryDataExt`, with pose estimated by `client`
+    (locally, when it has a magnetic pose estimator) and velocities"""
+
+    def setup() -> Callable[[TelemetryData], object]:
+        velocity_estimator = client.new_velocity_estimator()
+        if client._pose_estimator_maginterp is not None:  # pylint: disable=protected-access
+            client._pose_estimator_maginterp.reset_filter()  # pylint: disable=protected-access
+        return lambda data: client.telemetry_extend(data, velocity_estimator)
+
+    stats, throughput = time_per_frame(setup, frames, repeat)
+    return BenchResult(
+        "telemetry_ext",
+        stats,
+        throughput,
+        params={"frames": len(frames), "local_pose_estimation": client.pose_estimator_ready},
+    )
+
+
+def bench_pose_estimator(
+    info: PoseEstimationInfo,
+    frames: Sequence[TelemetryData],
+    config: MagInterpolConfig = MagInterpolConfig(),
+    repeat: int = 5,
+) -> BenchResult:
+    """Magnetic pose estimation (`PoseEstimatorMagInterpol` or `PoseEstimatorMagLUT`, depending
+    on `config`) of all joints of a frame"""
+    start = time.perf_counter()
+    estimator = pose_estimator_from_config(info, config)
+    build_time = time.perf_counter() - start
+
+    def setup() -> Callable[[TelemetryData], object]:
+        estimator.reset_filter()
+        return lambda data: estimator.get_rotations_stacked(
+            data.sensor_data.bfields, data.time_since_start.ToNanoseconds() / 1000_000_000.0
+        )
+
+    stats, throughput = time_per_frame(setup, frames, repeat)
+    return BenchResult(
+        f"pose_estimator_{config.backend}",
+        stats,
+        throughput,
+        params={
+            "frames": len(frames),
+            "joints": len(estimator.joint_names),
+            "backend": config.backend,
+            "neighbors": config.neighbors,
+            "filter": config.filter_type if config.filter_avg_use else None,
+        },
+        extra={"build_time": build_time},
+    )
+
+
+def bench_gauss_calculator(
+    n_nodes: int = 15,
+    n_frames: int = 1000,
+    use_numba: bool = False,
+    per_node: bool = False,
+    repeat: int = 5,
+    seed: Optional[int] = 0,
+) -> BenchResult:
+    """Conversion of raw GaussRider data of all nodes of a frame into B-fields,
+    by a `GaussCalculatorBank`, or by a `GaussCalculator` per node when `per_node`"""
+    rng = np.random.default_rng(seed)
+    config = GaussCalculator.Config(use_numba=use_numba)
+    calibrations = {node_id: synthetic.calibration(node_id) for node_id in range(n_nodes)}
+    data = rng.integers(-2000, 2000, (n_frames, n_nodes, 13)).astype(np.int16)
+    data[..., 12] = rng.integers(1000, 2000, (n_frames, n_nodes))
+    out = np.empty((1, n_nodes, 4, 3))
+
+    if per_node:
+        calculators = [GaussCalculator(calibrations[node_id], config) for node_id in range(n_nodes)]
+
+        def convert_frame() -> None:
+            for frame in data:
+                for calculator, values in zip(calculators, frame):
+                    calculator.calculate_bfield(values[np.newaxis])
+
+    else:
+        bank = GaussCalculatorBank(calibrations, config)
+
+        def convert_frame() -> None:
+            for frame in data[:, np.newaxis]:  # [1, nodes, 13] each
+                bank.calculate_bfield_into(out, frame)
+
+    stats, throughput = time_per_op(convert_frame, number=1, repeat=repeat)
+    return BenchResult(
+        "gauss_calculator_per_node" if per_node else "gauss_calculator",
+        _scaled(stats, 1.0 / n_frames),
+        throughput * n_frames,
+        params={"nodes": n_nodes, "frames": n_frames, "use_numba": use_numba},
+    )
+
+
+def bench_pressures_encode(
+    n_muscles: int = 60, n_frames: int = 1000, encoder: bool = True, repeat: int = 5, seed: Optional[int] = 0
+) -> BenchResult:
+    """Serialization of float32 vectors of pressures, as streamed by the controller client,
+    by `PressuresEncoder` or by building `SetPressuresMessage`s"""
+    frames = np.random.default_rng(seed).random((n_frames, n_muscles), dtype=np.float32)
+    encode = PressuresEncoder(n_muscles).encode if encoder else _encode_message
+
+    stats, throughput = time_per_op(
+        lambda: [encode(pressures) for pressures in frames], number=1, repeat=repeat
+    )
+    return BenchResult(
+        "pressures_encode" if encoder else "pressures_encode_message",
+        _scaled(stats, 1.0 / n_frames),
+        throughput * n_frames,
+        params={"muscles": n_muscles, "frames": n_frames},
+    )
+
+
+def _encode_message(pressures: np.ndarray) -> bytes:
+    return SetPressuresMessage(pressures=pressures).SerializeToString()
+
+
+def _scaled(stats: Stats, factor: float) -> Stats:
+    return Stats(
+        count=stats.count,
+        mean=stats.mean * factor,
+        std=stats.std * factor,
+        min=stats.min * factor,
+        p50=stats.p50 * factor,
+        p90=stats.p90 * factor,
+        p99=stats.p99 * factor,
+        max=stats.max * factor,
+    )
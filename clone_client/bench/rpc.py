@@ -0,0 +1,76 @@
+"""Benchmarks of communication with a Golem (or a `FakeGolem`).
+
+Latencies are measured end to end, from issuing a request to receiving its response,
+so they include serialization and the gRPC stack on both sides.
+"""
+
+from dataclasses import asdict
+import time
+from typing import AsyncIterable, Awaitable, Callable, Sequence
+
+from clone_client.bench.core import BenchResult, Stats
+from clone_client.controller.client import ControllerClient
+from clone_client.state_store.client import StateStoreClient
+from clone_client.utils import async_precise_interval
+
+
+async def bench_unary_latency(
+    name: str, call: Callable[[], Awaitable[object]], samples: int = 1000, warmup: int = 50
+) -> BenchResult:
+    """Latency of consecutive unary requests made with `call`"""
+    for _ in range(warmup):
+        await call()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(samples):
+        sent = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - start
+    return BenchResult(
+        f"unary_{name}", Stats.from_samples(latencies), samples / elapsed, params={"samples": samples}
+    )
+
+
+async def bench_stream_set_pressures(
+    controller: ControllerClient, pressures: Sequence[float], rate: float = 100.0, samples: int = 1000
+) -> BenchResult:
+    """Jitter of streaming pressures at `rate` Hz with `stream_set_pressures`.
+    Stats are of intervals between consecutive messages taken by the stream, `extra`
+    holds their deviation from the nominal interval."""
+    sent: list[float] = []
+
+    async def stream() -> AsyncIterable[Sequence[float]]:
+        tick = async_precise_interval(1.0 / rate)
+        for _ in range(samples):
+            await anext(tick)
+            sent.append(time.perf_counter())
+            yield pressures
+
+    await controller.stream_set_pressures(stream())
+    intervals = [later - earlier for earlier, later in zip(sent, sent[1:])]
+    stats = Stats.from_samples(intervals)
+    deviations = Stats.from_samples(abs(interval - 1.0 / rate) for interval in intervals)
+    return BenchResult(
+        "stream_set_pressures",
+        stats,
+        (len(sent) - 1) / (sent[-1] - sent[0]),
+        params={"rate": rate, "samples": samples, "muscles": len(pressures)},
+        extra={"jitter": asdict(deviations)},
+    )
+
+
+async def bench_subscribe_telemetry(client: StateStoreClient, samples: int = 1000) -> BenchResult:
+    """Intervals between telemetry frames received by a subscription"""
+    received = []
+    async for _ in client.subscribe_telemetry():
+        received.append(time.perf_counter())
+        if len(received) > samples:
+            break
+    intervals = [later - earlier for earlier, later in zip(received, received[1:])]
+    return BenchResult(
+        "subscribe_telemetry",
+        Stats.from_samples(intervals),
+        len(intervals) / (received[-1] - received[0]),
+        params={"samples": samples},
+    )
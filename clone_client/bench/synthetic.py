@@ -0,0 +1,123 @@
+"""Reproducible synthetic data of a system, used when no recording is given.
+
+Magnetic maps are generated from a smooth forward model (angles -> B-fields), and telemetry
+frames sweep joints through their ranges using the same model, so pose estimation works
+on them as it would on real data.
+"""
+
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from clone_client.fake_golem import (
+    GAUSS_RIDER_NODE_ID_START,
+    IMU_NODE_ID_START,
+    MUSCLES_PER_NODE,
+)
+from clone_client.magnet import CalibrationDataRaw
+from clone_client.proto.state_store_pb2 import (
+    PoseEstimationInfo,
+    SystemInfo,
+    TelemetryData,
+)
+
+ANGLE_RANGES = ((-10.0, 90.0), (-20.0, 20.0))  # degrees, of the first and the second axis
+
+
+def _bfields(angles: npt.NDArray[np.double], joint: int) -> npt.NDArray[np.double]:
+    """B-fields [..., 12] (teslas) of a joint at angles [..., 2] (degrees)"""
+    x = np.radians(angles[..., 0])[..., np.newaxis]
+    y = np.radians(angles[..., 1])[..., np.newaxis]
+    phase = np.arange(12) * 0.3 + joint
+    return 1e-3 * (np.sin(1.3 * x + phase) + np.cos(0.7 * y - phase) + 0.5 * x * y)
+
+
+def pose_estimation_info(n_joints: int = 15, points_per_axis: int = 20) -> PoseEstimationInfo:
+    """Magnetic map of `n_joints` two-axis joints, sampled on a regular grid"""
+    info = PoseEstimationInfo()
+    axis0 = np.linspace(*ANGLE_RANGES[0], points_per_axis)
+    axis1 = np.linspace(*ANGLE_RANGES[1], points_per_axis)
+    angles = np.stack(np.meshgrid(axis0, axis1, indexing="ij"), axis=-1).reshape(-1, 2)
+    for joint in range(n_joints):
+        entry = info.maginterp.magmap[f"joint_{joint}"]
+        entry.axis0name = "X"
+        entry.axis1name = "Z"
+        entry.gauss_rider_id = GAUSS_RIDER_NODE_ID_START + joint
+        for angle, bfield in zip(angles.tolist(), _bfields(angles, joint).tolist()):
+            point = entry.angle_bfield_points.add()
+            point.angles_rad.extend(angle)
+            point.bfields_teslas.extend(bfield)
+    return info
+
+
+def system_info(n_muscles: int = 60, n_joints: int = 15, points_per_axis: int = 20) -> SystemInfo:
+    """System info with muscles laid out as by `FakeGolem` and a magnetic map (see `pose_estimation_info`)"""
+    info = SystemInfo()
+    for idx in range(n_muscles):
+        muscle = info.muscles[f"muscle_{idx}"]
+        muscle.index = idx
+        muscle.node_id = idx // MUSCLES_PER_NODE
+        muscle.channel_id = idx % MUSCLES_PER_NODE
+    if n_joints:
+        info.pose_estimation.CopyFrom(pose_estimation_info(n_joints, points_per_axis))
+    return info
+
+
+def telemetry(
+    n_frames: int = 1000,
+    n_muscles: int = 60,
+    n_imu: int = 8,
+    n_joints: int = 15,
+    rate: float = 100.0,
+    seed: Optional[int] = 0,
+) -> list[TelemetryData]:
+    """Telemetry frames at `rate` Hz, with joints moving through their ranges"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_frames) / rate
+    phases = rng.uniform(0.0, 2.0 * np.pi, (n_joints, 2))
+    # [frames, joints, 2], each joint oscillating with its own phase
+    unit = 0.5 + 0.5 * np.sin(2.0 * np.pi * 0.5 * t[:, np.newaxis, np.newaxis] + phases)
+    low = np.array([low for low, _ in ANGLE_RANGES])
+    high = np.array([high for _, high in ANGLE_RANGES])
+    angles = low + unit * (high - low)
+    bfields = np.stack([_bfields(angles[:, joint], joint) for joint in range(n_joints)], axis=1).tolist()
+    pressures = rng.uniform(0.0, 1.0, (n_frames, n_muscles)).astype(np.float32).tolist()
+
+    frames = []
+    for idx in range(n_frames):
+        data = TelemetryData()
+        data.time_since_start.FromNanoseconds(int(round(t[idx] * 1000_000_000)))
+        sensor_data = data.sensor_data
+        sensor_data.pressures.extend(pressures[idx])
+        for node_id in range(IMU_NODE_ID_START, IMU_NODE_ID_START + n_imu):
+            sensor_data.imu.add(node_id=node_id, w=1.0, x=0.0, y=0.0, z=0.0)
+        for joint in range(n_joints):
+            node_id = GAUSS_RIDER_NODE_ID_START + joint
+            sensor = sensor_data.gauss_rider_data.add(node_id=node_id).sensor
+            for px in range(4):
+                sensor.pixels.add(x=100 * px, y=-100 * px, z=1000 + px)
+            sensor.temperature = 1500
+            sensor_data.bfields[node_id].bfield.extend(bfields[idx][joint])
+        frames.append(data)
+    return frames
+
+
+def calibration(seed: Optional[int] = 0) -> CalibrationDataRaw:
+    """Plausible raw calibration data of a GaussRider"""
+    rng = np.random.default_rng(seed)
+
+    def values(center: int, spread: int) -> npt.NDArray[np.int16]:
+        return (center + rng.integers(-spread, spread + 1, (4, 3))).astype(np.int16)
+
+    return CalibrationDataRaw(
+        offsets_0=values(0, 20),
+        Hval_P_T0=values(1000, 50),
+        Hval_N_T0=values(-1000, 50),
+        temperatures=np.arange(1000, 13000, 1000, dtype=np.int16).reshape(4, 3),
+        Hval_P_T1=values(1100, 50),
+        Hval_N_T1=values(-1100, 50),
+        offsets_1=values(10, 20),
+        Hval_O_P=values(500, 20),
+        Hval_O_N=values(-500, 20),
+    )
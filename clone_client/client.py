@@ -18,6 +18,7 @@ from clone_client.discovery import Discovery
 from clone_client.exceptions import ClientError
 from clone_client.hw_driver.client import HWDriverClient
 from clone_client.pose_estimation.pose_estimator import MagInterpolConfig
+from clone_client.pose_estimation.velocity_estimator import VelocityEstimator
 from clone_client.state_store.client import StateStoreClient
 
 LOGGER = logging.getLogger(__name__)
@@ -39,6 +40,7 @@ class Client:
         """Additional parameters for client"""
 
         maginterp_config: MagInterpolConfig = field(default_factory=MagInterpolConfig)
+        velocity_config: VelocityEstimator.Config = field(default_factory=VelocityEstimator.Config)
 
     def __init__(
         self,
@@ -101,6 +103,7 @@ class Client:
             self._state_store = await StateStoreClient.new(
                 await self._create_socket_str(CONFIG.communication.state_store_service),
                 self._config.maginterp_config,
+                self._config.velocity_config,
             )
         if Client.TunnelsUsed.HW_DRIVER in self.tunnels_used:
             self._hw_driver = await HWDriverClient.new(
@@ -120,6 +123,7 @@ class Client:
         if Client.TunnelsUsed.CONTROLLER in self.tunnels_used:
             await self.controller.channel.__aexit__(exc_type, value, traceback)
         if Client.TunnelsUsed.STATE in self.tunnels_used:
+            self.state_store.shutdown_pose_estimator_builder()
             await self.state_store.channel.__aexit__(exc_type, value, traceback)
         if Client.TunnelsUsed.HW_DRIVER in self.tunnels_used:
             await self.hw_driver.channel.__aexit__(exc_type, value, traceback)
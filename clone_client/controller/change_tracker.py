@@ -0,0 +1,149 @@
+"""Skipping of controller commands which do not change anything.
+
+Control loops usually send their whole command on every tick, even when only a few muscles
+or valves changed, or none at all. Trackers remember what was sent last and pass on only
+what differs, with a periodic full refresh so the Golem's state cannot stay stale.
+
+There is no request setting pressures of selected muscles only, so `PressureChangeTracker`
+skips whole vectors, which are sent when any of the pressures changed. Pinch valves and
+Hydra valves are controlled with maps of nodes, so `MapChangeTracker` keeps only the nodes
+whose control changed.
+
+    tracker = MapChangeTracker[PinchValveControl]()
+    await client.controller.stream_many_pinch_valve_control(tracker.async_filter(controls()))
+"""
+
+from time import monotonic
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Generic,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    TypeVar,
+)
+
+import numpy as np
+import numpy.typing as npt
+
+T = TypeVar("T")
+V = TypeVar("V")
+
+
+class _ChangeTracker:
+    """Common part of trackers, deciding when the full command is due again"""
+
+    def __init__(self, refresh_period: Optional[float]) -> None:
+        self.refresh_period = refresh_period
+        self._last_refresh: Optional[float] = None
+
+    def reset(self) -> None:
+        """Forget what was sent, the next command is passed on in full"""
+        self._last_refresh = None
+
+    def _refresh_due(self) -> bool:
+        now = monotonic()
+        if self._last_refresh is None or (
+            self.refresh_period is not None and now - self._last_refresh >= self.refresh_period
+        ):
+            self._last_refresh = now
+            return True
+        return False
+
+
+class PressureChangeTracker(_ChangeTracker):
+    """Decides which vectors of pressures need to be sent.
+
+    A vector is sent when any of its pressures differs by more than `epsilon` from the last
+    sent one, or when `refresh_period` seconds passed since the last full refresh
+    (None disables refreshing). `sent` and `skipped` count the vectors."""
+
+    def __init__(self, epsilon: float = 1e-3, refresh_period: Optional[float] = 1.0) -> None:
+        super().__init__(refresh_period)
+        self.epsilon = epsilon
+        self.sent = 0
+        self.skipped = 0
+        self._last: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        super().reset()
+        self._last = None
+
+    def should_send(self, pressures: npt.ArrayLike) -> bool:
+        """Whether `pressures` need to be sent, they are remembered as sent if so"""
+        values = np.asarray(pressures, dtype=np.float32)
+        changed = (
+            self._last is None
+            or values.shape != self._last.shape
+            or bool(np.any(np.abs(values - self._last) > self.epsilon))
+        )
+        if self._refresh_due() or changed:
+            if self._last is None or values.shape != self._last.shape:
+                self._last = values.copy()
+            else:
+                self._last[:] = values
+            self.sent += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def filter(self, stream: Iterable[V]) -> Iterator[V]:
+        """Pass on vectors of pressures of `stream` which need to be sent"""
+        for pressures in stream:
+            if self.should_send(pressures):  # type: ignore[arg-type]
+                yield pressures
+
+    async def async_filter(self, stream: AsyncIterable[V]) -> AsyncIterator[V]:
+        """Pass on vectors of pressures of `stream` which need to be sent"""
+        async for pressures in stream:
+            if self.should_send(pressures):  # type: ignore[arg-type]
+                yield pressures
+
+
+class MapChangeTracker(_ChangeTracker, Generic[T]):
+    """Reduces maps of node id -> control (e.g. `PinchValveControl`, `HydraControlMessage`)
+    to the nodes whose control differs from the last sent one.
+
+    All nodes are sent when `refresh_period` seconds passed since the last full refresh
+    (None disables refreshing). `sent` and `skipped` count the controls of nodes.
+    Controls are compared by equality and remembered by reference, so they must not be
+    modified in place after being passed to the tracker."""
+
+    def __init__(self, refresh_period: Optional[float] = 1.0) -> None:
+        super().__init__(refresh_period)
+        self.sent = 0
+        self.skipped = 0
+        self._last: dict[int, T] = {}
+
+    def reset(self) -> None:
+        super().reset()
+        self._last = {}
+
+    def changes(self, data: Mapping[int, T]) -> dict[int, T]:
+        """Controls of `data` which need to be sent, they are remembered as sent"""
+        if self._refresh_due():
+            changed = dict(data)
+        else:
+            changed = {
+                node_id: control for node_id, control in data.items() if self._last.get(node_id) != control
+            }
+        self._last.update(changed)
+        self.sent += len(changed)
+        self.skipped += len(data) - len(changed)
+        return changed
+
+    def filter(self, stream: Iterable[Mapping[int, T]]) -> Iterator[dict[int, T]]:
+        """Pass on changes of maps of `stream`, skipping maps without any"""
+        for data in stream:
+            changed = self.changes(data)
+            if changed:
+                yield changed
+
+    async def async_filter(self, stream: AsyncIterable[Mapping[int, T]]) -> AsyncIterator[dict[int, T]]:
+        """Pass on changes of maps of `stream`, skipping maps without any"""
+        async for data in stream:
+            changed = self.changes(data)
+            if changed:
+                yield changed
@@ -5,8 +5,10 @@ from time import time
 from typing import AsyncIterable, Optional, Sequence
 
 from google.protobuf.empty_pb2 import Empty  # pylint: disable=E0611
+import numpy.typing as npt
 
 from clone_client.controller.config import ControllerClientConfig
+from clone_client.controller.encoding import PressuresEncoder, STREAM_SET_PRESSURES_PATH
 from clone_client.error_frames import handle_response
 from clone_client.exceptions import DesiredPressureNotAchievedError
 from clone_client.grpc_client import GRPCAsyncClient
@@ -46,6 +48,10 @@ class ControllerClient(GRPCAsyncClient):
         super().__init__("ControllerClient", socket_address)
         self.stub = ControllerGRPCStub(self.channel)
         self.config = config
+        # takes messages already serialized by `PressuresEncoder`
+        self._stream_set_pressures_encoded = self.channel.stream_unary(
+            STREAM_SET_PRESSURES_PATH, response_deserializer=ServerResponse.FromString
+        )
 
     @classmethod
     async def new(cls, socket_address: str) -> "ControllerClient":
@@ -123,6 +129,21 @@ class ControllerClient(GRPCAsyncClient):
         response: ServerResponse = await self.stub.StreamSetPressures(mapped_stream(), timeout=None)
         handle_response(response)
 
+    async def stream_set_pressures_array(self, stream: AsyncIterable[npt.ArrayLike]) -> None:
+        """Start streaming pressures control with vectors of pressures given as NumPy arrays
+        (preferably float32). Each vector is serialized with a single copy, without
+        building a `SetPressuresMessage`, what lowers the cost of streaming at high rates."""
+
+        async def encoded_stream() -> AsyncIterable[bytes]:
+            encoder = PressuresEncoder(0)
+            async for pressures in stream:
+                if len(pressures) != encoder.n_muscles:  # type: ignore[arg-type]
+                    encoder = PressuresEncoder(len(pressures))  # type: ignore[arg-type]
+                yield encoder.encode(pressures)
+
+        response: ServerResponse = await self._stream_set_pressures_encoded(encoded_stream(), timeout=None)
+        handle_response(response)
+
     async def wait_for_desired_pressure(self, timeout_ms: int = 10000) -> None:
         """Block the execution until current waterpump pressure is equal or more than desired pressure."""
         start = time()
@@ -152,22 +173,30 @@ class ControllerClient(GRPCAsyncClient):
         handle_response(response)
 
     @grpc_translated_async()
-    async def send_many_pinch_valve_control(self, data: dict[int, PinchValveControl]) -> None:
+    async def send_many_pinch_valve_control(
+        self, data: dict[int, PinchValveControl] | SendManyPinchValveControlMessage
+    ) -> None:
         """Send mass control to all pinch valves"""
-        message = SendManyPinchValveControlMessage(data=data)
+        if isinstance(data, SendManyPinchValveControlMessage):
+            message = data
+        else:
+            message = SendManyPinchValveControlMessage(data=data)
         response: ServerResponse = await self.stub.SendManyPinchValveControl(
             message, timeout=self.config.continuous_rpc_timeout
         )
         handle_response(response)
 
     async def stream_many_pinch_valve_control(
-        self, stream: AsyncIterable[dict[int, PinchValveControl]]
+        self, stream: AsyncIterable[dict[int, PinchValveControl] | SendManyPinchValveControlMessage]
     ) -> None:
         """Start streaming control messages to pinchvalves"""
 
         async def mapped_stream() -> AsyncIterable[SendManyPinchValveControlMessage]:
             async for data in stream:
-                yield SendManyPinchValveControlMessage(data=data)
+                if isinstance(data, SendManyPinchValveControlMessage):
+                    yield data
+                else:
+                    yield SendManyPinchValveControlMessage(data=data)
 
         response: ServerResponse = await self.stub.StreamManyPinchValveControl(mapped_stream(), timeout=None)
         handle_response(response)
@@ -211,20 +240,30 @@ class ControllerClient(GRPCAsyncClient):
         handle_response(response)
 
     @grpc_translated_async()
-    async def send_many_hydra_control(self, data: dict[int, HydraControlMessage]) -> None:
+    async def send_many_hydra_control(
+        self, data: dict[int, HydraControlMessage] | SendManyHydraControlMessage
+    ) -> None:
         """Send mass control to all Hydra valves"""
-        message = SendManyHydraControlMessage(data=data)
+        if isinstance(data, SendManyHydraControlMessage):
+            message = data
+        else:
+            message = SendManyHydraControlMessage(data=data)
         response: ServerResponse = await self.stub.SendManyHydraControl(
             message, timeout=self.config.continuous_rpc_timeout
         )
         handle_response(response)
 
-    async def stream_many_hydra_control(self, stream: AsyncIterable[dict[int, HydraControlMessage]]) -> None:
+    async def stream_many_hydra_control(
+        self, stream: AsyncIterable[dict[int, HydraControlMessage] | SendManyHydraControlMessage]
+    ) -> None:
         """Start streaming control messages to Hydra valves"""
 
         async def mapped_stream() -> AsyncIterable[SendManyHydraControlMessage]:
             async for data in stream:
-                yield SendManyHydraControlMessage(data=data)
+                if isinstance(data, SendManyHydraControlMessage):
+                    yield data
+                else:
+                    yield SendManyHydraControlMessage(data=data)
 
         response: ServerResponse = await self.stub.StreamManyHydraControl(mapped_stream(), timeout=None)
         handle_response(response)
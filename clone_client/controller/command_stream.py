@@ -0,0 +1,113 @@
+"""Bounded queues of commands for the controller's streaming requests.
+
+Streaming requests (`stream_set_pressures`, `stream_many_pinch_valve_control`, ...) take
+commands from an iterator as fast as gRPC can send them. When the network or the Golem
+stalls, commands produced by a control loop in the meantime pile up and are applied late.
+`CommandStream` decouples the control loop from the request: commands are pushed into
+a bounded queue and an overflow policy decides what happens to the stale ones.
+
+    stream = CommandStream(policy=OverflowPolicy.COALESCE)
+    request = asyncio.create_task(client.controller.stream_set_pressures(stream))
+    async for telemetry in client.subscribe_telemetry():
+        await stream.push(compute_pressures(telemetry))
+"""
+
+import asyncio
+from collections import deque
+from enum import auto, Enum
+from typing import AsyncIterator, Deque, Generic, TypeVar
+
+from clone_client.exceptions import CommandStreamClosedError
+
+T = TypeVar("T")
+
+
+class OverflowPolicy(Enum):
+    """What to do when a command is pushed into a full stream"""
+
+    DROP_OLDEST = auto()  # drop the oldest pending command
+    COALESCE = auto()  # replace the newest pending command, so the latest value wins
+    BLOCK = auto()  # wait until a pending command is sent
+
+
+class CommandStream(Generic[T]):
+    """Bounded queue of commands, iterated by a streaming request of the controller client.
+
+    Counters `dropped` and `coalesced` tell how many commands were discarded by the overflow
+    policy, every pushed command is eventually counted as sent, dropped, coalesced or pending.
+    Iteration ends after `close()`, once pending commands are sent.
+    """
+
+    def __init__(self, maxsize: int = 1, policy: OverflowPolicy = OverflowPolicy.COALESCE) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.pushed = 0
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._pending: Deque[T] = deque()
+        self._closed = False
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    @property
+    def pending(self) -> int:
+        """Number of commands waiting to be sent"""
+        return len(self._pending)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the stream was closed"""
+        return self._closed
+
+    def push_nowait(self, command: T) -> None:
+        """Push a command without waiting. Raises `asyncio.QueueFull` if the stream
+        is full and its policy is `BLOCK`."""
+        if self._closed:
+            raise CommandStreamClosedError()
+        if len(self._pending) >= self.maxsize:
+            if self.policy is OverflowPolicy.BLOCK:
+                raise asyncio.QueueFull()
+            if self.policy is OverflowPolicy.COALESCE:
+                self._pending[-1] = command
+                self.pushed += 1
+                self.coalesced += 1
+                return
+            self._pending.popleft()
+            self.dropped += 1
+
+        self._pending.append(command)
+        self.pushed += 1
+        self._not_empty.set()
+        if len(self._pending) >= self.maxsize:
+            self._not_full.clear()
+
+    async def push(self, command: T) -> None:
+        """Push a command, waiting for a free place if the stream is full and its policy is `BLOCK`"""
+        while self.policy is OverflowPolicy.BLOCK and len(self._pending) >= self.maxsize and not self._closed:
+            await self._not_full.wait()
+        self.push_nowait(command)
+
+    def close(self) -> None:
+        """Stop accepting commands, iteration ends once pending commands are sent"""
+        self._closed = True
+        self._not_empty.set()
+        self._not_full.set()
+
+    def __aiter__(self) -> AsyncIterator[T]:
+        return self
+
+    async def __anext__(self) -> T:
+        while not self._pending:
+            if self._closed:
+                raise StopAsyncIteration
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        command = self._pending.popleft()
+        self.sent += 1
+        self._not_full.set()
+        return command
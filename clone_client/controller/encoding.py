@@ -0,0 +1,201 @@
+"""Encoding of controller messages straight from NumPy arrays.
+
+Building a `SetPressuresMessage` converts the pressures element by element into a repeated
+field, which is a noticeable cost when streaming at hundreds of Hz. `SetPressuresMessage`
+holds a single packed `repeated float` field, so its wire format is a fixed header followed
+by the float32 values, and a whole vector of pressures is encoded with a single copy.
+
+Maps of controls of many valves (`SendManyHydraControlMessage`, `SendManyPinchValveControlMessage`)
+are built the same way: serialized once as a template with fixed-width slots for values,
+which are filled from arrays of all nodes at once and parsed into a message in a single call.
+Integers are written as 10-byte varints, valid for any value and re-encoded minimally
+when the message is sent.
+"""
+
+from typing import Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from clone_client.proto.controller_pb2 import DESCRIPTOR as CONTROLLER_DESCRIPTOR
+from clone_client.proto.controller_pb2 import SetPressuresMessage
+from clone_client.proto.hardware_driver_pb2 import (
+    HydraControlMessage,
+    PinchValveControl,
+    SendManyHydraControlMessage,
+    SendManyPinchValveControlMessage,
+)
+
+_WIRE_TYPE_VARINT = 0
+_WIRE_TYPE_LEN = 2
+_VARINT_WIDTH = 10  # any 64-bit value, negative int32 values are sign extended
+_NODE_ID_WIDTH = 5  # any uint32
+
+
+def method_path(service: str, method: str) -> str:
+    """gRPC path of `method` of a controller `service`, as used by generated stubs"""
+    service_desc = CONTROLLER_DESCRIPTOR.services_by_name[service]
+    return f"/{service_desc.full_name}/{service_desc.methods_by_name[method].name}"
+
+
+STREAM_SET_PRESSURES_PATH = method_path("ControllerGRPC", "StreamSetPressures")
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _tag(number: int, wire_type: int) -> bytes:
+    return _varint(number << 3 | wire_type)
+
+
+def _len_field(number: int, payload: bytes) -> bytes:
+    return _tag(number, _WIRE_TYPE_LEN) + _varint(len(payload)) + payload
+
+
+_VARINT_SHIFTS = 7 * np.arange(_VARINT_WIDTH, dtype=np.uint64)
+_VARINT_CONTINUATION = np.array([0x80] * (_VARINT_WIDTH - 1) + [0], dtype=np.uint8)
+
+
+def _fixed_varints(values: npt.ArrayLike, width: int) -> np.ndarray:
+    """Varints of `values` padded to `width` bytes each, shape [*values.shape, width]"""
+    groups = np.asarray(values, dtype=np.int64).view(np.uint64)[..., np.newaxis] >> _VARINT_SHIFTS[:width]
+    encoded = groups.astype(np.uint8)
+    encoded &= 0x7F
+    encoded |= _VARINT_CONTINUATION[_VARINT_WIDTH - width :]
+    return encoded
+
+
+class _MapTemplate:
+    """Serialized `map<uint32, V> data = 1` field with an entry per node.
+
+    All entries have the same size (node ids are fixed-width varints), so bytes of values
+    of all nodes are addressed as columns of a [nodes, entry size] array."""
+
+    def __init__(self, node_ids: Sequence[int], value: bytes) -> None:
+        ids = _fixed_varints(np.asarray(node_ids, dtype=np.int64), _NODE_ID_WIDTH)
+        entries = [self._entry(node_id.tobytes(), value) for node_id in ids]
+        entry_size = len(self._entry(bytes(_NODE_ID_WIDTH), value))
+        self._buffer = bytearray(b"".join(entries))
+        self.entries = np.frombuffer(self._buffer, dtype=np.uint8).reshape(len(entries), entry_size)
+        # the value is at the end of each entry
+        self.value_offset = entry_size - len(value)
+
+    @staticmethod
+    def _entry(node_id: bytes, value: bytes) -> bytes:
+        return _len_field(1, _tag(1, _WIRE_TYPE_VARINT) + node_id + _len_field(2, value))
+
+    def serialized(self) -> bytes:
+        return bytes(self._buffer)
+
+
+class HydraControlEncoder:
+    """Builds `SendManyHydraControlMessage`s controlling `n_channels` channels of each node
+    of `node_ids` from arrays of values of shape [nodes, channels].
+
+    `kind` is a field of `HydraControlMessage`'s `value`: "angles", "pressures",
+    "positions" or "speeds". Templates are built once per kind.
+
+    >>> encoder = HydraControlEncoder([1, 2, 3], n_channels=10)
+    >>> message = encoder.encode("positions", np.full((3, 10), HydraControlMessage.BOTH_CLOSED))
+    """
+
+    def __init__(self, node_ids: Sequence[int], n_channels: int) -> None:
+        self.node_ids = list(node_ids)
+        self.n_channels = n_channels
+        self._templates: dict[str, _MapTemplate] = {}
+
+    def _template(self, kind: str) -> _MapTemplate:
+        template = self._templates.get(kind)
+        if template is None:
+            fields = HydraControlMessage.DESCRIPTOR.oneofs_by_name["value"].fields
+            numbers = {desc.name: desc.number for desc in fields}
+            if kind not in numbers:
+                raise ValueError(f"Unknown kind of Hydra control {kind!r}, expected one of {list(numbers)}")
+            width = 4 if kind == "angles" else _VARINT_WIDTH
+            # each kind's message holds a single packed repeated field
+            values = _len_field(1, bytes(width * self.n_channels)) if self.n_channels else b""
+            template = _MapTemplate(self.node_ids, _len_field(numbers[kind], values))
+            self._templates[kind] = template
+        return template
+
+    def encode(self, kind: str, values: npt.ArrayLike) -> SendManyHydraControlMessage:
+        """Message setting `kind` of channels of all nodes to `values` [nodes, channels]"""
+        array = np.asarray(values)
+        expected = (len(self.node_ids), self.n_channels)
+        if array.shape != expected:
+            raise ValueError(f"Expected values of shape {expected}, got an array of shape {array.shape}")
+        template = self._template(kind)
+        if kind == "angles":
+            encoded = array.astype("<f4").view(np.uint8)
+        else:
+            encoded = _fixed_varints(array, _VARINT_WIDTH)
+        # values are at the end of entries
+        size = encoded.size // len(array) if len(array) else 0
+        template.entries[:, template.entries.shape[1] - size :] = encoded.reshape(len(array), size)
+        return SendManyHydraControlMessage.FromString(template.serialized())
+
+
+class PinchValveControlEncoder:
+    """Builds `SendManyPinchValveControlMessage`s controlling each node of `node_ids`
+    from arrays of modes and values of shape [nodes].
+
+    >>> encoder = PinchValveControlEncoder([1, 2, 3])
+    >>> message = encoder.encode(PinchValveControl.ControlMode.ANGLE, [10, 20, 30])
+    """
+
+    def __init__(self, node_ids: Sequence[int]) -> None:
+        self.node_ids = list(node_ids)
+        fields = PinchValveControl.DESCRIPTOR.fields_by_name
+        slot = bytes(_VARINT_WIDTH)
+        mode_tag = _tag(fields["mode"].number, _WIRE_TYPE_VARINT)
+        value_tag = _tag(fields["value"].number, _WIRE_TYPE_VARINT)
+        self._template = _MapTemplate(self.node_ids, mode_tag + slot + value_tag + slot)
+        mode_offset = self._template.value_offset + len(mode_tag)
+        value_offset = mode_offset + _VARINT_WIDTH + len(value_tag)
+        self._controls = np.zeros((len(self.node_ids), 2), dtype=np.int64)  # modes, values
+        # bytes of modes' and values' varints of an entry
+        self._varint_columns = np.r_[
+            mode_offset : mode_offset + _VARINT_WIDTH, value_offset : value_offset + _VARINT_WIDTH
+        ]
+
+    def encode(self, modes: npt.ArrayLike, values: npt.ArrayLike) -> SendManyPinchValveControlMessage:
+        """Message setting all nodes to `modes` (`PinchValveControl.ControlMode`, a single one
+        or one per node) and `values` [nodes]"""
+        values_array = np.asarray(values)
+        shape = (len(self._controls),)
+        if values_array.shape != shape:
+            raise ValueError(f"Expected values of shape {shape}, got an array of shape {values_array.shape}")
+        self._controls[:, 0] = modes
+        self._controls[:, 1] = values_array
+        varints = _fixed_varints(self._controls, _VARINT_WIDTH)
+        self._template.entries[:, self._varint_columns] = varints.reshape(shape[0], 2 * _VARINT_WIDTH)
+        return SendManyPinchValveControlMessage.FromString(self._template.serialized())
+
+
+class PressuresEncoder:
+    """Serializes vectors of pressures of `n_muscles` muscles into `SetPressuresMessage`s.
+
+    Pressures are written into one preallocated buffer behind the message header,
+    so encoding allocates only the returned bytes."""
+
+    def __init__(self, n_muscles: int) -> None:
+        self.n_muscles = n_muscles
+        field = SetPressuresMessage.DESCRIPTOR.fields_by_name["pressures"]
+        header = _tag(field.number, _WIRE_TYPE_LEN) + _varint(4 * n_muscles)
+        # proto3 omits empty repeated fields
+        self._buffer = bytearray(header if n_muscles else b"") + bytearray(4 * n_muscles)
+        self._pressures = np.frombuffer(self._buffer, dtype="<f4", offset=len(self._buffer) - 4 * n_muscles)
+
+    def encode(self, pressures: npt.ArrayLike) -> bytes:
+        """Serialized `SetPressuresMessage(pressures=pressures)`"""
+        values = np.asarray(pressures)
+        if values.shape != (self.n_muscles,):
+            raise ValueError(f"Expected {self.n_muscles} pressures, got an array of shape {values.shape}")
+        self._pressures[:] = values
+        return bytes(self._buffer)
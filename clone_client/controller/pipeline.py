@@ -0,0 +1,127 @@
+"""Pipelining of unary controller commands.
+
+Awaiting commands one by one costs a full round trip each. `CommandPipeline` issues them
+concurrently, with at most `max_in_flight` requests at a time, so a batch of independent
+commands (e.g. controls of many valves) completes in about one round trip.
+
+Commands with the same key (the node id for valve commands) are issued in order, each one
+after the previous one completed. Commands of all muscles (`set_impulses`, `set_pulses`,
+`set_pressures`) share a single key.
+
+    async with CommandPipeline(client.controller) as pipeline:
+        for node_id, angle in angles.items():
+            pipeline.send_pinch_valve_control(node_id, PinchValveControl.ControlMode.ANGLE, angle)
+"""
+
+import asyncio
+from types import TracebackType
+from typing import Awaitable, Callable, Hashable, Optional, Sequence, Type, TypeVar
+
+from clone_client.controller.client import ControllerClient
+from clone_client.exceptions import CommandPipelineError
+from clone_client.proto.controller_pb2 import Pulse
+from clone_client.proto.hardware_driver_pb2 import (
+    HydraControlMessage,
+    PinchValveCommands,
+    PinchValveControl,
+)
+
+T = TypeVar("T")
+
+MUSCLES_KEY = "muscles"
+
+
+class CommandPipeline:
+    """Issues commands of `controller` concurrently, keeping the order of commands with the same key.
+
+    Each command returns a task resolving to the command's result. Errors of commands
+    (translated and checked with `handle_response` by the controller client) are raised by
+    their tasks and, all together, by `flush()` as a `CommandPipelineError`."""
+
+    def __init__(self, controller: ControllerClient, max_in_flight: int = 8) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.controller = controller
+        self.max_in_flight = max_in_flight
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._last: dict[Hashable, "asyncio.Task[object]"] = {}
+        self._tasks: list["asyncio.Task[object]"] = []
+
+    @property
+    def pending(self) -> int:
+        """Number of commands not completed yet"""
+        return sum(not task.done() for task in self._tasks)
+
+    def submit(self, key: Optional[Hashable], call: Callable[[], Awaitable[T]]) -> "asyncio.Task[T]":
+        """Issue a command made by `call`, after previous commands with the same `key`
+        (None for commands which do not need to be ordered)"""
+        previous = None if key is None else self._last.get(key)
+        task = asyncio.ensure_future(self._run(previous, call))
+        if key is not None:
+            self._last[key] = task  # type: ignore[assignment]
+        self._tasks.append(task)  # type: ignore[arg-type]
+        return task
+
+    async def _run(self, previous: Optional["asyncio.Task[object]"], call: Callable[[], Awaitable[T]]) -> T:
+        if previous is not None:
+            # wait without raising the previous command's error, it is reported by its own task
+            await asyncio.wait([previous])
+        async with self._slots:
+            return await call()
+
+    async def flush(self) -> None:
+        """Wait for all issued commands. Raises `CommandPipelineError` with errors of failed ones."""
+        tasks, self._tasks = self._tasks, []
+        self._last.clear()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise CommandPipelineError(errors)
+
+    def set_impulses(self, impulses: Sequence[Optional[float]]) -> "asyncio.Task[None]":
+        """Pipelined `ControllerClient.set_impulses`"""
+        return self.submit(MUSCLES_KEY, lambda: self.controller.set_impulses(impulses))
+
+    def set_pulses(self, pulses: Sequence[Optional[Pulse]]) -> "asyncio.Task[None]":
+        """Pipelined `ControllerClient.set_pulses`"""
+        return self.submit(MUSCLES_KEY, lambda: self.controller.set_pulses(pulses))
+
+    def set_pressures(self, pressures: Sequence[float]) -> "asyncio.Task[None]":
+        """Pipelined `ControllerClient.set_pressures`"""
+        return self.submit(MUSCLES_KEY, lambda: self.controller.set_pressures(pressures))
+
+    def send_pinch_valve_control(
+        self, node_id: int, control_mode: PinchValveControl.ControlMode.ValueType, value: int
+    ) -> "asyncio.Task[None]":
+        """Pipelined `ControllerClient.send_pinch_valve_control`"""
+        return self.submit(
+            node_id, lambda: self.controller.send_pinch_valve_control(node_id, control_mode, value)
+        )
+
+    def send_pinch_valve_command(
+        self, node_id: int, command: PinchValveCommands.ValueType
+    ) -> "asyncio.Task[None]":
+        """Pipelined `ControllerClient.send_pinch_valve_command`"""
+        return self.submit(node_id, lambda: self.controller.send_pinch_valve_command(node_id, command))
+
+    def send_hydra_control(self, node_id: int, control_msg: HydraControlMessage) -> "asyncio.Task[None]":
+        """Pipelined `ControllerClient.send_hydra_control`"""
+        return self.submit(node_id, lambda: self.controller.send_hydra_control(node_id, control_msg))
+
+    async def __aenter__(self) -> "CommandPipeline":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            await self.flush()
+            return
+        # do not mask the original error with errors of commands
+        try:
+            await self.flush()
+        except CommandPipelineError:
+            pass
@@ -9,8 +9,10 @@ from time import time
 from typing import Iterable, Optional, Sequence
 
 from google.protobuf.empty_pb2 import Empty  # pylint: disable=E0611
+import numpy.typing as npt
 
 from clone_client.controller.config import ControllerClientConfig
+from clone_client.controller.encoding import PressuresEncoder, STREAM_SET_PRESSURES_PATH
 from clone_client.error_frames import handle_response
 from clone_client.exceptions import DesiredPressureNotAchievedError
 from clone_client.grpc_client import GRPCClient
@@ -50,6 +52,10 @@ class ControllerClient(GRPCClient):
         super().__init__("ControllerClient", socket_address)
         self.stub = ControllerGRPCStub(self.channel)
         self.config = config
+        # takes messages already serialized by `PressuresEncoder`
+        self._stream_set_pressures_encoded = self.channel.stream_unary(
+            STREAM_SET_PRESSURES_PATH, response_deserializer=ServerResponse.FromString
+        )
 
     @classmethod
     def new(cls, socket_address: str) -> "ControllerClient":
@@ -121,6 +127,21 @@ class ControllerClient(GRPCClient):
         response: ServerResponse = self.stub.StreamSetPressures(mapped_stream(), timeout=None)
         handle_response(response)
 
+    def stream_set_pressures_array(self, stream: Iterable[npt.ArrayLike]) -> None:
+        """Start streaming pressures control with vectors of pressures given as NumPy arrays
+        (preferably float32). Each vector is serialized with a single copy, without
+        building a `SetPressuresMessage`, what lowers the cost of streaming at high rates."""
+
+        def encoded_stream() -> Iterable[bytes]:
+            encoder = PressuresEncoder(0)
+            for pressures in stream:
+                if len(pressures) != encoder.n_muscles:  # type: ignore[arg-type]
+                    encoder = PressuresEncoder(len(pressures))  # type: ignore[arg-type]
+                yield encoder.encode(pressures)
+
+        response: ServerResponse = self._stream_set_pressures_encoded(encoded_stream(), timeout=None)
+        handle_response(response)
+
     def wait_for_desired_pressure(self, timeout_ms: int = 10000) -> None:
         """Block the execution until current waterpump pressure is equal or more than desired pressure."""
         start = time()
@@ -150,20 +171,30 @@ class ControllerClient(GRPCClient):
         handle_response(response)
 
     @grpc_translated()
-    def send_many_pinch_valve_control(self, data: dict[int, PinchValveControl]) -> None:
+    def send_many_pinch_valve_control(
+        self, data: dict[int, PinchValveControl] | SendManyPinchValveControlMessage
+    ) -> None:
         """Send mass control to all pinch valves"""
-        message = SendManyPinchValveControlMessage(data=data)
+        if isinstance(data, SendManyPinchValveControlMessage):
+            message = data
+        else:
+            message = SendManyPinchValveControlMessage(data=data)
         response: ServerResponse = self.stub.SendManyPinchValveControl(
             message, timeout=self.config.continuous_rpc_timeout
         )
         handle_response(response)
 
-    def stream_many_pinch_valve_control(self, stream: Iterable[dict[int, PinchValveControl]]) -> None:
+    def stream_many_pinch_valve_control(
+        self, stream: Iterable[dict[int, PinchValveControl] | SendManyPinchValveControlMessage]
+    ) -> None:
         """Start streaming control messages to pinchvalves"""
 
         def mapped_stream() -> Iterable[SendManyPinchValveControlMessage]:
             for data in stream:
-                yield SendManyPinchValveControlMessage(data=data)
+                if isinstance(data, SendManyPinchValveControlMessage):
+                    yield data
+                else:
+                    yield SendManyPinchValveControlMessage(data=data)
 
         response: ServerResponse = self.stub.StreamManyPinchValveControl(mapped_stream(), timeout=None)
         handle_response(response)
@@ -207,20 +238,30 @@ class ControllerClient(GRPCClient):
         handle_response(response)
 
     @grpc_translated()
-    def send_many_hydra_control(self, data: dict[int, HydraControlMessage]) -> None:
+    def send_many_hydra_control(
+        self, data: dict[int, HydraControlMessage] | SendManyHydraControlMessage
+    ) -> None:
         """Send mass control to all Hydra valves"""
-        message = SendManyHydraControlMessage(data=data)
+        if isinstance(data, SendManyHydraControlMessage):
+            message = data
+        else:
+            message = SendManyHydraControlMessage(data=data)
         response: ServerResponse = self.stub.SendManyHydraControl(
             message, timeout=self.config.continuous_rpc_timeout
         )
         handle_response(response)
 
-    def stream_many_hydra_control(self, stream: Iterable[dict[int, HydraControlMessage]]) -> None:
+    def stream_many_hydra_control(
+        self, stream: Iterable[dict[int, HydraControlMessage] | SendManyHydraControlMessage]
+    ) -> None:
         """Start streaming control messages to Hydra valves"""
 
         def mapped_stream() -> Iterable[SendManyHydraControlMessage]:
             for data in stream:
-                yield SendManyHydraControlMessage(data=data)
+                if isinstance(data, SendManyHydraControlMessage):
+                    yield data
+                else:
+                    yield SendManyHydraControlMessage(data=data)
 
         response: ServerResponse = self.stub.StreamManyHydraControl(mapped_stream(), timeout=None)
         handle_response(response)
@@ -0,0 +1,106 @@
+"""Bounded queues of commands for the sync controller's streaming requests.
+
+Thread-safe counterpart of `clone_client.controller.command_stream.CommandStream`:
+commands are pushed by a control loop while the streaming request iterates the stream
+in another thread.
+
+    stream = CommandStream(policy=OverflowPolicy.COALESCE)
+    request = threading.Thread(target=client.controller.stream_set_pressures, args=(stream,))
+    request.start()
+    for telemetry in client.subscribe_telemetry():
+        stream.push(compute_pressures(telemetry))
+"""
+
+from collections import deque
+import queue
+import threading
+from typing import Deque, Generic, Iterator, Optional, TypeVar
+
+from clone_client.controller.command_stream import OverflowPolicy
+from clone_client.exceptions import CommandStreamClosedError
+
+T = TypeVar("T")
+
+
+class CommandStream(Generic[T]):
+    """Bounded queue of commands, iterated by a streaming request of the controller client.
+
+    Counters `dropped` and `coalesced` tell how many commands were discarded by the overflow
+    policy, every pushed command is eventually counted as sent, dropped, coalesced or pending.
+    Iteration ends after `close()`, once pending commands are sent.
+    """
+
+    def __init__(self, maxsize: int = 1, policy: OverflowPolicy = OverflowPolicy.COALESCE) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.pushed = 0
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._pending: Deque[T] = deque()
+        self._closed = False
+        self._changed = threading.Condition()
+
+    @property
+    def pending(self) -> int:
+        """Number of commands waiting to be sent"""
+        return len(self._pending)
+
+    @property
+    def closed(self) -> bool:
+        """Whether the stream was closed"""
+        return self._closed
+
+    def push_nowait(self, command: T) -> None:
+        """Push a command without waiting. Raises `queue.Full` if the stream
+        is full and its policy is `BLOCK`."""
+        with self._changed:
+            self._push(command)
+
+    def push(self, command: T, timeout: Optional[float] = None) -> None:
+        """Push a command, waiting (at most `timeout` seconds) for a free place if the stream
+        is full and its policy is `BLOCK`. Raises `queue.Full` on timeout."""
+        with self._changed:
+            if self.policy is OverflowPolicy.BLOCK:
+                self._changed.wait_for(lambda: len(self._pending) < self.maxsize or self._closed, timeout)
+            self._push(command)
+
+    def _push(self, command: T) -> None:
+        if self._closed:
+            raise CommandStreamClosedError()
+        if len(self._pending) >= self.maxsize:
+            if self.policy is OverflowPolicy.BLOCK:
+                raise queue.Full()
+            if self.policy is OverflowPolicy.COALESCE:
+                self._pending[-1] = command
+                self.pushed += 1
+                self.coalesced += 1
+                return
+            self._pending.popleft()
+            self.dropped += 1
+
+        self._pending.append(command)
+        self.pushed += 1
+        self._changed.notify_all()
+
+    def close(self) -> None:
+        """Stop accepting commands, iteration ends once pending commands are sent"""
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    def __iter__(self) -> Iterator[T]:
+        return self
+
+    def __next__(self) -> T:
+        with self._changed:
+            self._changed.wait_for(lambda: self._pending or self._closed)
+            if not self._pending:
+                raise StopIteration
+
+            command = self._pending.popleft()
+            self.sent += 1
+            self._changed.notify_all()
+            return command
@@ -0,0 +1,147 @@
+"""Pipelining of unary commands of the sync controller client.
+
+Counterpart of `clone_client.controller.pipeline.CommandPipeline`, issuing commands
+from a pool of `max_in_flight` threads. A command is handed to the pool only when the previous
+command with the same key completes, so threads never wait for each other.
+
+    with CommandPipeline(client.controller) as pipeline:
+        for node_id, angle in angles.items():
+            pipeline.send_pinch_valve_control(node_id, PinchValveControl.ControlMode.ANGLE, angle)
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from types import TracebackType
+from typing import Callable, Hashable, Optional, Sequence, Type, TypeVar
+
+from clone_client.controller.pipeline import MUSCLES_KEY
+from clone_client.controller.sync.client import ControllerClient
+from clone_client.exceptions import CommandPipelineError
+from clone_client.proto.controller_pb2 import Pulse
+from clone_client.proto.hardware_driver_pb2 import (
+    HydraControlMessage,
+    PinchValveCommands,
+    PinchValveControl,
+)
+
+T = TypeVar("T")
+
+
+class CommandPipeline:
+    """Issues commands of `controller` concurrently, keeping the order of commands with the same key.
+
+    Each command returns a future resolving to the command's result. Errors of commands
+    (translated and checked with `handle_response` by the controller client) are raised by
+    their futures and, all together, by `flush()` as a `CommandPipelineError`."""
+
+    def __init__(self, controller: ControllerClient, max_in_flight: int = 8) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.controller = controller
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_in_flight, thread_name_prefix="CommandPipeline")
+        self._last: dict[Hashable, "Future[object]"] = {}
+        self._futures: list["Future[object]"] = []
+
+    @property
+    def pending(self) -> int:
+        """Number of commands not completed yet"""
+        return sum(not future.done() for future in self._futures)
+
+    def submit(self, key: Optional[Hashable], call: Callable[[], T]) -> "Future[T]":
+        """Issue a command made by `call`, after previous commands with the same `key`
+        (None for commands which do not need to be ordered)"""
+        previous = None if key is None else self._last.get(key)
+        future: "Future[T]" = Future()
+        if previous is None:
+            self._start(future, call)
+        else:
+            # called when the previous command completes (right away, when it already did),
+            # its error is not raised, it is reported by its own future
+            previous.add_done_callback(lambda _: self._start(future, call))
+        if key is not None:
+            self._last[key] = future  # type: ignore[assignment]
+        self._futures.append(future)  # type: ignore[arg-type]
+        return future
+
+    def _start(self, future: "Future[T]", call: Callable[[], T]) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            self._executor.submit(self._run, future, call)
+        except RuntimeError as err:  # the pipeline is closed
+            future.set_exception(err)
+
+    @staticmethod
+    def _run(future: "Future[T]", call: Callable[[], T]) -> None:
+        try:
+            result = call()
+        except BaseException as err:  # pylint: disable=broad-exception-caught
+            future.set_exception(err)
+        else:
+            future.set_result(result)
+
+    def flush(self) -> None:
+        """Wait for all issued commands. Raises `CommandPipelineError` with errors of failed ones."""
+        futures, self._futures = self._futures, []
+        self._last.clear()
+        wait(futures)
+        errors = [
+            error for error in (future.exception() for future in futures) if isinstance(error, Exception)
+        ]
+        if errors:
+            raise CommandPipelineError(errors)
+
+    def close(self) -> None:
+        """Wait for issued commands and stop threads of the pipeline"""
+        # commands waiting for previous ones are handed to the pool when those complete
+        wait(self._futures)
+        self._executor.shutdown(wait=True)
+
+    def set_impulses(self, impulses: Sequence[Optional[float]]) -> "Future[None]":
+        """Pipelined `ControllerClient.set_impulses`"""
+        return self.submit(MUSCLES_KEY, lambda: self.controller.set_impulses(impulses))
+
+    def set_pulses(self, pulses: Sequence[Optional[Pulse]]) -> "Future[None]":
+        """Pipelined `ControllerClient.set_pulses`"""
+        return self.submit(MUSCLES_KEY, lambda: self.controller.set_pulses(pulses))
+
+    def set_pressures(self, pressures: Sequence[float]) -> "Future[None]":
+        """Pipelined `ControllerClient.set_pressures`"""
+        return self.submit(MUSCLES_KEY, lambda: self.controller.set_pressures(pressures))
+
+    def send_pinch_valve_control(
+        self, node_id: int, control_mode: PinchValveControl.ControlMode.ValueType, value: int
+    ) -> "Future[None]":
+        """Pipelined `ControllerClient.send_pinch_valve_control`"""
+        return self.submit(
+            node_id, lambda: self.controller.send_pinch_valve_control(node_id, control_mode, value)
+        )
+
+    def send_pinch_valve_command(self, node_id: int, command: PinchValveCommands.ValueType) -> "Future[None]":
+        """Pipelined `ControllerClient.send_pinch_valve_command`"""
+        return self.submit(node_id, lambda: self.controller.send_pinch_valve_command(node_id, command))
+
+    def send_hydra_control(self, node_id: int, control_msg: HydraControlMessage) -> "Future[None]":
+        """Pipelined `ControllerClient.send_hydra_control`"""
+        return self.submit(node_id, lambda: self.controller.send_hydra_control(node_id, control_msg))
+
+    def __enter__(self) -> "CommandPipeline":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        try:
+            if exc_type is None:
+                self.flush()
+                return
+            # do not mask the original error with errors of commands
+            try:
+                self.flush()
+            except CommandPipelineError:
+                pass
+        finally:
+            self.close()
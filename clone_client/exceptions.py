@@ -24,3 +24,19 @@ class IncorrectMuscleIndexError(ClientError):
     def __init__(self, muscle_index: int) -> None:
         message = f"Incorrect muscle index: {muscle_index}"
         super().__init__(message)
+
+
+class CommandStreamClosedError(ClientError):
+    """Indicates that a command was pushed into a closed command stream."""
+
+    def __init__(self) -> None:
+        super().__init__("Cannot push commands into a closed command stream")
+
+
+class CommandPipelineError(ClientError):
+    """Indicates that some of the commands issued through a command pipeline failed."""
+
+    def __init__(self, errors: list[Exception]) -> None:
+        self.errors = errors
+        details = "; ".join(f"{type(error).__name__}: {error}" for error in errors)
+        super().__init__(f"{len(errors)} pipelined command(s) failed: {details}")
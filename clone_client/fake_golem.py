@@ -0,0 +1,654 @@
+"""Local stand-in for a Golem, serving its gRPC services with synthetic data.
+
+`FakeGolem` implements `ControllerGRPC`, `StateStoreReceiverGRPC` and `HardwareDriverGRPC`
+in a single `grpc.aio` server, so any of the clients can be run (and load tested) without
+hardware. Size of telemetry frames, telemetry rate, latency of responses and errors are
+configurable. Commands are accepted, counted and (for pressures) reflected in telemetry,
+but have no other effect.
+
+Can also be run as a standalone server, see `python -m clone_client.fake_golem --help`.
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from dataclasses import dataclass
+import ipaddress as ip
+import logging
+from pathlib import Path
+import random
+import time
+from types import TracebackType
+from typing import AsyncIterable, Iterable, Optional, Type
+
+from google.protobuf.empty_pb2 import Empty  # pylint: disable=E0611
+import grpc
+import grpc.aio
+
+from clone_client.config import CommunicationService, CONFIG
+from clone_client.error_frames import GolemError
+from clone_client.hw_driver.client import ProductId
+from clone_client.proto import (
+    controller_pb2_grpc,
+    hardware_driver_pb2_grpc,
+    state_store_pb2_grpc,
+)
+from clone_client.proto.controller_pb2 import (
+    ControllerRuntimeConfig,
+    WaterPumpInfo,
+    WaterPumpInfoResponse,
+    WaterPumpPressure,
+)
+from clone_client.proto.data_types_pb2 import (
+    ErrorInfo,
+    ErrorList,
+    ErrorType,
+    ServerResponse,
+)
+from clone_client.proto.hardware_driver_pb2 import (
+    DiscoveryMessage,
+    DiscoveryResponse,
+    GaussRiderSpecSettingsMessage,
+    GetNodesSettingsMessage,
+    GetNodesSettingsResponse,
+    HwDriverErrors,
+    IMUSpecSettingsMessage,
+    NodeMap,
+)
+from clone_client.proto.state_store_pb2 import (
+    SystemInfo,
+    SystemInfoResponse,
+    TelemetryData,
+    TelemetryDataResponse,
+)
+
+# pylint: disable=invalid-name  # servicer methods are named after RPCs
+
+L = logging.getLogger(__name__)
+
+BUS_NAME = "fake_bus"
+GAUSS_RIDER_NODE_ID_START = 100
+IMU_NODE_ID_START = 200
+MUSCLES_PER_NODE = 8
+
+
+class FakeGolem:
+    """gRPC server imitating a Golem"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    @dataclass
+    class Config:
+        """Behavior of the fake Golem"""
+
+        # pylint: disable=too-many-instance-attributes
+
+        n_muscles: int = 60
+        n_imu: int = 8
+        n_gauss_riders: int = 15
+        n_joints: int = 0  # joints with server estimated rotation in telemetry
+        telemetry_rate: float = 100.0  # Hz, of each telemetry subscription
+        # delay of every response (and of the first telemetry frame), seconds
+        latency: float = 0.0
+        # mean of an additional, exponentially distributed delay of responses, seconds
+        latency_jitter: float = 0.0
+        # probability of answering a request with an error in `ServerResponse` (for RPCs
+        # without one, e.g. `GetNodes`, requests are always successful)
+        error_rate: float = 0.0
+        # probability of failing a request with gRPC status UNAVAILABLE
+        rpc_error_rate: float = 0.0
+        seed: Optional[int] = None
+
+    def __init__(self, config: Optional[Config] = None) -> None:
+        self._config = config or FakeGolem.Config()
+        self._random = random.Random(self._config.seed)
+        # created by `start`, as `grpc.aio` servers are bound to the event loop they are created in
+        self._server: Optional[grpc.aio.Server] = None
+        self._listen_addresses: list[str] = []  # bound by `start`, TCP ones may have port 0
+        self._addresses: list[str] = []
+        self._started = False
+
+        self.requests: Counter[str] = Counter()  # number of requests (and streamed messages) per RPC
+        self.frames_sent = 0
+        self._pressures = [0.0] * self._config.n_muscles
+        self._pressures_version = 0
+        self._waterpump = WaterPumpInfo(desired_pressure=0.0, pressure=0.0, temperature=25.0)
+        self._start_time = time.monotonic()
+
+    @property
+    def config(self) -> Config:
+        """Configuration of the fake Golem, may be modified while it is running"""
+        return self._config
+
+    @property
+    def addresses(self) -> list[str]:
+        """Addresses the server listens on, usable as `socket_address` of clients (after `start`)"""
+        return self._addresses
+
+    @property
+    def pressures(self) -> list[float]:
+        """Last pressures set by a controller client"""
+        return self._pressures
+
+    def add_tcp_port(self, address: str = "127.0.0.1:0") -> None:
+        """Listen on a TCP `host:port` when started (port 0 picks a free one, see `addresses`)"""
+        self._listen_addresses.append(address)
+
+    def add_unix_socket(self, path: str | Path) -> str:
+        """Listen on a unix socket when started, returns its address"""
+        address = f"unix://{Path(path).absolute()}"
+        self._listen_addresses.append(address)
+        return address
+
+    def listen_like_golem(self, address: str) -> None:
+        """Listen where `Client(address=...)` connects to: on default ports of all services when
+        `address` is an IP address, otherwise on default unix sockets in the `address` directory"""
+        services: Iterable[CommunicationService] = (
+            CONFIG.communication.controller_service,
+            CONFIG.communication.state_store_service,
+            CONFIG.communication.hw_driver_service,
+        )
+        try:
+            ip.ip_address(address)
+            for service in services:
+                self.add_tcp_port(f"{address}:{service.default_port}")
+        except ValueError:
+            Path(address).mkdir(parents=True, exist_ok=True)
+            for service in services:
+                self.add_unix_socket(Path(address) / service.default_unix_sock_name)
+
+    async def start(self) -> None:
+        """Start serving in the running event loop, listens on a free local TCP port
+        when no address was added"""
+        if not self._listen_addresses:
+            self.add_tcp_port()
+        server = grpc.aio.server()
+        controller_pb2_grpc.add_ControllerGRPCServicer_to_server(_Controller(self), server)
+        state_store_pb2_grpc.add_StateStoreReceiverGRPCServicer_to_server(_StateStore(self), server)
+        hardware_driver_pb2_grpc.add_HardwareDriverGRPCServicer_to_server(_HardwareDriver(self), server)
+        addresses = []
+        for address in self._listen_addresses:
+            port = server.add_insecure_port(address)
+            if port == 0:
+                raise RuntimeError(f"Could not listen on {address}")
+            if address.startswith("unix:"):
+                addresses.append(address)
+            else:
+                addresses.append(f"{address.rsplit(':', 1)[0]}:{port}")
+        await server.start()
+        self._server = server
+        self._addresses = addresses
+        self._started = True
+        self._start_time = time.monotonic()
+        L.info("Fake Golem listening on %s", ", ".join(self._addresses))
+
+    async def stop(self, grace: Optional[float] = None) -> None:
+        """Stop serving, cancelling ongoing requests after `grace` seconds"""
+        if self._started:
+            assert self._server is not None
+            await self._server.stop(grace)
+            self._started = False
+
+    async def wait_for_termination(self) -> None:
+        """Serve until the server is stopped"""
+        if self._server is None:
+            raise RuntimeError("Fake Golem is not started")
+        await self._server.wait_for_termination()
+
+    async def __aenter__(self) -> "FakeGolem":
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.stop()
+
+    async def _handle(self, method: str, context: grpc.aio.ServicerContext) -> bool:
+        """Count and delay a request, possibly failing it. Returns whether an error
+        should be reported in the response."""
+        self.requests[method] += 1
+        config = self._config
+        delay = config.latency
+        if config.latency_jitter > 0.0:
+            delay += self._random.expovariate(1.0 / config.latency_jitter)
+        if delay > 0.0:
+            await asyncio.sleep(delay)
+        if config.rpc_error_rate > 0.0 and self._random.random() < config.rpc_error_rate:
+            await context.abort(grpc.StatusCode.UNAVAILABLE, f"Injected failure of {method}")
+        return config.error_rate > 0.0 and self._random.random() < config.error_rate
+
+    def _response(self, error: bool) -> ServerResponse:
+        if not error:
+            return ServerResponse(success=True)
+        return ServerResponse(success=False, error=self._error_info())
+
+    @staticmethod
+    def _error_info() -> ErrorInfo:
+        return ErrorInfo(
+            error=ErrorType.GOLEM_ERROR,
+            subtype=GolemError.ErrorKind.RUNTIME_ERROR,
+            info="Injected error",
+        )
+
+    def _set_pressures(self, pressures: Iterable[float]) -> None:
+        values = list(pressures)[: len(self._pressures)]
+        self._pressures[: len(values)] = values
+        self._pressures_version += 1
+
+    @property
+    def muscle_node_ids(self) -> list[int]:
+        """Ids of nodes controlling muscles, each one with up to `MUSCLES_PER_NODE` muscles"""
+        return list(range(-(-self._config.n_muscles // MUSCLES_PER_NODE)))
+
+    @property
+    def imu_node_ids(self) -> list[int]:
+        """Ids of IMU nodes"""
+        return list(range(IMU_NODE_ID_START, IMU_NODE_ID_START + self._config.n_imu))
+
+    @property
+    def gauss_rider_node_ids(self) -> list[int]:
+        """Ids of GaussRider nodes"""
+        return list(range(GAUSS_RIDER_NODE_ID_START, GAUSS_RIDER_NODE_ID_START + self._config.n_gauss_riders))
+
+    def system_info(self) -> SystemInfo:
+        """System info of the fake Golem"""
+        info = SystemInfo()
+        for idx in range(self._config.n_muscles):
+            muscle = info.muscles[f"muscle_{idx}"]
+            muscle.index = idx
+            muscle.node_id = idx // MUSCLES_PER_NODE
+            muscle.channel_id = idx % MUSCLES_PER_NODE
+        return info
+
+    def telemetry_frame(self) -> TelemetryData:
+        """Telemetry frame of the configured size, with the last set pressures"""
+        data = TelemetryData()
+        data.time_since_start.FromNanoseconds(int((time.monotonic() - self._start_time) * 1000_000_000))
+        sensor_data = data.sensor_data
+        sensor_data.pressures.extend(self._pressures)
+        for node_id in self.imu_node_ids:
+            sensor_data.imu.add(node_id=node_id, w=1.0, x=0.0, y=0.0, z=0.0)
+        for node_id in self.gauss_rider_node_ids:
+            sensor = sensor_data.gauss_rider_data.add(node_id=node_id).sensor
+            for px in range(4):
+                sensor.pixels.add(x=100 * px, y=-100 * px, z=1000 + px)
+            sensor.temperature = 1500
+            sensor_data.bfields[node_id].bfield.extend([1e-4 * (axis + 1) for axis in range(12)])
+        for idx in range(self._config.n_joints):
+            data.pose_estimation.pose_estimation[f"joint_{idx}"].w = 1.0
+        return data
+
+    async def telemetry_stream(
+        self, context: grpc.aio.ServicerContext
+    ) -> AsyncIterable[TelemetryDataResponse]:
+        """Stream of telemetry at the configured rate, frames are updated in place"""
+        error = await self._handle("SubscribeTelemetry", context)
+        response = TelemetryDataResponse(response_data=self._response(error))
+        response.data.CopyFrom(self.telemetry_frame())
+        if error:
+            yield response
+            return
+
+        pressures = response.data.sensor_data.pressures
+        time_since_start = response.data.time_since_start
+        pressures_version = self._pressures_version
+        next_frame = time.monotonic()
+        while True:
+            # frames missed by a slow subscriber are skipped, not sent in a burst
+            interval = 1.0 / self._config.telemetry_rate
+            next_frame += interval
+            now = time.monotonic()
+            if next_frame < now - interval:
+                next_frame = now
+            if next_frame > now:
+                await asyncio.sleep(next_frame - now)
+            if pressures_version != self._pressures_version:
+                pressures_version = self._pressures_version
+                pressures[:] = self._pressures
+            time_since_start.FromNanoseconds(int((time.monotonic() - self._start_time) * 1000_000_000))
+            self.frames_sent += 1
+            yield response
+
+    def _update_waterpump(self) -> None:
+        # pressure jumps to the desired one, so waiting for it does not take long
+        waterpump = self._waterpump
+        waterpump.pressure = waterpump.desired_pressure if waterpump.is_running else 0.0
+
+
+# pylint: disable=protected-access
+
+
+class _Controller(controller_pb2_grpc.ControllerGRPCServicer):
+    # pylint: disable=invalid-overridden-method  # servicer methods of `grpc.aio` are coroutines
+
+    def __init__(self, golem: FakeGolem) -> None:
+        self._golem = golem
+
+    async def _command(self, method: str, context: grpc.aio.ServicerContext) -> ServerResponse:
+        return self._golem._response(await self._golem._handle(method, context))
+
+    async def _stream(
+        self, method: str, requests: AsyncIterable[object], context: grpc.aio.ServicerContext
+    ) -> ServerResponse:
+        async for _ in requests:
+            self._golem.requests[f"{method}:message"] += 1
+        return await self._command(method, context)
+
+    async def SetImpulses(self, request, context):  # type: ignore
+        return await self._command("SetImpulses", context)
+
+    async def SetPulses(self, request, context):  # type: ignore
+        return await self._command("SetPulses", context)
+
+    async def SetPressures(self, request, context):  # type: ignore
+        response = await self._command("SetPressures", context)
+        if response.success:
+            self._golem._set_pressures(request.pressures)
+        return response
+
+    async def LooseMuscles(self, request, context):  # type: ignore
+        return await self._command("LooseMuscles", context)
+
+    async def LockMuscles(self, request, context):  # type: ignore
+        return await self._command("LockMuscles", context)
+
+    async def StreamSetPressures(self, request_iterator, context):  # type: ignore
+        async for request in request_iterator:
+            self._golem.requests["StreamSetPressures:message"] += 1
+            self._golem._set_pressures(request.pressures)
+        return await self._command("StreamSetPressures", context)
+
+    async def SendPinchValveControl(self, request, context):  # type: ignore
+        return await self._command("SendPinchValveControl", context)
+
+    async def SendManyPinchValveControl(self, request, context):  # type: ignore
+        return await self._command("SendManyPinchValveControl", context)
+
+    async def StreamManyPinchValveControl(self, request_iterator, context):  # type: ignore
+        return await self._stream("StreamManyPinchValveControl", request_iterator, context)
+
+    async def SendPinchValveCommand(self, request, context):  # type: ignore
+        return await self._command("SendPinchValveCommand", context)
+
+    async def SendManyPinchValveCommand(self, request, context):  # type: ignore
+        return await self._command("SendManyPinchValveCommand", context)
+
+    async def SendHydraControl(self, request, context):  # type: ignore
+        return await self._command("SendHydraControl", context)
+
+    async def SendManyHydraControl(self, request, context):  # type: ignore
+        return await self._command("SendManyHydraControl", context)
+
+    async def StreamManyHydraControl(self, request_iterator, context):  # type: ignore
+        return await self._stream("StreamManyHydraControl", request_iterator, context)
+
+    async def GetWaterPumpInfo(self, request, context):  # type: ignore
+        response = await self._command("GetWaterPumpInfo", context)
+        self._golem._update_waterpump()
+        return WaterPumpInfoResponse(info=self._golem._waterpump, response=response)
+
+    async def StartWaterPump(self, request, context):  # type: ignore
+        response = await self._command("StartWaterPump", context)
+        if response.success:
+            self._golem._waterpump.is_running = True
+            self._golem._waterpump.is_active = True
+        return response
+
+    async def StopWaterPump(self, request, context):  # type: ignore
+        response = await self._command("StopWaterPump", context)
+        if response.success:
+            self._golem._waterpump.is_running = False
+            self._golem._waterpump.is_active = False
+        return response
+
+    async def SetWaterPumpPressure(self, request: WaterPumpPressure, context):  # type: ignore
+        response = await self._command("SetWaterPumpPressure", context)
+        if response.success:
+            self._golem._waterpump.desired_pressure = request.pressure
+        return response
+
+    async def GetConfig(self, request, context):  # type: ignore
+        await self._golem._handle("GetConfig", context)
+        return ControllerRuntimeConfig(max_impulse_duration_ms=1000, use_pump=True, allow_missing_nodes=False)
+
+    async def GetNodes(self, request, context):  # type: ignore
+        await self._golem._handle("GetNodes", context)
+        return _node_map(self._golem)
+
+    async def Ping(self, request, context):  # type: ignore
+        await self._golem._handle("Ping", context)
+        return Empty()
+
+    async def GetErrors(self, request, context):  # type: ignore
+        await self._golem._handle("GetErrors", context)
+        return ErrorList(errors_list=ErrorList.ErrorList())
+
+
+class _StateStore(state_store_pb2_grpc.StateStoreReceiverGRPCServicer):
+    # pylint: disable=invalid-overridden-method  # servicer methods of `grpc.aio` are coroutines
+
+    def __init__(self, golem: FakeGolem) -> None:
+        self._golem = golem
+
+    async def SubscribeTelemetry(self, request, context):  # type: ignore
+        async for response in self._golem.telemetry_stream(context):
+            yield response
+
+    async def GetTelemetry(self, request, context):  # type: ignore
+        error = await self._golem._handle("GetTelemetry", context)
+        return TelemetryDataResponse(
+            data=self._golem.telemetry_frame(), response_data=self._golem._response(error)
+        )
+
+    async def GetSystemInfo(self, request, context):  # type: ignore
+        await self._golem._handle("GetSystemInfo", context)
+        return SystemInfoResponse(info=self._golem.system_info())
+
+    async def Ping(self, request, context):  # type: ignore
+        await self._golem._handle("Ping", context)
+        return Empty()
+
+    async def GetErrors(self, request, context):  # type: ignore
+        await self._golem._handle("GetErrors", context)
+        return ErrorList(errors_list=ErrorList.ErrorList())
+
+
+class _HardwareDriver(hardware_driver_pb2_grpc.HardwareDriverGRPCServicer):
+    # pylint: disable=invalid-overridden-method  # servicer methods of `grpc.aio` are coroutines
+
+    def __init__(self, golem: FakeGolem) -> None:
+        self._golem = golem
+
+    async def _command(self, method: str, context: grpc.aio.ServicerContext) -> ServerResponse:
+        return self._golem._response(await self._golem._handle(method, context))
+
+    async def _stream(
+        self, method: str, requests: AsyncIterable[object], context: grpc.aio.ServicerContext
+    ) -> ServerResponse:
+        async for _ in requests:
+            self._golem.requests[f"{method}:message"] += 1
+        return await self._command(method, context)
+
+    async def SendDirect(self, request, context):  # type: ignore
+        return await self._command("SendDirect", context)
+
+    async def SendManyDirect(self, request, context):  # type: ignore
+        return await self._command("SendManyDirect", context)
+
+    async def SendImpulse(self, request, context):  # type: ignore
+        return await self._command("SendImpulse", context)
+
+    async def SendManyImpulse(self, request, context):  # type: ignore
+        return await self._command("SendManyImpulse", context)
+
+    async def SendPinchValveControl(self, request, context):  # type: ignore
+        return await self._command("SendPinchValveControl", context)
+
+    async def SendManyPinchValveControl(self, request, context):  # type: ignore
+        return await self._command("SendManyPinchValveControl", context)
+
+    async def StreamManyPinchValveControl(self, request_iterator, context):  # type: ignore
+        return await self._stream("StreamManyPinchValveControl", request_iterator, context)
+
+    async def SendPinchValveCommand(self, request, context):  # type: ignore
+        return await self._command("SendPinchValveCommand", context)
+
+    async def SendManyPinchValveCommand(self, request, context):  # type: ignore
+        return await self._command("SendManyPinchValveCommand", context)
+
+    async def SendManyPressure(self, request, context):  # type: ignore
+        return await self._command("SendManyPressure", context)
+
+    async def StreamManyPressure(self, request_iterator, context):  # type: ignore
+        return await self._stream("StreamManyPressure", request_iterator, context)
+
+    async def GetNodes(self, request, context):  # type: ignore
+        await self._golem._handle("GetNodes", context)
+        return _node_map(self._golem)
+
+    async def PingNode(self, request, context):  # type: ignore
+        return await self._command("PingNode", context)
+
+    async def Discovery(self, request: DiscoveryMessage, context):  # type: ignore
+        error = await self._golem._handle("Discovery", context)
+        if error or request.bus_name != BUS_NAME:
+            return DiscoveryResponse(server_response=self._golem._response(True))
+        node_ids = {node.node_id for node in _node_map(self._golem).nodes[BUS_NAME].nodes}
+        if request.discovery_ranges:
+            node_ids = {
+                node_id
+                for node_id in node_ids
+                for node_range in request.discovery_ranges
+                if node_range.start_node <= node_id <= node_range.end_node
+            }
+        node_ids -= set(request.discovery_blacklist)
+        return DiscoveryResponse(server_response=self._golem._response(False), node_ids=sorted(node_ids))
+
+    async def GetNodesSettings(self, request: GetNodesSettingsMessage, context):  # type: ignore
+        await self._golem._handle("GetNodesSettings", context)
+        response = GetNodesSettingsResponse()
+        if request.bus_name != BUS_NAME:
+            return response
+        products = {node.node_id: node.product_id for node in _node_map(self._golem).nodes[BUS_NAME].nodes}
+        for node_id in request.node_ids:
+            wrapper = response.settings[node_id]
+            if node_id in products:
+                wrapper.settings.node_id = node_id
+                wrapper.settings.product_id = products[node_id]
+                wrapper.settings.device_random_id = node_id * 7919
+        return response
+
+    async def GetGaussRiderSpecSettings(self, request, context):  # type: ignore
+        if await self._golem._handle("GetGaussRiderSpecSettings", context):
+            return GaussRiderSpecSettingsMessage(error=FakeGolem._error_info())
+        response = GaussRiderSpecSettingsMessage()
+        for node_id in self._golem.gauss_rider_node_ids:
+            settings = response.success.spec_settings[node_id]
+            settings.offsets_0.extend([0] * 12)
+            settings.offsets_1.extend([10] * 12)
+            settings.Hval_P_T0.extend([1000] * 12)
+            settings.Hval_N_T0.extend([-1000] * 12)
+            settings.Hval_P_T1.extend([1100] * 12)
+            settings.Hval_N_T1.extend([-1100] * 12)
+            settings.temperatures.extend(range(1000, 13000, 1000))
+            settings.Hval_O_P.extend([500] * 12)
+            settings.Hval_O_N.extend([-500] * 12)
+        return response
+
+    async def GetIMUSpecSettings(self, request, context):  # type: ignore
+        if await self._golem._handle("GetIMUSpecSettings", context):
+            return IMUSpecSettingsMessage(error=FakeGolem._error_info())
+        response = IMUSpecSettingsMessage()
+        for node_id in self._golem.imu_node_ids:
+            response.success.spec_settings[node_id].trust_factors.acc = 1.0
+        return response
+
+    async def SetIMUSpecSettings(self, request, context):  # type: ignore
+        return await self._command("SetIMUSpecSettings", context)
+
+    async def GetErrors(self, request, context):  # type: ignore
+        await self._golem._handle("GetErrors", context)
+        return HwDriverErrors(hw_driver_errors=ErrorList.ErrorList())
+
+    async def PauseTelemetry(self, request, context):  # type: ignore
+        await self._golem._handle("PauseTelemetry", context)
+        return Empty()
+
+
+def _node_map(golem: FakeGolem) -> NodeMap:
+    node_map = NodeMap()
+    nodes = node_map.nodes[BUS_NAME].nodes
+    for node_id in golem.muscle_node_ids:
+        nodes.add(node_id=node_id, product_id=ProductId.Hydra8)
+    for node_id in golem.imu_node_ids:
+        nodes.add(node_id=node_id, product_id=ProductId.Imu)
+    for node_id in golem.gauss_rider_node_ids:
+        nodes.add(node_id=node_id, product_id=ProductId.GaussRider)
+    return node_map
+
+
+async def _serve(
+    config: FakeGolem.Config, addresses: list[str], tcp_addresses: list[str], duration: Optional[float]
+) -> None:
+    golem = FakeGolem(config)
+    for address in addresses:
+        golem.listen_like_golem(address)
+    for address in tcp_addresses:
+        golem.add_tcp_port(address)
+    async with golem:
+        if duration is None:
+            await golem.wait_for_termination()
+        else:
+            # cancelling `wait_for_termination` breaks stopping of the server
+            await asyncio.sleep(duration)
+    L.info("Requests served: %s, telemetry frames sent: %d", dict(golem.requests), golem.frames_sent)
+
+
+if __name__ == "__main__":
+    defaults = FakeGolem.Config()
+    parser = argparse.ArgumentParser(
+        description="Fake Golem serving synthetic data",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "-a",
+        "--address",
+        action="append",
+        help="IP address (services listen on their default ports) or a directory of unix sockets,"
+        " may be given multiple times",
+    )
+    parser.add_argument("--tcp", action="append", default=[], help="Additional host:port to listen on")
+    parser.add_argument("--muscles", type=int, default=defaults.n_muscles)
+    parser.add_argument("--imu", type=int, default=defaults.n_imu)
+    parser.add_argument("--gauss-riders", type=int, default=defaults.n_gauss_riders)
+    parser.add_argument("--joints", type=int, default=defaults.n_joints)
+    parser.add_argument("--rate", type=float, default=defaults.telemetry_rate, help="Telemetry rate, Hz")
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="Seconds")
+    parser.add_argument("--latency-jitter", type=float, default=defaults.latency_jitter, help="Seconds")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--rpc-error-rate", type=float, default=defaults.rpc_error_rate)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to serve, forever by default")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    golem_config = FakeGolem.Config(
+        n_muscles=args.muscles,
+        n_imu=args.imu,
+        n_gauss_riders=args.gauss_riders,
+        n_joints=args.joints,
+        telemetry_rate=args.rate,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        rpc_error_rate=args.rpc_error_rate,
+        seed=args.seed,
+    )
+    try:
+        asyncio.run(_serve(golem_config, args.address or ["127.0.0.1"], args.tcp, args.duration))
+    except KeyboardInterrupt:
+        pass
@@ -4,13 +4,17 @@
 from dataclasses import dataclass
 from enum import IntEnum
 import logging
+from pathlib import Path
 from typing import Annotated, Optional
 
 from google.protobuf.empty_pb2 import Empty
 
 from clone_client.error_frames import get_request_error, handle_response
+from clone_client.exceptions import ClientError
 from clone_client.grpc_client import GRPCAsyncClient
 from clone_client.hw_driver.config import HWDriverClientConfig
+from clone_client.magnet import CalibrationDataRaw
+from clone_client.magnet.calibration_store import CalibrationStore
 from clone_client.proto.data_types_pb2 import ErrorInfo, ServerResponse
 from clone_client.proto.hardware_driver_pb2 import (
     DiscoveryMessage,
@@ -160,6 +164,47 @@ class HWDriverClient(GRPCAsyncClient):
             case None:
                 raise ValueError("Got None instead of any expected value")
 
+    async def get_gauss_rider_calibration(
+        self, store_path: str | Path, timeout_us: int = 1000_000
+    ) -> CalibrationStore:
+        """Get raw calibration data of all GaussRiders, cached in a `CalibrationStore` file
+        at `store_path`. Calibration data are fetched from devices (see `get_gauss_rider_spec_settings`)
+        and stored only when a GaussRider was added or replaced since the store was saved,
+        which is checked with device random ids from `get_nodes_settings`."""
+        device_random_ids: dict[int, int] = {}
+        nodes = await self.get_nodes()
+        for bus_name, devices in nodes.items():
+            node_ids = [device.node_id for device in devices if device.product_id == ProductId.GaussRider]
+            if not node_ids:
+                continue
+            settings = await self.get_nodes_settings(bus_name, node_ids, timeout_us)
+            for node_id in node_ids:
+                node_settings = settings.get(node_id)
+                if node_settings is None:
+                    raise ClientError(f"Could not read settings of GaussRider {node_id} on bus {bus_name}")
+                device_random_ids[node_id] = node_settings.device_random_id
+
+        store = CalibrationStore.load(store_path)
+        if store is not None:
+            stale = store.stale_nodes(device_random_ids)
+            if not stale:
+                return store
+            L.info("GaussRiders %s changed, fetching calibration data", sorted(stale))
+
+        spec_settings = await self.get_gauss_rider_spec_settings()
+        missing = sorted(set(device_random_ids).difference(spec_settings))
+        if missing:
+            raise ClientError(f"Calibration data of GaussRiders {missing} were not received")
+        store = CalibrationStore.from_calibrations(
+            {
+                node_id: CalibrationDataRaw.from_gauss_spec_settings(spec_settings[node_id])
+                for node_id in device_random_ids
+            },
+            device_random_ids,
+        )
+        store.save(store_path)
+        return store
+
     @grpc_translated_async()
     async def get_imu_spec_settings(
         self,
@@ -10,14 +10,20 @@ which effectively by-passes calibration.
 This module is mainly for development purpouses and shortly it will be transfered into the Golem server.
 """
 
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, fields
+import functools
+from itertools import islice
 import json
 import logging
 from typing import (
     Annotated,
     Callable,
+    Iterable,
+    Iterator,
     Literal,
+    Mapping,
     no_type_check,
+    Optional,
     Sequence,
     TypeAlias,
     TypeVar,
@@ -26,8 +32,8 @@ from typing import (
 import numpy as np
 from numpy import typing as npt
 
-from clone_client.proto.hardware_driver_pb2 import GaussRiderSpecSettings
-from clone_client.proto.state_store_pb2 import GaussRiderRaw
+from clone_client.proto.hardware_driver_pb2 import GaussRiderSpecSettingsMessage
+from clone_client.proto.state_store_pb2 import GaussRiderRaw, SensorData, TelemetryData
 
 Numeric = TypeVar("Numeric", bound=np.number)
 Vec13: TypeAlias = np.ndarray[tuple[Literal[13]], np.dtype[Numeric]]
@@ -39,31 +45,125 @@ Matrix4x2: TypeAlias = np.ndarray[tuple[Literal[4], Literal[2]], np.dtype[Numeri
 L = logging.getLogger(__name__)
 
 
-def value_chain(*args):  # type: ignore
-    """Shamelessly stolen from `more-itertools` module"""
-    for value in args:
-        if isinstance(value, (str, bytes)):
-            yield value
-            continue
-        try:
-            yield from value
-        except TypeError:
-            yield value
+GAUSS_RIDER_VALUES = 13  # 4 pixels x 3 axes and temperature
+
+
+# repeated `gauss_rider_data` field, `SensorData` or `TelemetryData`
+GaussRiderFrame: TypeAlias = Iterable[GaussRiderRaw] | SensorData | TelemetryData
+
+
+def _append_gauss_rider_values(data: GaussRiderRaw, values: list[int]) -> None:
+    sensor = data.sensor
+    if len(sensor.pixels) != 4:
+        raise ValueError(
+            f"GaussRider data must consist of 4 pixels, node {data.node_id} has {len(sensor.pixels)}"
+        )
+    for px in sensor.pixels:
+        values += (px.x, px.y, px.z)
+    values.append(sensor.temperature)
+
+
+def _gauss_riders(frame: GaussRiderFrame) -> Iterable[GaussRiderRaw]:
+    if isinstance(frame, TelemetryData):
+        return frame.sensor_data.gauss_rider_data  # type: ignore[no-any-return]
+    if isinstance(frame, SensorData):
+        return frame.gauss_rider_data  # type: ignore[no-any-return]
+    return frame
+
+
+def _values_to_array(values: list[int]) -> npt.NDArray[Vec13[np.int16]]:
+    return np.array(values, dtype=np.int16).reshape((-1, GAUSS_RIDER_VALUES))
 
 
 def gauss_rider_rewrap(data: GaussRiderRaw) -> Vec13[np.int16]:
     """Rewrap a data point received from GaussRider telemetry into a numpy array"""
-    ret = value_chain([getattr(px, ax) for px in data.sensor.pixels for ax in "xyz"], data.sensor.temperature)
-    return np.array(list(ret), dtype=np.int16)  # type: ignore
+    return gauss_rider_rewrap_many([data])[0]
 
 
-def gauss_rider_rewrap_many(data: Sequence[GaussRiderRaw]) -> npt.NDArray[Vec13[np.int16]]:
+def gauss_rider_rewrap_many(data: Iterable[GaussRiderRaw]) -> npt.NDArray[Vec13[np.int16]]:
     """Rewrap data series received from GaussRider telemetry into a numpy array"""
-    ret = [
-        list(value_chain([getattr(px, ax) for px in gr.sensor.pixels for ax in "xyz"], gr.sensor.temperature))
-        for gr in data
-    ]
-    return np.array(ret, dtype=np.int16)  # type: ignore
+    values: list[int] = []
+    for gauss_rider in data:
+        _append_gauss_rider_values(gauss_rider, values)
+    return _values_to_array(values)
+
+
+class GaussRiderDecoder:
+    """Bulk decoder of raw GaussRider telemetry of many nodes into [frames, nodes, 13] int16 arrays.
+
+    Nodes are stored in ascending order of their ids. Data of nodes missing in a frame
+    are zeroed (and marked in `present` mask, when given), data of unknown nodes are skipped.
+    Frames are decoded in chunks, so arbitrarily long recordings can be processed as a stream.
+    """
+
+    def __init__(self, node_ids: Iterable[int]) -> None:
+        self._node_ids = sorted(set(node_ids))
+        self._columns = {node_id: col for col, node_id in enumerate(self._node_ids)}
+
+    @classmethod
+    def from_frame(cls, frame: GaussRiderFrame) -> "GaussRiderDecoder":
+        """Create a decoder of all nodes present in the frame"""
+        return cls(gauss_rider.node_id for gauss_rider in _gauss_riders(frame))
+
+    @property
+    def node_ids(self) -> list[int]:
+        """Ids of nodes in order of the second axis of decoded arrays"""
+        return list(self._node_ids)
+
+    def empty(self, frames: int) -> npt.NDArray[np.int16]:
+        """Allocate an output array for `frames` frames"""
+        return np.empty((frames, len(self._node_ids), GAUSS_RIDER_VALUES), dtype=np.int16)
+
+    def decode_into(
+        self,
+        frames: Iterable[GaussRiderFrame],
+        out: npt.NDArray[np.int16],
+        present: Optional[npt.NDArray[np.bool_]] = None,
+    ) -> int:
+        """Decode frames into a preallocated C-contiguous `out` array [frames, nodes, 13]
+        (see `empty`) and optionally mark decoded nodes in `present` [frames, nodes].
+        Returns the number of decoded frames, at most `len(out)` frames are consumed from `frames`."""
+        n_nodes = len(self._node_ids)
+        if out.shape[1:] != (n_nodes, GAUSS_RIDER_VALUES) or not out.flags.c_contiguous:
+            raise ValueError(f"Output must be a C-contiguous array of shape [frames, {n_nodes}, 13]")
+
+        columns = self._columns
+        values: list[int] = []
+        rows: list[int] = []  # row of a decoded node in flattened [frames * nodes, 13] output
+        n_frames = 0
+        for frame in islice(frames, len(out)):
+            base = n_frames * n_nodes
+            for gauss_rider in _gauss_riders(frame):
+                col = columns.get(gauss_rider.node_id)
+                if col is not None:
+                    _append_gauss_rider_values(gauss_rider, values)
+                    rows.append(base + col)
+            n_frames += 1
+
+        out_rows = out.reshape((-1, GAUSS_RIDER_VALUES))
+        out_rows[: n_frames * n_nodes] = 0
+        out_rows[rows] = _values_to_array(values)
+        if present is not None:
+            present[:n_frames] = False
+            present.reshape(-1)[rows] = True
+        return n_frames
+
+    def decode(self, frames: Sequence[GaussRiderFrame]) -> npt.NDArray[np.int16]:
+        """Decode all frames into a new [frames, nodes, 13] array"""
+        out = self.empty(len(frames))
+        self.decode_into(frames, out)
+        return out
+
+    def stream(
+        self, frames: Iterable[GaussRiderFrame], chunk_frames: int = 1024
+    ) -> Iterator[tuple[npt.NDArray[np.int16], npt.NDArray[np.bool_]]]:
+        """Decode frames chunk by chunk, yielding [<= chunk_frames, nodes, 13] data with [.., nodes]
+        mask of present nodes. Yielded arrays are reused for the next chunk, copy them to keep."""
+        out = self.empty(chunk_frames)
+        present = np.empty(out.shape[:2], dtype=np.bool_)
+        frames_iter = iter(frames)
+        while n_frames := self.decode_into(frames_iter, out, present):
+            yield out[:n_frames], present[:n_frames]
 
 
 class FH3D04:
@@ -130,7 +230,9 @@ class CalibrationDataRaw:  # pylint: disable=invalid-name
 
     @classmethod
     @no_type_check
-    def from_gauss_spec_settings(cls, settings: GaussRiderSpecSettings) -> "CalibrationDataRaw":
+    def from_gauss_spec_settings(
+        cls, settings: GaussRiderSpecSettingsMessage.GaussRiderSpecSettings
+    ) -> "CalibrationDataRaw":
         """Convert specific setings fetched from a GaussRider into a CalibrationDataRaw"""
         return cls(
             offsets_0=np.array(
@@ -173,65 +275,33 @@ class CalibrationDataRaw:  # pylint: disable=invalid-name
 
 
 @dataclass
-class Calibration:
-    """Structure containing closures calculating dynamic calibration values"""
-
-    # sensitivities S(t_val_pp) = s_t0 + s_scale_coef * t_val_pp
-    sensitivity: Callable[[npt.NDArray[np.number]], npt.NDArray[Matrix4x3]]  # mT/digit
-    # offsets O(t_val_pp) = o_t0 + o_scale_coef * t_val_pp:
-    offsets: Callable[[npt.NDArray[np.number]], npt.NDArray[Matrix4x3]]  # mT
-    # orthogonality
-    orthogonality: Callable[[npt.NDArray[Vec4[np.number]]], npt.NDArray[Matrix4x2]]  # mT
-
-
-def _sensitivity_default(_):  # type: ignore
-    ret = np.empty((4, 3))
-    ret[:, :2] = 0.010687 / 8
-    ret[:, 2] = 0.011187 / 16
-    return ret
-
-
-def _offsets_default(_):  # type: ignore
-    return np.zeros((4, 3))
-
-
-def _orthogonality_default(_):  # type: ignore
-    return np.zeros((4, 2))
-
-
-CALIBRATION_OLD_COMPATIBILITY = Calibration(
-    sensitivity=_sensitivity_default,
-    offsets=_offsets_default,
-    orthogonality=_orthogonality_default,
-)
-
-
-class GaussCalculator:
-    """Structure for derivation of calibration and calculating B-field values of data from Gauss Riders"""
-
-    @dataclass
-    class Config:
-        """Configuration of a given sensor"""
-
-        icoil: float = 1.0  # mA
-
-    def __init__(self, calibration: CalibrationDataRaw | Calibration, config: Config = Config()) -> None:
-        self._config = config
-        if isinstance(calibration, CalibrationDataRaw):
-            self._calibration = self._calibration_from_raw(calibration)
-        else:
-            self._calibration = calibration
+class CalibrationCoefficients:  # pylint: disable=too-many-instance-attributes
+    """Calibration of GaussRiders as coefficients of linear temperature dependencies.
+    Pixel arrays are [4, 3] ([4, 2] for orthogonality) for a single sensor
+    or [nodes, 4, 3] for stacked sensors, reference temperatures are scalars or [nodes]."""
+
+    # sensitivities S(t_val) = sensitivity_t0 + sensitivity_coef * (t_val - sensitivity_t_ref)
+    sensitivity_t0: npt.NDArray[np.double]  # mT/digit
+    sensitivity_coef: npt.NDArray[np.double]
+    sensitivity_t_ref: npt.NDArray[np.double]  # temperature digits
+    # offsets O(t_val) = offsets_t0 + offsets_coef * (t_val - offsets_t_ref)
+    offsets_t0: npt.NDArray[np.double]  # digits
+    offsets_coef: npt.NDArray[np.double]
+    offsets_t_ref: npt.NDArray[np.double]  # temperature digits
+    # XY crosstalk of Z axis, B_xy -= orthogonality_coef * B_z
+    orthogonality_coef: npt.NDArray[np.double]
 
-    def _calibration_from_raw(self, calibration: CalibrationDataRaw) -> Calibration:
+    @classmethod
+    def from_raw(cls, calibration: CalibrationDataRaw, icoil: float = 1.0) -> "CalibrationCoefficients":
+        """Derive coefficients of a sensor from its raw calibration data, `icoil` in mA"""
         temperatures = calibration.temperatures.ravel()
-        t_val_start = temperatures[0]  # pylint: disable=unused-variable
         t_val_0_tlo = temperatures[2]
         t_val_1_tlo = temperatures[1]
         t_val_0 = temperatures[3]
         t_val_1 = temperatures[4]
 
-        bcoil_xy = 191.0 * self._config.icoil  # uT
-        bcoil_z = 182.0 * self._config.icoil  # uT
+        bcoil_xy = 191.0 * icoil  # uT
+        bcoil_z = 182.0 * icoil  # uT
         signs = np.array(
             [
                 [1, 1, 1],
@@ -242,56 +312,250 @@ class GaussCalculator:
         )
         bcoil = np.array([bcoil_xy, bcoil_xy, bcoil_z]) * signs
 
+        # differences of raw values are taken in int16, as read from the sensor
         # [3] / [4, 3] -> [4, 3]
         s_t_0 = bcoil / ((calibration.Hval_P_T0 - calibration.Hval_N_T0) / 2.0) / 1000_000.0
         s_t_1 = bcoil / ((calibration.Hval_P_T1 - calibration.Hval_N_T1) / 2.0) / 1000_000.0
         s_t_coef = (s_t_1 - s_t_0) / (t_val_1 - t_val_0)
-        # [4, 3] + [4, 3] * [x, 1, 1] -> [x, 4, 3]
-        s = lambda t_val: s_t_0 + s_t_coef * (t_val[:, np.newaxis, np.newaxis] - t_val_0)
 
         o_t_0 = calibration.offsets_0.astype(np.double)
         o_t_1 = calibration.offsets_1.astype(np.double)
         o_scale_coef = (o_t_1 - o_t_0) / (t_val_1_tlo - t_val_0_tlo)
-        # [4, 3] + [4, 3] * [x, 1, 1] -> [x, 4, 3]
-        o = lambda t_val: o_t_0 + o_scale_coef * (t_val[:, np.newaxis, np.newaxis] - t_val_0_tlo)
 
-        h_val_pp_p = calibration.Hval_O_P
-        h_val_pp_n = calibration.Hval_O_N
-        h_val_pp_diff = h_val_pp_p - h_val_pp_n
+        h_val_pp_diff = calibration.Hval_O_P - calibration.Hval_O_N
         # [4, 2] / [4, 1]
         orth_coef = h_val_pp_diff[:, :2] / h_val_pp_diff[:, 2, np.newaxis]
-        # [x, 4, 1] * [1, 4, 2] -> [x, 4, 2] (only XY, hence 2)
-        orth = lambda h_val_pp_z: h_val_pp_z[..., np.newaxis] * orth_coef
 
-        ret = Calibration(
-            sensitivity=s,
-            offsets=o,
-            orthogonality=orth,
+        return cls(
+            sensitivity_t0=s_t_0,
+            sensitivity_coef=s_t_coef,
+            sensitivity_t_ref=np.double(t_val_0),
+            offsets_t0=o_t_0,
+            offsets_coef=o_scale_coef,
+            offsets_t_ref=np.double(t_val_0_tlo),
+            orthogonality_coef=orth_coef,
         )
-        return ret
+
+    @classmethod
+    def stack(cls, coefficients: Sequence["CalibrationCoefficients"]) -> "CalibrationCoefficients":
+        """Stack coefficients of single sensors along a new first (nodes) axis"""
+        return cls(
+            **{
+                field.name: np.stack([getattr(coef, field.name) for coef in coefficients]).astype(np.double)
+                for field in fields(cls)
+            }
+        )
+
+
+def _sensitivity_default() -> Matrix4x3[np.double]:
+    ret = np.empty((4, 3))
+    ret[:, :2] = 0.010687 / 8
+    ret[:, 2] = 0.011187 / 16
+    return ret  # type: ignore[return-value]
+
+
+CALIBRATION_OLD_COMPATIBILITY = CalibrationCoefficients(
+    sensitivity_t0=_sensitivity_default(),
+    sensitivity_coef=np.zeros((4, 3)),
+    sensitivity_t_ref=np.double(0.0),
+    offsets_t0=np.zeros((4, 3)),
+    offsets_coef=np.zeros((4, 3)),
+    offsets_t_ref=np.double(0.0),
+    orthogonality_coef=np.zeros((4, 2)),
+)
+
+
+@functools.cache
+def _numba_kernel() -> Optional[Callable[..., None]]:
+    """Compiled B-field kernel, None when numba is not installed"""
+    try:
+        import numba  # type: ignore  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+
+    @numba.njit(nogil=True)  # type: ignore
+    def kernel(out, data, s_t0, s_coef, s_t_ref, o_t0, o_coef, o_t_ref, orth_coef):  # type: ignore
+        # same operations in the same order as the numpy path, so results are identical
+        for frame in range(data.shape[0]):
+            for node in range(data.shape[1]):
+                t_val = np.float64(data[frame, node, 12])
+                s_t_diff = t_val - s_t_ref[node]
+                o_t_diff = t_val - o_t_ref[node]
+                for px in range(4):
+                    for ax in range(3):
+                        s = s_coef[node, px, ax] * s_t_diff + s_t0[node, px, ax]
+                        o = o_coef[node, px, ax] * o_t_diff + o_t0[node, px, ax]
+                        out[frame, node, px, ax] = (data[frame, node, 3 * px + ax] - o) * s
+                    b_z = out[frame, node, px, 2]
+                    out[frame, node, px, 0] -= b_z * orth_coef[node, px, 0]
+                    out[frame, node, px, 1] -= b_z * orth_coef[node, px, 1]
+
+    return kernel  # type: ignore[no-any-return]
+
+
+class _BfieldKernel:
+    """Fused conversion of raw data [frames, nodes, 13] into B-fields [frames, nodes, 4, 3]
+    with stacked calibration coefficients. Intermediate arrays of the numpy path are kept
+    between calls and grow with the number of frames."""
+
+    def __init__(self, coef: CalibrationCoefficients, use_numba: bool) -> None:
+        self._coef = coef
+        self._t_ref_s = coef.sensitivity_t_ref[:, np.newaxis, np.newaxis]
+        self._t_ref_o = coef.offsets_t_ref[:, np.newaxis, np.newaxis]
+        n_nodes = len(coef.sensitivity_t0)
+        self._t_diff: npt.NDArray[np.double] = np.empty((0, n_nodes, 1, 1))
+        self._sensitivity: npt.NDArray[np.double] = np.empty((0, n_nodes, 4, 3))
+        self._orth: npt.NDArray[np.double] = np.empty((0, n_nodes, 4, 2))
+
+        self._numba: Optional[Callable[..., None]] = None
+        if use_numba:
+            self._numba = _numba_kernel()
+            if self._numba is None:
+                L.warning("numba is not installed, B-fields are calculated with numpy")
+
+    def __call__(self, out: npt.NDArray[np.double], data: npt.NDArray[np.number]) -> None:
+        # pylint: disable=invalid-name
+        coef = self._coef
+        if self._numba is not None:
+            self._numba(
+                out,
+                data,
+                coef.sensitivity_t0,
+                coef.sensitivity_coef,
+                coef.sensitivity_t_ref,
+                coef.offsets_t0,
+                coef.offsets_coef,
+                coef.offsets_t_ref,
+                coef.orthogonality_coef,
+            )
+            return
+
+        frames, n_nodes = data.shape[:2]
+        if len(self._t_diff) < frames:
+            self._t_diff = np.empty((frames, n_nodes, 1, 1))
+            self._sensitivity = np.empty((frames, n_nodes, 4, 3))
+            self._orth = np.empty((frames, n_nodes, 4, 2))
+        t_diff = self._t_diff[:frames]
+        s = self._sensitivity[:frames]
+        orth = self._orth[:frames]
+        # [x, nodes, 1, 1]
+        t_val = data[:, :, np.newaxis, 12:]
+
+        # [nodes, 4, 3] * [x, nodes, 1, 1] + [nodes, 4, 3] -> [x, nodes, 4, 3]
+        np.subtract(t_val, self._t_ref_s, out=t_diff)
+        np.multiply(coef.sensitivity_coef, t_diff, out=s)
+        s += coef.sensitivity_t0
+        np.subtract(t_val, self._t_ref_o, out=t_diff)
+        np.multiply(coef.offsets_coef, t_diff, out=out)
+        out += coef.offsets_t0
+
+        # ([x, nodes, 4, 3] - [x, nodes, 4, 3]) * [x, nodes, 4, 3]
+        np.subtract(data[..., :12].reshape((frames, n_nodes, 4, 3)), out, out=out)
+        out *= s
+
+        # [x, nodes, 4, 1] * [nodes, 4, 2] -> [x, nodes, 4, 2]
+        np.multiply(out[..., 2:], coef.orthogonality_coef, out=orth)
+        out[..., :2] -= orth
+
+
+class GaussCalculator:
+    """Structure for derivation of calibration and calculating B-field values of data from Gauss Riders"""
+
+    @dataclass
+    class Config:
+        """Configuration of a given sensor"""
+
+        icoil: float = 1.0  # mA
+        # calculate B-fields with a compiled kernel, effective only when numba is installed
+        use_numba: bool = False
+
+    def __init__(
+        self, calibration: CalibrationDataRaw | CalibrationCoefficients, config: Config = Config()
+    ) -> None:
+        self._config = config
+        if isinstance(calibration, CalibrationDataRaw):
+            self._coefficients = CalibrationCoefficients.from_raw(calibration, config.icoil)
+        else:
+            self._coefficients = calibration
+        self._kernel = _BfieldKernel(CalibrationCoefficients.stack([self._coefficients]), config.use_numba)
+
+    @property
+    def coefficients(self) -> CalibrationCoefficients:
+        """Calibration coefficients of the sensor"""
+        return self._coefficients
+
+    def calculate_bfield_into(
+        self, out: npt.NDArray[Matrix4x3[np.double]], data: npt.NDArray[Vec13[np.number]]
+    ) -> npt.NDArray[Matrix4x3[np.double]]:
+        """Calculate B-fields of raw data [x, 13] (flattened 4x3 magnetic values and 1 temperature
+        value of each sample) into `out` [x, 4, 3], which is also returned"""
+        if data.ndim != 2 or data.shape[1] != 13 or out.shape != (len(data), 4, 3):
+            raise ValueError("Expected data of shape [x, 13] and output of shape [x, 4, 3]")
+        self._kernel(out[:, np.newaxis], data[:, np.newaxis])
+        return out
 
     def calculate_bfield(self, data: Sequence[Vec13[np.int16]]) -> npt.NDArray[Matrix4x3[np.double]]:
         """data: array of raw B and temperature data from a sensor (flattened 4x3 magnetic
         values and 1 temperature value)"""
         # input shape: [x, 13]
-        data_arr = np.asarray(data, dtype=np.double)
-        # [x]
-        t_val = data_arr[:, -1]
-        L.debug("T: %s", t_val)
-        # [x] -> [x, 4, 3]
-        s = self._calibration.sensitivity(t_val)
-        L.debug("S: %s", s)
-        # [x] -> [x, 4, 3]
-        o = self._calibration.offsets(t_val)
-        L.debug("O: %s", o)
-        # ([x, 4, 3] - [4, 3]) * [4, 3] -> [x, 4, 3]
-        B = (data_arr[..., :-1].reshape((-1, 4, 3)) - o) * s  # pylint: disable=invalid-name
-        L.debug("B noorth: %s", B)
-        # [x, 4] -> [x, 4, 2]
-        orth = self._calibration.orthogonality(B[:, :, 2])
-        L.debug("Orth: %s", orth)
-        # [x, 4, 2] - [x, 4, 2] -> [x, 4, 2]
-        B[..., :2] -= orth
-        L.debug("B: %s", B)
+        data_arr = np.asarray(data)
         # [x, 4, 3]
-        return B  # type: ignore
+        return self.calculate_bfield_into(np.empty((len(data_arr), 4, 3)), data_arr)
+
+
+class GaussCalculatorBank:
+    """Calculation of B-field values of many Gauss Riders at once, with calibrations of all nodes
+    stacked into [nodes, 4, 3] coefficient arrays (see `CalibrationCoefficients`).
+    Results are the same as of `GaussCalculator` of each node.
+
+    Nodes are ordered by ascending node id, as in `GaussRiderDecoder`. Intermediate arrays
+    are kept between calls and grow with the number of frames, so converting blocks
+    of a steady size into a preallocated output allocates no arrays."""
+
+    def __init__(
+        self,
+        calibrations: Mapping[int, CalibrationDataRaw | CalibrationCoefficients],
+        config: GaussCalculator.Config = GaussCalculator.Config(),
+    ) -> None:
+        self._node_ids = sorted(calibrations)
+        self._coef = CalibrationCoefficients.stack(
+            [
+                (
+                    CalibrationCoefficients.from_raw(calibration, config.icoil)
+                    if isinstance(calibration, CalibrationDataRaw)
+                    else calibration
+                )
+                for calibration in (calibrations[node_id] for node_id in self._node_ids)
+            ]
+        )
+        self._kernel = _BfieldKernel(self._coef, config.use_numba)
+
+    @property
+    def node_ids(self) -> list[int]:
+        """Ids of nodes in order of the second axis of converted arrays"""
+        return list(self._node_ids)
+
+    @property
+    def coefficients(self) -> CalibrationCoefficients:
+        """Stacked calibration coefficients of all nodes"""
+        return self._coef
+
+    def calculate_bfield_into(
+        self, out: npt.NDArray[np.double], data: npt.NDArray[np.int16]
+    ) -> npt.NDArray[np.double]:
+        """Convert raw data [frames, nodes, 13] (see `GaussRiderDecoder`) into B-fields
+        written to `out` [frames, nodes, 4, 3], which is also returned"""
+        frames = len(data)
+        n_nodes = len(self._node_ids)
+        if data.shape[1:] != (n_nodes, 13) or out.shape != (frames, n_nodes, 4, 3):
+            raise ValueError(
+                f"Expected data of shape [frames, {n_nodes}, 13] "
+                f"and output of shape [frames, {n_nodes}, 4, 3]"
+            )
+        self._kernel(out, data)
+        return out
+
+    def calculate_bfield(self, data: npt.NDArray[np.int16]) -> npt.NDArray[np.double]:
+        """Convert raw data [frames, nodes, 13] into new array of B-fields [frames, nodes, 4, 3]"""
+        data = np.asarray(data)
+        return self.calculate_bfield_into(np.empty((len(data), len(self._node_ids), 4, 3)), data)
@@ -0,0 +1,124 @@
+"""Single-file store of raw calibration data of all GaussRiders of a system.
+
+Calibration of each node is stored as a record of a structured numpy array, together with
+its node id and `device_random_id` (see `NodeGenericSettings`) of the device it was read from.
+Comparing those ids with the ones currently reported by the hardware tells whether stored
+calibration is still valid, so it has to be fetched over the bus only when hardware changes.
+Store is a plain `.npy` file, so it can be memory-mapped.
+"""
+
+from dataclasses import fields
+import logging
+import os
+from pathlib import Path
+import tempfile
+from typing import Mapping, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from clone_client.magnet import CalibrationDataRaw, GaussCalculator, GaussCalculatorBank
+
+L = logging.getLogger(__name__)
+
+CALIBRATION_FIELDS = tuple(field.name for field in fields(CalibrationDataRaw))
+CALIBRATION_RECORD_DTYPE = np.dtype(
+    [("node_id", "<u4"), ("device_random_id", "<i4")] + [(name, "<i2", (4, 3)) for name in CALIBRATION_FIELDS]
+)
+
+
+class CalibrationStore:
+    """Raw calibration data of GaussRiders, indexed by node id"""
+
+    def __init__(self, records: npt.NDArray[np.void]) -> None:
+        if records.dtype != CALIBRATION_RECORD_DTYPE:
+            raise ValueError(f"Unexpected calibration records type: {records.dtype}")
+        self._records = records
+        self._rows = {int(node_id): row for row, node_id in enumerate(records["node_id"])}
+
+    @classmethod
+    def from_calibrations(
+        cls, calibrations: Mapping[int, CalibrationDataRaw], device_random_ids: Mapping[int, int]
+    ) -> "CalibrationStore":
+        """Create a store of calibrations of nodes, read from devices with given random ids"""
+        node_ids = sorted(calibrations)
+        records = np.zeros(len(node_ids), dtype=CALIBRATION_RECORD_DTYPE)
+        for record, node_id in zip(records, node_ids):
+            record["node_id"] = node_id
+            record["device_random_id"] = device_random_ids[node_id]
+            for name in CALIBRATION_FIELDS:
+                record[name] = getattr(calibrations[node_id], name)
+        return cls(records)
+
+    @classmethod
+    def load(cls, path: str | Path, mmap: bool = True) -> Optional["CalibrationStore"]:
+        """Load a store from a file (memory-mapped, unless `mmap` is False).
+        Returns None if there is no file or it is broken."""
+        path = Path(path)
+        if not path.is_file():
+            return None
+        try:
+            records = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+            return cls(records)
+        except (OSError, ValueError) as err:
+            L.warning("Ignoring broken calibration store %s: %s", path, err)
+            return None
+
+    def save(self, path: str | Path) -> None:
+        """Save the store to a file, replacing it atomically"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix=".npy")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.save(file, np.asarray(self._records), allow_pickle=False)
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    @property
+    def records(self) -> npt.NDArray[np.void]:
+        """Structured array of all records, ordered by node id"""
+        return self._records
+
+    @property
+    def node_ids(self) -> list[int]:
+        """Ids of stored nodes"""
+        return list(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, node_id: object) -> bool:
+        return node_id in self._rows
+
+    def device_random_id(self, node_id: int) -> int:
+        """Random id of the device calibration of the node was read from"""
+        return int(self._records[self._rows[node_id]]["device_random_id"])
+
+    def get(self, node_id: int) -> CalibrationDataRaw:
+        """Calibration data of a node, raises `KeyError` if it is not stored"""
+        record = self._records[self._rows[node_id]]
+        return CalibrationDataRaw(**{name: np.array(record[name]) for name in CALIBRATION_FIELDS})
+
+    def calibrations(self) -> dict[int, CalibrationDataRaw]:
+        """Calibration data of all stored nodes"""
+        return {node_id: self.get(node_id) for node_id in self._rows}
+
+    def stale_nodes(self, device_random_ids: Mapping[int, Optional[int]]) -> set[int]:
+        """Nodes, whose calibration is missing in the store or was read from a different device
+        than currently reported (None when device id is not known)"""
+        return {
+            node_id
+            for node_id, device_random_id in device_random_ids.items()
+            if device_random_id is None
+            or node_id not in self._rows
+            or self.device_random_id(node_id) != device_random_id
+        }
+
+    def calculator_bank(
+        self, config: GaussCalculator.Config = GaussCalculator.Config()
+    ) -> GaussCalculatorBank:
+        """B-field calculator of all stored nodes"""
+        return GaussCalculatorBank(self.calibrations(), config)
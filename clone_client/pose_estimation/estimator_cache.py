@@ -0,0 +1,79 @@
+"""On-disk cache of built magnetic pose estimators.
+
+Building an estimator from a magnetic map solves a dense system of equations for each joint
+(or densifies the map into lookup tables), which takes seconds for large maps. Built state
+is stored as `.npz` files in a cache directory, named by a hash of the map and of the build
+parameters, so it is reused across reconnects and restarts as long as the map does not change.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+from typing import Any, Mapping, Optional
+import zipfile
+
+import numpy as np
+import numpy.typing as npt
+import scipy  # type: ignore
+
+from clone_client.proto.state_store_pb2 import PoseEstimationInfo
+
+L = logging.getLogger(__name__)
+
+# bump when layout of cached arrays changes
+CACHE_FORMAT_VERSION = 1
+
+
+def cache_key(info: PoseEstimationInfo, params: Mapping[str, Any]) -> str:
+    """Hash of the magnetic map in `info` and of JSON-serializable build `params`.
+    SciPy version is part of the key, as cached coefficients depend on its implementation."""
+    digest = hashlib.sha256()
+    digest.update(info.maginterp.SerializeToString(deterministic=True))
+    digest.update(
+        json.dumps(
+            {"format": CACHE_FORMAT_VERSION, "scipy": scipy.__version__, **params}, sort_keys=True
+        ).encode()
+    )
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir: str | Path, key: str) -> Path:
+    return Path(cache_dir) / f"maginterp-{key}.npz"
+
+
+def load(cache_dir: str | Path, key: str) -> Optional[dict[str, npt.NDArray[Any]]]:
+    """Load cached arrays, None if there are none (or the cache file is broken)"""
+    path = _cache_path(cache_dir, key)
+    if not path.is_file():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+    except (OSError, ValueError, zipfile.BadZipFile) as err:
+        L.warning("Ignoring broken pose estimator cache file %s: %s", path, err)
+        return None
+    L.debug("Pose estimator loaded from cache %s", path)
+    return arrays
+
+
+def store(cache_dir: str | Path, key: str, arrays: Mapping[str, npt.NDArray[Any]]) -> None:
+    """Save arrays in the cache. Failures are logged, not raised, as cache is only an optimization."""
+    path = _cache_path(cache_dir, key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # written to a temporary file first, so concurrent readers never see a partial file
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".maginterp-", suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.savez(file, **arrays)
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+    except OSError as err:
+        L.warning("Could not store pose estimator in cache %s: %s", path, err)
+        return
+    L.debug("Pose estimator stored in cache %s", path)
@@ -0,0 +1,191 @@
+"""Filters smoothing stacked per-joint signals (B-fields) frame by frame.
+
+State of a filter is allocated on the first frame, basing on its shape, and then updated
+in place, so filtering a frame has a fixed cost and allocates no arrays. Returned array
+is owned by the filter and overwritten by the next frame.
+"""
+
+from abc import ABC, abstractmethod
+import math
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+
+class SignalFilter(ABC):
+    """Base class of filters of stacked signals, e.g. B-fields [joints, 12]"""
+
+    def __init__(self) -> None:
+        self._out: npt.NDArray[np.double] = np.zeros(0)
+        self._allocated = False
+
+    def _allocate(self, values: npt.NDArray[np.double]) -> None:
+        self._out = np.zeros_like(values, dtype=np.double)
+        self._allocated = True
+
+    def reset(self) -> None:
+        """Forget the history, state is initialized again with the next frame"""
+        self._allocated = False
+
+    def __call__(
+        self, values: npt.NDArray[np.double], timestamp: Optional[float] = None
+    ) -> npt.NDArray[np.double]:
+        """Filter a frame of `values` taken at `timestamp` (seconds, used only by time aware filters)
+        and return the filtered frame. Frames must keep the shape of the first one."""
+        if not self._allocated:
+            self._allocate(values)
+            self._first(values, timestamp)
+        else:
+            self._update(values, timestamp)
+        return self._out
+
+    @abstractmethod
+    def _first(self, values: npt.NDArray[np.double], timestamp: Optional[float]) -> None:
+        """Initialize the state with the first frame and write the output"""
+
+    @abstractmethod
+    def _update(self, values: npt.NDArray[np.double], timestamp: Optional[float]) -> None:
+        """Update the state with a frame and write the output"""
+
+
+class MovingAverageFilter(SignalFilter):
+    """Average of the last `samples` frames (of all frames seen so far, before there are `samples`).
+
+    Frames are kept in a preallocated circular buffer and the running sum is updated by
+    subtracting the oldest frame and adding the new one. To bound accumulation of rounding
+    errors, the sum is recomputed from the buffer every time the buffer wraps around,
+    which keeps the amortized cost per frame fixed."""
+
+    def __init__(self, samples: int = 8) -> None:
+        super().__init__()
+        if samples <= 0:
+            raise ValueError("Filter samples number must be greater than zero")
+        self._samples = samples
+        self._buffer: npt.NDArray[np.double] = np.zeros(0)  # [samples, *shape]
+        self._sum: npt.NDArray[np.double] = np.zeros(0)
+        self._idx = 0
+        self._count = 0
+
+    def _allocate(self, values: npt.NDArray[np.double]) -> None:
+        super()._allocate(values)
+        self._buffer = np.zeros((self._samples, *values.shape))
+        self._sum = np.zeros(values.shape)
+
+    def _first(self, values: npt.NDArray[np.double], timestamp: Optional[float]) -> None:
+        self._buffer.fill(0.0)
+        self._sum.fill(0.0)
+        self._idx = 0
+        self._count = 0
+        self._update(values, timestamp)
+
+    def _update(self, values: npt.NDArray[np.double], timestamp: Optional[float]) -> None:
+        slot = self._buffer[self._idx]
+        self._sum -= slot
+        slot[...] = values
+        self._sum += slot
+        self._idx += 1
+        if self._idx == self._samples:
+            self._idx = 0
+            # summed slot by slot, as reductions along the first axis allocate a temporary buffer
+            np.copyto(self._sum, self._buffer[0])
+            for slot in self._buffer[1:]:
+                self._sum += slot
+        self._count = min(self._count + 1, self._samples)
+        np.multiply(self._sum, 1.0 / self._count, out=self._out)
+
+
+class ExponentialMovingAverageFilter(SignalFilter):
+    """Exponential moving average, `out += alpha * (values - out)`"""
+
+    def __init__(self, alpha: float = 0.3) -> None:
+        super().__init__()
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("EMA alpha must be in (0, 1]")
+        self._alpha = alpha
+        self._diff: npt.NDArray[np.double] = np.zeros(0)
+
+    def _allocate(self, values: npt.NDArray[np.double]) -> None:
+        super()._allocate(values)
+        self._diff = np.zeros(values.shape)
+
+    def _first(self, values: npt.NDArray[np.double], timestamp: Optional[float]) -> None:
+        self._out[...] = values
+
+    def _update(self, values: npt.NDArray[np.double], timestamp: Optional[float]) -> None:
+        np.subtract(values, self._out, out=self._diff)
+        self._diff *= self._alpha
+        self._out += self._diff
+
+
+class OneEuroFilter(SignalFilter):
+    """One euro filter (Casiez et al., 2012) - low-pass filter, whose cutoff frequency grows
+    with the speed of change of the signal, so slow movements are smoothed strongly while
+    fast ones are followed with little lag. Each value is filtered independently.
+
+    `min_cutoff` and `d_cutoff` are in Hz, `beta` in 1/(signal unit) - since B-fields are
+    in teslas, useful values of `beta` are large. Time between frames is taken from timestamps,
+    when they are not given (or do not grow) `1 / rate` is used."""
+
+    def __init__(
+        self, min_cutoff: float = 1.0, beta: float = 1000.0, d_cutoff: float = 1.0, rate: float = 100.0
+    ) -> None:
+        super().__init__()
+        if min_cutoff <= 0.0 or d_cutoff <= 0.0 or rate <= 0.0:
+            raise ValueError("One euro filter cutoffs and rate must be greater than zero")
+        self._min_cutoff = min_cutoff
+        self._beta = beta
+        self._d_cutoff = d_cutoff
+        self._default_dt = 1.0 / rate
+        self._last_timestamp: Optional[float] = None
+        self._derivative: npt.NDArray[np.double] = np.zeros(0)  # filtered derivative
+        self._scratch: npt.NDArray[np.double] = np.zeros(0)
+        self._alpha: npt.NDArray[np.double] = np.zeros(0)
+
+    def _allocate(self, values: npt.NDArray[np.double]) -> None:
+        super()._allocate(values)
+        self._derivative = np.zeros(values.shape)
+        self._scratch = np.zeros(values.shape)
+        self._alpha = np.zeros(values.shape)
+
+    def _dt(self, timestamp: Optional[float]) -> float:
+        last_timestamp = self._last_timestamp
+        self._last_timestamp = timestamp
+        if timestamp is None or last_timestamp is None or timestamp <= last_timestamp:
+            return self._default_dt
+        return timestamp - last_timestamp
+
+    @staticmethod
+    def _smoothing_factor(cutoff: float, dt: float) -> float:
+        tau = 1.0 / (2.0 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def _first(self, values: npt.NDArray[np.double], timestamp: Optional[float]) -> None:
+        self._out[...] = values
+        self._derivative.fill(0.0)
+        self._last_timestamp = timestamp
+
+    def _update(self, values: npt.NDArray[np.double], timestamp: Optional[float]) -> None:
+        dt = self._dt(timestamp)
+
+        # derivative of the signal, low-pass filtered with constant `d_cutoff`
+        scratch = self._scratch
+        np.subtract(values, self._out, out=scratch)
+        scratch *= 1.0 / dt
+        scratch -= self._derivative
+        scratch *= self._smoothing_factor(self._d_cutoff, dt)
+        self._derivative += scratch
+
+        # per-value cutoff and smoothing factor: 1 / (1 + 1 / (2 pi cutoff dt))
+        alpha = self._alpha
+        np.abs(self._derivative, out=alpha)
+        alpha *= self._beta
+        alpha += self._min_cutoff
+        alpha *= 2.0 * math.pi * dt
+        np.reciprocal(alpha, out=alpha)
+        alpha += 1.0
+        np.reciprocal(alpha, out=alpha)
+
+        np.subtract(values, self._out, out=scratch)
+        scratch *= alpha
+        self._out += scratch
@@ -1,23 +1,57 @@
 # mypy: disable-error-code="no-any-unimported"
-from collections import deque
-from dataclasses import dataclass
-from itertools import repeat
-from typing import Annotated, Literal, Mapping
+from dataclasses import dataclass, fields
+import logging
+from typing import Annotated, Any, Callable, Literal, Mapping, Optional, Sequence
 
 import numpy as np
 import numpy.typing as npt
-from scipy import interpolate
+from scipy import interpolate, spatial
 from scipy.spatial.transform import Rotation as R
+from scipy.special import xlogy
 
+from clone_client.pose_estimation import estimator_cache
+from clone_client.pose_estimation.filters import (
+    ExponentialMovingAverageFilter,
+    MovingAverageFilter,
+    OneEuroFilter,
+    SignalFilter,
+)
 from clone_client.proto.state_store_pb2 import Bfield, PoseEstimationInfo, TelemetryData
 
+L = logging.getLogger(__name__)
+
 
 @dataclass
 class MagInterpolConfig:
     """Additional parameters for client"""
 
-    filter_avg_use: bool = True
+    filter_avg_use: bool = True  # whether B-fields are filtered before estimation
     filter_avg_samples: int = 8
+    # "moving_average" over `filter_avg_samples` frames, "ema" - exponential moving average
+    # or "one_euro" - adaptive low-pass filter, see `clone_client.pose_estimation.filters`
+    filter_type: Literal["moving_average", "ema", "one_euro"] = "moving_average"
+    filter_ema_alpha: float = 0.3
+    filter_one_euro_min_cutoff: float = 1.0  # Hz
+    filter_one_euro_beta: float = 1000.0  # 1/T, B-fields are in teslas
+    filter_one_euro_d_cutoff: float = 1.0  # Hz
+    # None - global interpolation over all points of a joint's map, otherwise interpolation
+    # is local, using only this number of map points nearest (in B-field space) to each sample.
+    # Local mode does not need a dense solve on load, so large maps stay fast to load and evaluate.
+    neighbors: Optional[int] = None
+    # "rbf" - angles interpolated from B-field by RBF on every frame (`PoseEstimatorMagInterpol`),
+    # "lut" - angles looked up in a precomputed dense grid and refined locally (`PoseEstimatorMagLUT`)
+    backend: Literal["rbf", "lut"] = "rbf"
+    # maximal number of grid points of a single joint's lookup table ("lut" backend only),
+    # memory used is about 400 bytes per point
+    lut_max_points: int = 1024
+    # directory where built estimators are cached (keyed by hash of the magnetic map),
+    # None disables caching. RBF estimators in local mode (see `neighbors`) are not cached,
+    # as they do not need to be solved
+    cache_dir: Optional[str] = None
+    # "thread" or "process" - estimator is built in background, so connecting does not wait for it,
+    # until it is ready joint rotations estimated by the server are used.
+    # None - estimator is built right away, while system info is being (re)loaded
+    background_build: Optional[Literal["thread", "process"]] = None
 
 
 def axis_to_index(axis: str | Literal["X", "Y", "Z"] | None) -> Literal[0, 1, 2] | None:
@@ -35,6 +69,285 @@ def axis_to_index(axis: str | Literal["X", "Y", "Z"] | None) -> Literal[0, 1, 2]
     raise RuntimeError(f"Wrong axis name '{axis}'")
 
 
+# radial basis functions as defined in scipy.interpolate.RBFInterpolator,
+# module level functions (not lambdas), so that evaluators can be pickled
+def _linear(r: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+    return -r
+
+
+def _thin_plate_spline(r: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+    return xlogy(r**2, r)  # type: ignore[no-any-return]
+
+
+def _cubic(r: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+    return r**3
+
+
+def _quintic(r: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+    return -(r**5)
+
+
+def _multiquadric(r: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+    return -np.sqrt(r**2 + 1)
+
+
+def _inverse_multiquadric(r: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+    return 1 / np.sqrt(r**2 + 1)
+
+
+def _inverse_quadratic(r: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+    return 1 / (r**2 + 1)
+
+
+def _gaussian(r: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+    return np.exp(-(r**2))
+
+
+RBF_KERNELS: dict[str, Callable[[npt.NDArray[np.double]], npt.NDArray[np.double]]] = {
+    "linear": _linear,
+    "thin_plate_spline": _thin_plate_spline,
+    "cubic": _cubic,
+    "quintic": _quintic,
+    "multiquadric": _multiquadric,
+    "inverse_multiquadric": _inverse_multiquadric,
+    "inverse_quadratic": _inverse_quadratic,
+    "gaussian": _gaussian,
+}
+
+
+class FusedRBFEvaluator:
+    """Evaluator of many fitted `RBFInterpolator`s (one per joint) in a single vectorized pass.
+
+    Kernel and polynomial coefficients of all interpolators are stacked (joints with fewer
+    data points are zero-padded), so evaluation of all joints costs a few batched NumPy
+    operations instead of a separate SciPy call for each joint.
+
+    NOTE: only global interpolators (fitted without `neighbors`) sharing the same kernel
+    and polynomial degree can be fused, see `from_interpolators`. Local ones are handled
+    by `FusedLocalRBFEvaluator`."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        kernel: str,
+        y_eps: npt.NDArray[np.double],
+        kernel_coeffs: npt.NDArray[np.double],
+        poly_coeffs: npt.NDArray[np.double],
+        powers: npt.NDArray[np.int_],
+        epsilon: npt.NDArray[np.double],
+        shift: npt.NDArray[np.double],
+        scale: npt.NDArray[np.double],
+    ) -> None:
+        self._kernel = RBF_KERNELS[kernel]
+        # data points scaled by epsilon, transposed as batched vector-matrix products are faster
+        self._y_eps_t = np.ascontiguousarray(y_eps.transpose(0, 2, 1))  # [joints, dims, points]
+        self._y_eps_sq = np.einsum("jnd,jnd->jn", y_eps, y_eps)  # [joints, points]
+        self._kernel_coeffs = kernel_coeffs  # [joints, points, outputs]
+        self._poly_coeffs = poly_coeffs  # [joints, monomials, outputs]
+        self._powers = powers  # [monomials, dims]
+        self._epsilon = epsilon[:, np.newaxis]  # [joints, 1]
+        self._shift = shift  # [joints, dims]
+        self._scale = scale  # [joints, dims]
+
+    @classmethod
+    def from_interpolators(
+        cls, interpolators: Sequence[interpolate.RBFInterpolator]
+    ) -> Optional["FusedRBFEvaluator"]:
+        """Stack coefficients of fitted interpolators. Returns None when they cannot be fused."""
+        if not interpolators:
+            return None
+        first = interpolators[0]
+        if first.kernel not in RBF_KERNELS:
+            return None
+        for interp in interpolators:
+            if (
+                interp.neighbors is not None
+                or interp.kernel != first.kernel
+                or interp.y.shape[1] != first.y.shape[1]
+                or interp.d.shape[1] != first.d.shape[1]
+                or not np.array_equal(interp.powers, first.powers)
+            ):
+                return None
+
+        n_joints = len(interpolators)
+        n_points = max(interp.y.shape[0] for interp in interpolators)
+        n_dims = first.y.shape[1]
+        n_outputs = first.d.shape[1]
+        n_monomials = first.powers.shape[0]
+
+        y_eps = np.zeros((n_joints, n_points, n_dims))
+        kernel_coeffs = np.zeros((n_joints, n_points, n_outputs))
+        poly_coeffs = np.zeros((n_joints, n_monomials, n_outputs))
+        for row, interp in enumerate(interpolators):
+            count = interp.y.shape[0]
+            coeffs = interp._coeffs  # pylint: disable=protected-access
+            coeffs = coeffs.reshape(count + n_monomials, n_outputs)
+            y_eps[row, :count] = interp.y * interp.epsilon
+            kernel_coeffs[row, :count] = coeffs[:count]
+            poly_coeffs[row] = coeffs[count:]
+
+        return cls(
+            first.kernel,
+            y_eps,
+            kernel_coeffs,
+            poly_coeffs,
+            first.powers,
+            np.array([interp.epsilon for interp in interpolators], dtype=np.double),
+            np.stack([interp._shift for interp in interpolators]),  # pylint: disable=protected-access
+            np.stack([interp._scale for interp in interpolators]),  # pylint: disable=protected-access
+        )
+
+    @property
+    def n_joints(self) -> int:
+        """Number of fused interpolators"""
+        return self._y_eps_t.shape[0]
+
+    def __call__(self, x: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+        """Evaluate each joint's interpolator at its own point, `x` [joints, dims] -> [joints, outputs]"""
+        x_eps = x * self._epsilon
+        # |y - x|^2 expanded, so no [joints, points, dims] temporary is needed
+        dist_sq = np.matmul(x_eps[:, np.newaxis, :], self._y_eps_t)[:, 0, :]
+        dist_sq *= -2.0
+        dist_sq += self._y_eps_sq
+        dist_sq += np.einsum("jd,jd->j", x_eps, x_eps)[:, np.newaxis]
+        np.maximum(dist_sq, 0.0, out=dist_sq)
+        kernel_values = self._kernel(np.sqrt(dist_sq, out=dist_sq))
+
+        out = np.matmul(kernel_values[:, np.newaxis, :], self._kernel_coeffs)[:, 0, :]
+        x_hat = (x - self._shift) / self._scale
+        monomials = np.prod(x_hat[:, np.newaxis, :] ** self._powers, axis=-1)
+        out += np.matmul(monomials[:, np.newaxis, :], self._poly_coeffs)[:, 0, :]
+        return out  # type: ignore[no-any-return]
+
+
+class FusedLocalRBFEvaluator:
+    """Evaluator of many local `RBFInterpolator`s (fitted with `neighbors`) in a single pass.
+
+    Like SciPy, each sample is interpolated using only the nearest points of a joint's map
+    (found with the interpolator's KD-tree), though small systems of equations of all joints
+    are built and solved together. Joints with fewer neighbors than the others are padded
+    with decoupled identity equations, which do not affect the result."""
+
+    def __init__(self, interpolators: Sequence[interpolate.RBFInterpolator]) -> None:
+        first = interpolators[0]
+        self._interpolators = interpolators
+        self._kernel = RBF_KERNELS[first.kernel]
+        self._powers = first.powers  # [monomials, dims]
+        self._epsilon = np.array([interp.epsilon for interp in interpolators], dtype=np.double)
+        self._n_neighbors = max(interp.neighbors for interp in interpolators)
+        n_joints = len(interpolators)
+        n_monomials = first.powers.shape[0]
+        # mask of real neighbors (padding is False), [joints, neighbors]
+        self._valid = np.zeros((n_joints, self._n_neighbors), dtype=bool)
+        for row, interp in enumerate(interpolators):
+            self._valid[row, : interp.neighbors] = True
+        self._padding_diag = np.zeros((n_joints, self._n_neighbors + n_monomials))
+        self._padding_diag[:, : self._n_neighbors] = ~self._valid
+        self._indices = np.zeros((n_joints, self._n_neighbors), dtype=np.intp)
+
+    @classmethod
+    def from_interpolators(
+        cls, interpolators: Sequence[interpolate.RBFInterpolator]
+    ) -> Optional["FusedLocalRBFEvaluator"]:
+        """Returns None when interpolators cannot be fused."""
+        if not interpolators:
+            return None
+        first = interpolators[0]
+        if first.kernel not in RBF_KERNELS:
+            return None
+        for interp in interpolators:
+            if (
+                interp.neighbors is None
+                or interp.kernel != first.kernel
+                or interp.y.shape[1] != first.y.shape[1]
+                or interp.d.shape[1] != first.d.shape[1]
+                or not np.array_equal(interp.powers, first.powers)
+            ):
+                return None
+        return cls(interpolators)
+
+    @property
+    def n_joints(self) -> int:
+        """Number of fused interpolators"""
+        return len(self._interpolators)
+
+    def _monomials(self, x_hat: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+        return np.prod(x_hat[..., np.newaxis, :] ** self._powers, axis=-1)  # type: ignore[no-any-return]
+
+    def __call__(self, x: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+        """Evaluate each joint's interpolator at its own point, `x` [joints, dims] -> [joints, outputs]"""
+        # pylint: disable=protected-access
+        interpolators = self._interpolators
+        for row, interp in enumerate(interpolators):
+            _, indices = interp._tree.query(x[row], interp.neighbors)
+            self._indices[row, : interp.neighbors] = indices
+        # neighborhoods, padding repeats the nearest point, [joints, neighbors, dims/outputs]
+        indices = np.where(self._valid, self._indices, self._indices[:, :1])
+        y = np.stack([interp.y[idx] for interp, idx in zip(interpolators, indices)])
+        d = np.stack([interp.d[idx] for interp, idx in zip(interpolators, indices)])
+        smoothing = np.stack([interp.smoothing[idx] for interp, idx in zip(interpolators, indices)])
+
+        # domain of each neighborhood is shifted and scaled to [-1, 1] as in SciPy
+        mins = y.min(axis=1)
+        maxs = y.max(axis=1)
+        shift = (maxs + mins) / 2
+        scale = (maxs - mins) / 2
+        scale[scale == 0.0] = 1.0
+
+        valid = self._valid[:, :, np.newaxis]
+        n_neighbors = self._n_neighbors
+        y_eps = y * self._epsilon[:, np.newaxis, np.newaxis]
+        # |yi - yj|^2 expanded, so no [joints, neighbors, neighbors, dims] temporary is needed
+        y_eps_sq = np.einsum("jnd,jnd->jn", y_eps, y_eps)
+        dist_sq = np.matmul(y_eps, y_eps.transpose(0, 2, 1))
+        dist_sq *= -2.0
+        dist_sq += y_eps_sq[:, :, np.newaxis]
+        dist_sq += y_eps_sq[:, np.newaxis, :]
+        np.maximum(dist_sq, 0.0, out=dist_sq)
+        np.einsum("jii->ji", dist_sq)[:] = 0.0
+        kernel_matrix = self._kernel(np.sqrt(dist_sq, out=dist_sq))
+        poly_matrix = self._monomials((y - shift[:, np.newaxis]) / scale[:, np.newaxis]) * valid
+
+        size = self._padding_diag.shape[1]
+        lhs = np.zeros((self.n_joints, size, size))
+        lhs[:, :n_neighbors, :n_neighbors] = kernel_matrix * valid * valid.transpose(0, 2, 1)
+        lhs[:, :n_neighbors, n_neighbors:] = poly_matrix
+        lhs[:, n_neighbors:, :n_neighbors] = poly_matrix.transpose(0, 2, 1)
+        diag = np.einsum("jii->ji", lhs)
+        diag[:, :n_neighbors] += smoothing * self._valid
+        diag += self._padding_diag
+        rhs = np.zeros((self.n_joints, size, d.shape[2]))
+        rhs[:, :n_neighbors] = d * valid
+        coeffs = np.linalg.solve(lhs, rhs)
+
+        x_eps = x * self._epsilon[:, np.newaxis]
+        diff = y_eps - x_eps[:, np.newaxis]
+        kernel_values = self._kernel(np.sqrt(np.einsum("jnd,jnd->jn", diff, diff)))
+        monomials = self._monomials((x - shift) / scale)
+        vec = np.concatenate([kernel_values * self._valid, monomials], axis=1)
+        return np.matmul(vec[:, np.newaxis, :], coeffs)[:, 0, :]  # type: ignore[no-any-return]
+
+
+def _magmap_points(
+    joint: PoseEstimationInfo.MagInterpInfo.MagMapJointEntry,
+) -> tuple[npt.NDArray[np.double], npt.NDArray[np.double]]:
+    """Angles [points, 2] and B-fields [points, 12] of a joint's map"""
+    # flat lists are much cheaper to convert than a list of protobuf containers
+    angles_flat: list[float] = []
+    bfields_flat: list[float] = []
+    for point in joint.angle_bfield_points:
+        angles_flat.extend(point.angles_rad)
+        bfields_flat.extend(point.bfields_teslas)
+    n_points = len(joint.angle_bfield_points)
+    return np.reshape(angles_flat, (n_points, -1)), np.reshape(bfields_flat, (n_points, -1))
+
+
+def _magmap_axes(joint: PoseEstimationInfo.MagInterpInfo.MagMapJointEntry) -> tuple[str | None, str | None]:
+    return (
+        joint.axis0name if joint.HasField("axis0name") else None,
+        joint.axis1name if joint.HasField("axis1name") else None,
+    )
+
+
 class PoseEstimatorMagInterpol:
     """Joint angle estimator using RBF interpolator basing on mapping angle->Bfield
     from a selected file"""
@@ -57,8 +370,49 @@ class PoseEstimatorMagInterpol:
             self._indices = [axis_to_index(axes[0]), axis_to_index(axes[1])]
             self._angles = [0.0] * 3
 
+        # fitted state of a global interpolator, as set by RBFInterpolator.__init__
+        STATE_ARRAYS = ("y", "d", "smoothing", "powers", "_shift", "_scale", "_coeffs")
+
+        def state_arrays(self) -> dict[str, npt.NDArray[Any]]:
+            """Fitted state of the interpolator, which can be restored with `restore`.
+            NOTE: only global interpolators (without `neighbors`) are supported."""
+            if self.neighbors is not None:
+                raise ValueError("State of local RBF interpolators is not exported")
+            state = {name: getattr(self, name) for name in self.STATE_ARRAYS}
+            state["kernel"] = np.array(self.kernel)
+            state["epsilon"] = np.array(self.epsilon)
+            return state
+
+        @classmethod
+        def restore(
+            cls,
+            state: Mapping[str, npt.NDArray[Any]],
+            axes: tuple[str | Literal["X", "Y", "Z"] | None, str | Literal["X", "Y", "Z"] | None],
+        ) -> "PoseEstimatorMagInterpol.RBFInterpolatorProxy":
+            """Recreate an interpolator from `state_arrays`, without solving it again"""
+            self = cls.__new__(cls)
+            for name in cls.STATE_ARRAYS:
+                setattr(self, name, state[name])
+            self.kernel = str(state["kernel"])
+            self.epsilon = float(state["epsilon"])
+            self.neighbors = None
+            self.d_shape = self.d.shape[1:]
+            self.d_dtype = self.d.dtype
+            self._indices = [axis_to_index(axes[0]), axis_to_index(axes[1])]
+            self._angles = [0.0] * 3
+            return self
+
+        @property
+        def indices(self) -> list[Literal[0, 1, 2] | None]:
+            """Euler angle indices (XYZ) of the first and second interpolated angle"""
+            return self._indices
+
+        def interpolate_angles(self, B: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+            """Raw interpolated angles for a single B-field sample"""
+            return super().__call__(B.ravel()[np.newaxis, :]).ravel()  # type: ignore[no-any-return]
+
         def __call__(self, B: npt.NDArray[np.double]) -> R:
-            angles_interp = super().__call__(B.ravel()[np.newaxis, :]).ravel()
+            angles_interp = self.interpolate_angles(B)
             idx0 = self._indices[0]
             if idx0 is not None:
                 self._angles[idx0] = angles_interp[0]
@@ -73,26 +427,70 @@ class PoseEstimatorMagInterpol:
         nodeid_to_jnt_name: dict[int, str],
         filter_avg_samples: int = 8,
         filter_avg_use: bool = False,
+        bfield_filter: Optional[SignalFilter] = None,
     ) -> None:
-        self._node_to_jnt_name: dict[int, str] = nodeid_to_jnt_name
-
         self._interpolators: dict[
             Annotated[str, "joint name"], PoseEstimatorMagInterpol.RBFInterpolatorProxy
         ] = interpolators
+        self._fused: Optional[FusedRBFEvaluator | FusedLocalRBFEvaluator] = (
+            FusedRBFEvaluator.from_interpolators(list(interpolators.values()))
+            or FusedLocalRBFEvaluator.from_interpolators(list(interpolators.values()))
+        )
+        self._init_joints(
+            {joint_name: interp.indices for joint_name, interp in interpolators.items()},
+            nodeid_to_jnt_name,
+            filter_avg_samples,
+            filter_avg_use,
+            bfield_filter,
+        )
 
-        self._filter_avg_use: bool = filter_avg_use
-        self._filter_avg_samples: int = filter_avg_samples
-        assert self._filter_avg_samples > 0, "Filter samples number must be greater than zero"
-        self._filt_samples: deque[npt.NDArray[np.double]]
-        self._filt_joint_name_sequence: list[Annotated[str, "joint name"]]
-        self._filt_curr_state: npt.NDArray[np.double]
-        if self._filter_avg_use:
-            self._filt_samples = deque(
-                repeat(np.zeros((len(nodeid_to_jnt_name), 4, 3)), self._filter_avg_samples),
-                maxlen=self._filter_avg_samples,
-            )
-            self._filt_curr_state = np.zeros((len(nodeid_to_jnt_name), 4, 3))
-            self._filt_joint_name_sequence = list(self._interpolators.keys())
+    def _init_joints(
+        self,
+        joint_axes: dict[Annotated[str, "joint name"], Sequence[Literal[0, 1, 2] | None]],
+        nodeid_to_jnt_name: dict[int, str],
+        filter_avg_samples: int,
+        filter_avg_use: bool,
+        bfield_filter: Optional[SignalFilter],
+    ) -> None:
+        self._node_to_jnt_name: dict[int, str] = nodeid_to_jnt_name
+
+        # all joints are processed as rows of stacked arrays, in order of `joint_axes`
+        self._joint_names: list[Annotated[str, "joint name"]] = list(joint_axes.keys())
+        joint_rows = {joint_name: row for row, joint_name in enumerate(self._joint_names)}
+        self._node_rows: dict[int, int] = {
+            node_id: joint_rows[joint_name]
+            for node_id, joint_name in nodeid_to_jnt_name.items()
+            if joint_name in joint_rows
+        }
+        self._b_current = np.zeros((len(self._joint_names), 4 * 3))
+        # interpolated angles are scattered into XYZ euler angles, unused axes stay at zero
+        self._euler = np.zeros((len(self._joint_names), 3))
+        euler_rows, euler_cols, angle_cols = [], [], []
+        for row, indices in enumerate(joint_axes.values()):
+            for angle_col, euler_col in enumerate(indices):
+                if euler_col is not None:
+                    euler_rows.append(row)
+                    euler_cols.append(euler_col)
+                    angle_cols.append(angle_col)
+        self._euler_rows = np.array(euler_rows, dtype=np.intp)
+        self._euler_cols = np.array(euler_cols, dtype=np.intp)
+        self._angle_cols = np.array(angle_cols, dtype=np.intp)
+
+        # filter of B-fields of all joints, joints missing in a frame are filtered with their last B-field
+        if bfield_filter is None and filter_avg_use:
+            bfield_filter = MovingAverageFilter(filter_avg_samples)
+        self._bfield_filter: Optional[SignalFilter] = bfield_filter
+
+    @property
+    def joint_names(self) -> list[Annotated[str, "joint name"]]:
+        """Names of all joints handled by the estimator, in order of stacked results' rows"""
+        return self._joint_names
+
+    def reset_filter(self) -> None:
+        """Forget B-fields of previous frames, e.g. before estimating poses of another stream"""
+        self._b_current.fill(0.0)
+        if self._bfield_filter is not None:
+            self._bfield_filter.reset()
 
     @classmethod
     def from_maginterp_info(
@@ -100,24 +498,33 @@ class PoseEstimatorMagInterpol:
         info: PoseEstimationInfo,
         filter_avg_samples: int = 8,
         filter_avg_use: bool = False,
+        neighbors: Optional[int] = None,
+        state: Optional[Mapping[str, npt.NDArray[Any]]] = None,
+        bfield_filter: Optional[SignalFilter] = None,
     ) -> "PoseEstimatorMagInterpol":
-        """Create a magnetic interpolator from data obtained from state-store"""
+        """Create a magnetic interpolator from data obtained from state-store.
+        See `MagInterpolConfig.neighbors` for the meaning of `neighbors`.
+        Interpolators are restored from `state` (see `state_arrays`) instead of fitted, when given.
+        `bfield_filter` replaces the moving average enabled with `filter_avg_use`."""
         interpolators: dict[str, cls.RBFInterpolatorProxy] = {}
         nodeid_to_jnt_name: dict[int, str] = {}
 
         for joint_name, joint in info.maginterp.magmap.items():
-            angles = np.array([p.angles_rad for p in joint.angle_bfield_points])
-            bfields = np.array([p.bfields_teslas for p in joint.angle_bfield_points])
-            assert len(angles) == len(bfields)
-            interpolator_ext = cls.RBFInterpolatorProxy(
-                bfields,
-                angles,
-                axes=(
-                    joint.axis0name if joint.HasField("axis0name") else None,
-                    joint.axis1name if joint.HasField("axis1name") else None,
-                ),
-                kernel="linear",
-            )
+            if state is not None:
+                prefix = f"{joint_name}:"
+                interpolator_ext = cls.RBFInterpolatorProxy.restore(
+                    {name[len(prefix) :]: arr for name, arr in state.items() if name.startswith(prefix)},
+                    axes=_magmap_axes(joint),
+                )
+            else:
+                angles, bfields = _magmap_points(joint)
+                interpolator_ext = cls.RBFInterpolatorProxy(
+                    bfields,
+                    angles,
+                    axes=_magmap_axes(joint),
+                    kernel="linear",
+                    neighbors=neighbors,
+                )
             interpolators[joint_name] = interpolator_ext
             nodeid_to_jnt_name[joint.gauss_rider_id] = joint_name
 
@@ -126,46 +533,335 @@ class PoseEstimatorMagInterpol:
             nodeid_to_jnt_name,
             filter_avg_samples,
             filter_avg_use,
+            bfield_filter,
         )
 
-    def _filter_avg(self, b_new: dict[Annotated[str, "joint_name"], np.ndarray]) -> dict[str, np.ndarray]:
-        # if needed use substract-add algorithm
-        # though I'm not sure it'd be more efficient than plain numpy mean
-        bs = (
-            np.array(
-                [
-                    b_new[joint_name] if joint_name in b_new else self._filt_samples[idx][-1]
-                    for idx, joint_name in enumerate(self._filt_joint_name_sequence)
-                ]
-            )
-            / self._filter_avg_samples
-        )
-        self._filt_curr_state -= self._filt_samples[0]
-        self._filt_samples.append(bs)
-        self._filt_curr_state += bs
+    def state_arrays(self) -> dict[str, npt.NDArray[Any]]:
+        """Built state of the estimator, which can be passed to `from_maginterp_info` to skip
+        building it. Empty when the estimator has nothing worth storing (local interpolators)."""
+        if any(interp.neighbors is not None for interp in self._interpolators.values()):
+            return {}
         return {
-            joint_name: self._filt_curr_state[idx]
-            for idx, joint_name in enumerate(self._filt_joint_name_sequence)
+            f"{joint_name}:{name}": arr
+            for joint_name, interp in self._interpolators.items()
+            for name, arr in interp.state_arrays().items()
         }
 
-    def get_rotations_dict(self, B_tot: Mapping[int, Bfield]) -> dict[Annotated[str, "joint name"], R]:
-        """Returns angles in radians for each sensor by its id."""
+    def _interpolate_angles(self, B: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+        if self._fused is not None:
+            return self._fused(B)
+        # interpolators which cannot be fused are evaluated one by one
+        return np.stack(
+            [interp.interpolate_angles(B[row]) for row, interp in enumerate(self._interpolators.values())]
+        )
+
+    def get_rotations_stacked(
+        self, B_tot: Mapping[int, Bfield], timestamp: Optional[float] = None
+    ) -> tuple[list[Annotated[str, "joint name"]], R]:
+        """Estimate rotations of all joints, whose B-fields are present in `B_tot` (of all joints
+        when B-fields are filtered) at once. Returns joint names and a stacked `Rotation`
+        with rows in order of the names. `timestamp` (seconds) of the frame is used by
+        time aware filters."""
         # pylint: disable=invalid-name
-        angle_dict = {}
-        B_arr = {
-            self._node_to_jnt_name[node_id]: np.asarray(B.bfield, dtype=np.double).reshape(4, 3)
-            for node_id, B in B_tot.items()
-            if node_id in self._node_to_jnt_name
-        }
-        if self._filter_avg_use:
-            B_filtered = self._filter_avg(B_arr)
+        rows = []
+        values: list[float] = []
+        for node_id, B in B_tot.items():
+            row = self._node_rows.get(node_id)
+            if row is not None:
+                rows.append(row)
+                values.extend(B.bfield)
+        if rows:
+            self._b_current[rows] = np.reshape(values, (len(rows), 4 * 3))
+
+        if self._bfield_filter is not None:
+            B_filtered = self._bfield_filter(self._b_current, timestamp)
+            rows = list(range(len(self._joint_names)))
+        elif not rows:
+            return [], R.identity(0)
         else:
-            B_filtered = B_arr
+            B_filtered = self._b_current
+
+        angles = self._interpolate_angles(B_filtered)
+        self._euler[self._euler_rows, self._euler_cols] = angles[self._euler_rows, self._angle_cols]
+        if len(rows) == len(self._joint_names):
+            return list(self._joint_names), R.from_euler("XYZ", self._euler, degrees=True)
+        rows.sort()
+        return [self._joint_names[row] for row in rows], R.from_euler("XYZ", self._euler[rows], degrees=True)
+
+    def get_rotations_dict(
+        self, B_tot: Mapping[int, Bfield], timestamp: Optional[float] = None
+    ) -> dict[Annotated[str, "joint name"], R]:
+        """Returns rotations of joints (see `get_rotations_stacked`) by joint name."""
+        # pylint: disable=invalid-name
+        joint_names, rotations = self.get_rotations_stacked(B_tot, timestamp)
+        return {joint_name: rotations[row] for row, joint_name in enumerate(joint_names)}
+
+
+# maps larger than this are densified with a local forward model (if `neighbors` is not given),
+# as a global one needs a dense solve of size of the map
+LUT_GLOBAL_FORWARD_MAX_POINTS = 2000
+LUT_FORWARD_NEIGHBORS = 64
+
+
+@dataclass
+class MagLUT:
+    """Dense inverse lookup tables (B-field -> angles) of all joints, stacked and padded
+    to the same number of points."""
+
+    angles: npt.NDArray[np.double]  # [joints, points, 2], angles at grid points
+    bfields: npt.NDArray[np.double]  # [joints, points, 12], B-fields at grid points
+    inv_jacobians: npt.NDArray[np.double]  # [joints, points, 2, 12], d(angles)/d(B-field) at grid points
+    steps: npt.NDArray[np.double]  # [joints, 2], grid spacing, bounds the local refinement
+    padding: npt.NDArray[np.double]  # [joints, points], zero for grid points, inf for padding
+
+    @staticmethod
+    def build_joint(
+        angles: npt.NDArray[np.double],
+        bfields: npt.NDArray[np.double],
+        max_points: int,
+        neighbors: Optional[int] = None,
+    ) -> tuple[npt.NDArray[np.double], ...]:
+        """Build a lookup table of a single joint from its map points: angles [points, 2]
+        and B-fields [points, 12]. Returns angles, B-fields and inverse jacobians at grid
+        points, and grid spacing (as in `MagLUT` fields, without the joints dimension).
+
+        Map is densified with a forward (angles -> B-field) RBF model evaluated on a regular
+        grid spanning sampled angles, limited to `max_points` points. Only grid points close
+        to sampled angles are kept, as the model is not reliable far from them."""
+        n_angles = angles.shape[1]
+        n_bfields = bfields.shape[1]
+        steps = np.zeros(n_angles)
+        varying = np.flatnonzero(np.ptp(angles, axis=0) > 0)
+        if len(varying) == 0 or len(angles) < 2:
+            # joint does not move, the table is a single point
+            return (
+                angles[:1].copy(),
+                bfields.mean(axis=0, keepdims=True),
+                np.zeros((1, n_angles, n_bfields)),
+                steps,
+            )
+
+        lo = angles.min(axis=0)
+        ranges = np.ptp(angles[:, varying], axis=0)
+        # grid spacing proportional in all dimensions, at least 2 points per dimension
+        spacing = (np.prod(ranges) / max(max_points, 2 ** len(varying))) ** (1 / len(varying))
+        counts = np.maximum(np.floor(ranges / spacing).astype(int) + 1, 2)
+        while np.prod(counts) > max_points and counts.max() > 2:
+            counts[np.argmax(counts)] -= 1
+        axes = [
+            np.linspace(lo[dim], lo[dim] + rng, count) for dim, rng, count in zip(varying, ranges, counts)
+        ]
+        grid = np.tile(lo, (int(np.prod(counts)), 1))
+        grid[:, varying] = np.stack([mesh.ravel() for mesh in np.meshgrid(*axes, indexing="ij")], axis=1)
+
+        if neighbors is None and len(angles) > LUT_GLOBAL_FORWARD_MAX_POINTS:
+            neighbors = LUT_FORWARD_NEIGHBORS
+        try:
+            forward = interpolate.RBFInterpolator(
+                angles[:, varying], bfields, kernel="thin_plate_spline", neighbors=neighbors
+            )
+        except np.linalg.LinAlgError:
+            # too few (or degenerate) points for the polynomial part
+            forward = interpolate.RBFInterpolator(
+                angles[:, varying], bfields, kernel="linear", neighbors=neighbors
+            )
+        grid_bfields = forward(grid[:, varying])
+
+        steps[varying] = [axis[1] - axis[0] for axis in axes]
+        gradients = np.gradient(
+            grid_bfields.reshape(*counts, n_bfields), *steps[varying], axis=tuple(range(len(varying)))
+        )
+        if len(varying) == 1:
+            gradients = [gradients]
+        jacobians = np.stack([gradient.reshape(-1, n_bfields) for gradient in gradients], axis=-1)
+        inv_jacobians = np.zeros((len(grid), n_angles, n_bfields))
+        inv_jacobians[:, varying] = np.linalg.pinv(jacobians)
+
+        # keep grid points not further from sampled angles than sampled angles are from each other
+        samples_tree = spatial.cKDTree(angles[:, varying] / ranges)
+        sample_gaps, _ = samples_tree.query(angles[:, varying] / ranges, k=2)
+        max_distance = max(sample_gaps[:, 1].max(), np.linalg.norm(steps[varying] / ranges))
+        grid_distances, _ = samples_tree.query(grid[:, varying] / ranges)
+        keep = grid_distances <= max_distance
+        return grid[keep], grid_bfields[keep], inv_jacobians[keep], steps
+
+    @classmethod
+    def stack(cls, joint_tables: Sequence[tuple[npt.NDArray[np.double], ...]]) -> "MagLUT":
+        """Stack lookup tables built with `build_joint`"""
+        n_joints = len(joint_tables)
+        n_points = max(len(angles) for angles, *_ in joint_tables)
+        n_angles, n_bfields = joint_tables[0][2].shape[1:]
+        lut = cls(
+            angles=np.zeros((n_joints, n_points, n_angles)),
+            bfields=np.zeros((n_joints, n_points, n_bfields)),
+            inv_jacobians=np.zeros((n_joints, n_points, n_angles, n_bfields)),
+            steps=np.zeros((n_joints, n_angles)),
+            padding=np.full((n_joints, n_points), np.inf),
+        )
+        for row, (angles, bfields, inv_jacobians, steps) in enumerate(joint_tables):
+            count = len(angles)
+            lut.angles[row, :count] = angles
+            lut.bfields[row, :count] = bfields
+            lut.inv_jacobians[row, :count] = inv_jacobians
+            lut.steps[row] = steps
+            lut.padding[row, :count] = 0.0
+        return lut
+
+
+class PoseEstimatorMagLUT(PoseEstimatorMagInterpol):
+    """Joint angle estimator using precomputed inverse lookup tables instead of evaluating
+    RBF on every frame. Angles are taken from the table point nearest (in B-field space) to
+    the measured B-field, refined with a local linear model of the mapping around that point.
+
+    Evaluation cost does not depend on the size of the magnetic map, only on `max_points`
+    of the tables, which also bounds the memory used."""
+
+    def __init__(  # pylint: disable=super-init-not-called
+        self,
+        lut: MagLUT,
+        joint_axes: dict[Annotated[str, "joint name"], Sequence[Literal[0, 1, 2] | None]],
+        nodeid_to_jnt_name: dict[int, str],
+        filter_avg_samples: int = 8,
+        filter_avg_use: bool = False,
+        bfield_filter: Optional[SignalFilter] = None,
+    ) -> None:
+        self._lut = lut
+        # transposed copy for the nearest point search, as batched vector-matrix products are faster
+        self._lut_bfields_t = np.ascontiguousarray(lut.bfields.transpose(0, 2, 1))
+        self._lut_bfields_sq = np.einsum("jnd,jnd->jn", lut.bfields, lut.bfields) + lut.padding
+        self._lut_rows = np.arange(len(joint_axes))
+        self._init_joints(joint_axes, nodeid_to_jnt_name, filter_avg_samples, filter_avg_use, bfield_filter)
+
+    @property
+    def lut(self) -> MagLUT:
+        """Lookup tables of all joints, rows in order of `joint_names`"""
+        return self._lut
+
+    @classmethod
+    def from_maginterp_info(
+        cls,
+        info: PoseEstimationInfo,
+        filter_avg_samples: int = 8,
+        filter_avg_use: bool = False,
+        neighbors: Optional[int] = None,
+        state: Optional[Mapping[str, npt.NDArray[Any]]] = None,
+        bfield_filter: Optional[SignalFilter] = None,
+        max_points: int = 1024,
+    ) -> "PoseEstimatorMagLUT":
+        """Create a lookup table estimator from data obtained from state-store.
+        `neighbors` is used by the forward RBF model densifying the map (see `MagInterpolConfig`),
+        `max_points` limits the grid of each joint's table (see `MagInterpolConfig.lut_max_points`).
+        Tables are restored from `state` (see `state_arrays`) instead of built, when given."""
+        joint_tables = []
+        joint_axes: dict[str, Sequence[Literal[0, 1, 2] | None]] = {}
+        nodeid_to_jnt_name: dict[int, str] = {}
+        magmap = info.maginterp.magmap
+        # rows of restored tables follow the stored joint order
+        joint_names = list(magmap.keys()) if state is None else [str(name) for name in state["joint_names"]]
+        if set(joint_names) != set(magmap.keys()):
+            raise ValueError("Lookup tables do not match joints of the magnetic map")
+        for joint_name in joint_names:
+            joint = magmap[joint_name]
+            if state is None:
+                angles, bfields = _magmap_points(joint)
+                joint_tables.append(MagLUT.build_joint(angles, bfields, max_points, neighbors))
+            axes = _magmap_axes(joint)
+            joint_axes[joint_name] = [axis_to_index(axes[0]), axis_to_index(axes[1])]
+            nodeid_to_jnt_name[joint.gauss_rider_id] = joint_name
+
+        lut = (
+            MagLUT.stack(joint_tables)
+            if state is None
+            else MagLUT(**{field.name: state[field.name] for field in fields(MagLUT)})
+        )
+        return cls(lut, joint_axes, nodeid_to_jnt_name, filter_avg_samples, filter_avg_use, bfield_filter)
+
+    def state_arrays(self) -> dict[str, npt.NDArray[Any]]:
+        """Lookup tables, which can be passed to `from_maginterp_info` to skip building them"""
+        return {
+            "joint_names": np.array(self._joint_names),
+            **{field.name: getattr(self._lut, field.name) for field in fields(MagLUT)},
+        }
+
+    def _interpolate_angles(self, B: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+        lut = self._lut
+        rows = self._lut_rows
+        # nearest table point, |b - B|^2 without the constant |B|^2 term
+        dist = np.matmul(B[:, np.newaxis, :], self._lut_bfields_t)[:, 0, :]
+        dist *= -2.0
+        dist += self._lut_bfields_sq
+        nearest = np.argmin(dist, axis=1)
+
+        delta = np.matmul(
+            lut.inv_jacobians[rows, nearest], (B - lut.bfields[rows, nearest])[:, :, np.newaxis]
+        )
+        delta = np.clip(delta[:, :, 0], -lut.steps, lut.steps)
+        return lut.angles[rows, nearest] + delta  # type: ignore[no-any-return]
+
+
+def bfield_filter_from_config(config: MagInterpolConfig) -> Optional[SignalFilter]:
+    """Create a B-field filter selected in `config`, None when filtering is disabled"""
+    if not config.filter_avg_use:
+        return None
+    if config.filter_type == "moving_average":
+        return MovingAverageFilter(config.filter_avg_samples)
+    if config.filter_type == "ema":
+        return ExponentialMovingAverageFilter(config.filter_ema_alpha)
+    if config.filter_type == "one_euro":
+        return OneEuroFilter(
+            config.filter_one_euro_min_cutoff, config.filter_one_euro_beta, config.filter_one_euro_d_cutoff
+        )
+    raise ValueError(f"Unknown B-field filter type '{config.filter_type}'")
+
+
+def _build_pose_estimator(
+    info: PoseEstimationInfo,
+    config: MagInterpolConfig,
+    state: Optional[Mapping[str, npt.NDArray[Any]]] = None,
+) -> PoseEstimatorMagInterpol:
+    if config.backend == "lut":
+        return PoseEstimatorMagLUT.from_maginterp_info(
+            info,
+            filter_avg_samples=config.filter_avg_samples,
+            filter_avg_use=config.filter_avg_use,
+            neighbors=config.neighbors,
+            max_points=config.lut_max_points,
+            state=state,
+            bfield_filter=bfield_filter_from_config(config),
+        )
+    if config.backend == "rbf":
+        return PoseEstimatorMagInterpol.from_maginterp_info(
+            info,
+            filter_avg_samples=config.filter_avg_samples,
+            filter_avg_use=config.filter_avg_use,
+            neighbors=config.neighbors,
+            state=state,
+            bfield_filter=bfield_filter_from_config(config),
+        )
+    raise ValueError(f"Unknown pose estimator backend '{config.backend}'")
+
+
+def pose_estimator_from_config(
+    info: PoseEstimationInfo, config: MagInterpolConfig
+) -> PoseEstimatorMagInterpol:
+    """Create a magnetic pose estimator with the backend selected in `config`.
+    When `config.cache_dir` is set, built estimator is reused from (or stored in) the cache."""
+    if config.cache_dir is None:
+        return _build_pose_estimator(info, config)
 
-        for joint_name, B in B_filtered.items():
-            interpol = self._interpolators.get(joint_name, None)
-            if interpol is None:
-                continue
-            angle_dict[joint_name] = interpol(B.ravel()[np.newaxis, :])
+    key = estimator_cache.cache_key(
+        info,
+        {"backend": config.backend, "neighbors": config.neighbors, "lut_max_points": config.lut_max_points},
+    )
+    state = estimator_cache.load(config.cache_dir, key)
+    if state is not None:
+        try:
+            return _build_pose_estimator(info, config, state)
+        except (KeyError, ValueError) as err:
+            L.warning("Cached pose estimator does not match the magnetic map, rebuilding: %s", err)
 
-        return angle_dict
+    estimator = _build_pose_estimator(info, config)
+    state = estimator.state_arrays()
+    if state:
+        estimator_cache.store(config.cache_dir, key, state)
+    return estimator
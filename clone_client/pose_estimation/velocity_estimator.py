@@ -0,0 +1,147 @@
+"""Estimation of joint angular velocities from consecutive joint rotations."""
+
+from dataclasses import dataclass
+from typing import Annotated, Literal, Optional
+
+import numpy as np
+import numpy.typing as npt
+from scipy.spatial.transform import Rotation as R  # type: ignore
+
+
+class VelocityEstimator:
+    """Stateful estimator of joint angular velocities (as Vector3, rad/s).
+
+    It keeps its own history of joint rotations, so each telemetry stream should use
+    a separate instance - frames of different streams must not be mixed in one estimator.
+
+    Available methods:
+    - "finite_difference" - rotation between the last two frames divided by their time difference,
+    - "savgol" - Savitzky-Golay differentiator: polynomial of order `polyorder` is fitted (in least
+      squares sense, using actual timestamps) to the last `window` rotations expressed relative to
+      the current one, its derivative at the current frame is the velocity.
+    """
+
+    @dataclass
+    class Config:
+        """Configuration of velocity estimation"""
+
+        method: Literal["finite_difference", "savgol"] = "finite_difference"
+        window: int = 5  # number of frames (including the current one) used by "savgol"
+        polyorder: int = 2  # order of polynomial fitted by "savgol"
+
+    def __init__(self, config: Optional[Config] = None) -> None:
+        config = config or VelocityEstimator.Config()
+        if config.method not in ("finite_difference", "savgol"):
+            raise ValueError(f"Unknown velocity estimation method '{config.method}'")
+        if config.method == "savgol" and not 0 < config.polyorder < config.window:
+            raise ValueError("Savitzky-Golay requires 0 < polyorder < window")
+        self._config = config
+        history_len = config.window if config.method == "savgol" else 2
+        self._history_timestamps = np.zeros(history_len)
+        self._history_quats: npt.NDArray[np.double] = np.zeros((history_len, 0, 4))
+        self._history_count = 0
+        self._joint_names: list[Annotated[str, "joint name"]] = []
+        self._last_rotations: Optional[R] = None  # type: ignore[no-any-unimported]
+        self._last_velocities: npt.NDArray[np.double] = np.zeros((0, 3))
+
+    @property
+    def config(self) -> Config:
+        """Configuration the estimator was created with"""
+        return self._config
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        """Timestamp of the last frame, None if there was none yet"""
+        if self._history_count == 0:
+            return None
+        return float(self._history_timestamps[-1])
+
+    @property
+    def last_joint_names(self) -> list[str]:
+        """Joint names of the last frame"""
+        return self._joint_names
+
+    @property
+    def last_rotations(self) -> Optional[R]:  # type: ignore[no-any-unimported]
+        """Stacked joint rotations of the last frame"""
+        return self._last_rotations
+
+    @property
+    def last_velocities(self) -> npt.NDArray[np.double]:
+        """Velocities [joints, 3] estimated for the last frame"""
+        return self._last_velocities
+
+    def reset(self) -> None:
+        """Forget the history"""
+        self._history_count = 0
+        self._joint_names = []
+        self._last_rotations = None
+        self._last_velocities = np.zeros((0, 3))
+
+    def update(
+        self,
+        timestamp: float,
+        joint_names: list[str],
+        rotations: R,  # type: ignore[no-any-unimported]
+    ) -> npt.NDArray[np.double]:
+        """Add a frame of stacked joint rotations (rows in order of `joint_names`) and return
+        estimated velocities [joints, 3]. A frame with the same timestamp as the last one is
+        considered to be a repeated frame and the last velocities are returned."""
+        if self._history_count > 0 and timestamp == self._history_timestamps[-1]:
+            return self._last_velocities
+
+        quats = rotations.as_quat()
+        if quats.ndim == 1:
+            quats = quats[np.newaxis, :]
+        if joint_names != self._joint_names:
+            self._align_history(joint_names, quats)
+
+        self._history_timestamps[:-1] = self._history_timestamps[1:]
+        self._history_timestamps[-1] = timestamp
+        self._history_quats[:-1] = self._history_quats[1:]
+        self._history_quats[-1] = quats
+        self._history_count = min(self._history_count + 1, len(self._history_timestamps))
+
+        if self._history_count == 1 or len(joint_names) == 0:
+            velocities = np.zeros((len(joint_names), 3))
+        elif self._config.method == "finite_difference" or self._history_count == 2:
+            velocities = self._finite_difference(rotations)
+        else:
+            velocities = self._savgol(quats)
+
+        self._last_rotations = rotations
+        self._last_velocities = velocities
+        return velocities
+
+    def _align_history(self, joint_names: list[str], quats: npt.NDArray[np.double]) -> None:
+        # joints set or their order changed - reorder history by joint name,
+        # joints without history get the current rotation (i.e. zero velocity)
+        history = np.broadcast_to(quats, (len(self._history_timestamps), *quats.shape)).copy()
+        last_rows = {joint_name: row for row, joint_name in enumerate(self._joint_names)}
+        rows = [last_rows.get(joint_name, -1) for joint_name in joint_names]
+        known = [idx for idx, row in enumerate(rows) if row >= 0]
+        if known:
+            history[:, known] = self._history_quats[:, [rows[idx] for idx in known]]
+        self._history_quats = history
+        self._joint_names = list(joint_names)
+
+    def _finite_difference(self, rotations: R) -> npt.NDArray[np.double]:  # type: ignore[no-any-unimported]
+        dt = self._history_timestamps[-1] - self._history_timestamps[-2]
+        last_rotations = R.from_quat(self._history_quats[-2])
+        return (rotations * last_rotations.inv()).as_rotvec() / dt  # type: ignore[no-any-return]
+
+    def _savgol(self, quats: npt.NDArray[np.double]) -> npt.NDArray[np.double]:
+        count = self._history_count
+        n_joints = quats.shape[0]
+        history_quats = self._history_quats[-count:]
+        # rotations of past frames relative to the current one, [count, joints, 3]
+        relative = (
+            R.from_quat(history_quats.reshape(-1, 4)) * R.from_quat(np.tile(quats, (count, 1))).inv()
+        ).as_rotvec()
+        # least squares polynomial fit in time relative to the current frame,
+        # derivative at the current frame is the coefficient of the linear term
+        taus = self._history_timestamps[-count:] - self._history_timestamps[-1]
+        order = min(self._config.polyorder, count - 1)
+        vander = np.vander(taus, order + 1, increasing=True)
+        derivative_weights = np.linalg.pinv(vander)[1]
+        return (derivative_weights @ relative.reshape(count, n_joints * 3)).reshape(n_joints, 3)
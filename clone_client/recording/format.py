@@ -0,0 +1,212 @@
+"""Binary format of telemetry recordings.
+
+A recording is an append-only file made of a header and a sequence of chunks::
+
+    header: MAGIC | u32 format version | u32 JSON length | JSON | padding to ALIGNMENT
+    chunk:  CHUNK_MAGIC | u32 number of frames | padding to ALIGNMENT
+            column 0 [frames, *shape] | padding | column 1 ... | padding to ALIGNMENT
+
+When nodes or joints which are not part of the layout appear during recording, another
+header with the layout extended by them is written, and chunks after it follow that header.
+Each header's layout includes all nodes and joints of the previous ones.
+
+JSON describes the layout of frames (which rows of per-node columns belong to which node),
+the columns (name, dtype, shape of a single frame) and `SystemInfo` of the recorded system.
+All columns are stored little-endian in C order and aligned, so a recording can be
+memory-mapped and each column of a chunk used as an array directly. Chunks may hold fewer
+frames than others (e.g. ones flushed on timeout or at the end), a truncated last chunk
+(of an interrupted recording) is ignored by readers.
+"""
+
+import base64
+from dataclasses import dataclass, field
+import json
+import struct
+import time
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from clone_client.proto.state_store_pb2 import SystemInfo
+from clone_client.state_store.telemetry_arrays import GAUSS_RIDER_RAW_LEN
+
+MAGIC = b"CLONEREC"
+FORMAT_VERSION = 1
+CHUNK_MAGIC = b"CHNK"
+ALIGNMENT = 64
+
+_HEADER_PREFIX = struct.Struct("<8sII")
+_CHUNK_HEADER = struct.Struct("<4sI")
+# columns with a row per node or joint -> attribute of `RecordingHeader` listing them
+_LAYOUT_KEYS = {
+    "imu_quats": "imu_node_ids",
+    "gauss_raw": "gauss_rider_node_ids",
+    "bfields": "gauss_rider_node_ids",
+    "pose_quats": "joint_names",
+}
+
+
+def align(size: int) -> int:
+    """Round `size` up to a multiple of `ALIGNMENT`"""
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+@dataclass(frozen=True)
+class Column:
+    """Column of a recording, `shape` is the shape of a single frame's value"""
+
+    name: str
+    dtype: str  # numpy little-endian type string, e.g. "<f4"
+    shape: tuple[int, ...]
+
+    @property
+    def frame_nbytes(self) -> int:
+        """Size of a single frame's value in bytes"""
+        return int(np.dtype(self.dtype).itemsize * np.prod(self.shape, dtype=np.int64))
+
+
+@dataclass
+class RecordingHeader:
+    """Layout of recorded frames"""
+
+    n_muscles: int
+    imu_node_ids: list[int]
+    gauss_rider_node_ids: list[int]
+    joint_names: list[str]  # rows of `pose_quats`
+    system_info: Optional[SystemInfo] = None
+    created: float = field(default_factory=time.time)  # UNIX time
+    columns: list[Column] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if not self.columns:
+            self.columns = self.default_columns()
+
+    def default_columns(self) -> list[Column]:
+        """Columns of telemetry frames: timestamps, muscle pressures, IMU quaternions,
+        raw GaussRider data, B-fields and quaternions of joints estimated by the server"""
+        n_imu = len(self.imu_node_ids)
+        n_gr = len(self.gauss_rider_node_ids)
+        return [
+            Column("timestamps", "<f8", ()),
+            Column("pressures", "<f4", (self.n_muscles,)),
+            Column("imu_quats", "<f4", (n_imu, 4)),
+            Column("gauss_raw", "<i2", (n_gr, GAUSS_RIDER_RAW_LEN)),
+            Column("bfields", "<f8", (n_gr, 4, 3)),
+            Column("pose_quats", "<f8", (len(self.joint_names), 4)),
+        ]
+
+    def layout_rows(self, other: "RecordingHeader", column: str) -> Optional[npt.NDArray[np.intp]]:
+        """Rows of `other`'s layout, which rows of `column` of this header's layout correspond to
+        (None for columns without rows of nodes or joints). `other` must extend this layout."""
+        keys_attr = _LAYOUT_KEYS.get(column)
+        if keys_attr is None:
+            return None
+        other_rows = {key: row for row, key in enumerate(getattr(other, keys_attr))}
+        try:
+            return np.array([other_rows[key] for key in getattr(self, keys_attr)], dtype=np.intp)
+        except KeyError as err:
+            raise ValueError(f"Layout of telemetry recording does not include {keys_attr} {err}") from err
+
+    def column_offsets(self, n_frames: int) -> list[int]:
+        """Offsets of columns relative to the start of a chunk of `n_frames` frames"""
+        offsets = []
+        offset = align(_CHUNK_HEADER.size)
+        for column in self.columns:
+            offsets.append(offset)
+            offset = align(offset + n_frames * column.frame_nbytes)
+        return offsets
+
+    def chunk_nbytes(self, n_frames: int) -> int:
+        """Size of a whole chunk of `n_frames` frames, including padding"""
+        offset = align(_CHUNK_HEADER.size)
+        for column in self.columns:
+            offset = align(offset + n_frames * column.frame_nbytes)
+        return offset
+
+    def to_bytes(self) -> bytes:
+        """Serialize the header, including padding"""
+        meta: dict[str, Any] = {
+            "n_muscles": self.n_muscles,
+            "imu_node_ids": self.imu_node_ids,
+            "gauss_rider_node_ids": self.gauss_rider_node_ids,
+            "joint_names": self.joint_names,
+            "created": self.created,
+            "columns": [
+                {"name": column.name, "dtype": column.dtype, "shape": list(column.shape)}
+                for column in self.columns
+            ],
+            "system_info": (
+                None
+                if self.system_info is None
+                else base64.b64encode(self.system_info.SerializeToString(deterministic=True)).decode()
+            ),
+        }
+        payload = json.dumps(meta).encode()
+        raw = _HEADER_PREFIX.pack(MAGIC, FORMAT_VERSION, len(payload)) + payload
+        return raw.ljust(align(len(raw)), b"\0")
+
+    @classmethod
+    def from_bytes(cls, data: bytes | memoryview, offset: int = 0) -> tuple["RecordingHeader", int]:
+        """Parse a header starting at `offset` (the beginning of a recording by default).
+        Returns the header and the offset of the first chunk following it."""
+        if len(data) < offset + _HEADER_PREFIX.size:
+            raise ValueError("Not a telemetry recording: file too short")
+        magic, version, length = _HEADER_PREFIX.unpack_from(data, offset)
+        if magic != MAGIC:
+            raise ValueError("Not a telemetry recording: bad magic")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported telemetry recording version {version}")
+        start = offset + _HEADER_PREFIX.size
+        end = start + length
+        if len(data) < end:
+            raise ValueError("Telemetry recording header is truncated")
+        meta = json.loads(bytes(data[start:end]))
+
+        system_info = None
+        if meta["system_info"] is not None:
+            system_info = SystemInfo()
+            system_info.ParseFromString(base64.b64decode(meta["system_info"]))
+        header = cls(
+            n_muscles=meta["n_muscles"],
+            imu_node_ids=meta["imu_node_ids"],
+            gauss_rider_node_ids=meta["gauss_rider_node_ids"],
+            joint_names=meta["joint_names"],
+            system_info=system_info,
+            created=meta["created"],
+            columns=[Column(col["name"], col["dtype"], tuple(col["shape"])) for col in meta["columns"]],
+        )
+        return header, align(end)
+
+
+def is_header(data: bytes | memoryview, offset: int) -> bool:
+    """Whether a header (rather than a chunk) starts at `offset`"""
+    return bytes(data[offset : offset + len(MAGIC)]) == MAGIC
+
+
+def chunk_header(n_frames: int) -> bytes:
+    """Serialized header of a chunk, including padding"""
+    return _CHUNK_HEADER.pack(CHUNK_MAGIC, n_frames).ljust(align(_CHUNK_HEADER.size), b"\0")
+
+
+def parse_chunk_header(data: bytes | memoryview, offset: int) -> int:
+    """Number of frames of the chunk starting at `offset`"""
+    magic, n_frames = _CHUNK_HEADER.unpack_from(data, offset)
+    if magic != CHUNK_MAGIC:
+        raise ValueError(f"Corrupted telemetry recording: bad chunk magic at offset {offset}")
+    return int(n_frames)
+
+
+def column_arrays(
+    header: RecordingHeader, data: bytes | memoryview, offset: int, n_frames: int
+) -> dict[str, np.ndarray]:
+    """Views of columns of the chunk of `n_frames` frames starting at `offset` in `data`"""
+    return {
+        column.name: np.frombuffer(
+            data,
+            dtype=np.dtype(column.dtype),
+            count=n_frames * int(np.prod(column.shape, dtype=np.int64)),
+            offset=offset + column_offset,
+        ).reshape((n_frames, *column.shape))
+        for column, column_offset in zip(header.columns, header.column_offsets(n_frames))
+    }
@@ -0,0 +1,382 @@
+"""Recording of telemetry into binary columnar files (see `clone_client.recording.format`)."""
+
+from collections import deque
+from dataclasses import dataclass
+import logging
+from pathlib import Path
+import threading
+import time
+from types import TracebackType
+from typing import Annotated, Iterable, Mapping, Optional, Type, TYPE_CHECKING
+
+import numpy as np
+import numpy.typing as npt
+
+from clone_client.hw_driver.client import ProductId
+from clone_client.proto.state_store_pb2 import SystemInfo, TelemetryData
+from clone_client.recording.format import chunk_header, RecordingHeader
+from clone_client.state_store.telemetry_arrays import (
+    bus_node_ids,
+    BusNode,
+    TelemetryArrays,
+    TelemetryArraysDecoder,
+)
+
+if TYPE_CHECKING:
+    from clone_client.state_store.client import StateStoreClient
+    from clone_client.state_store.sync.client import (
+        StateStoreClient as StateStoreClientSync,
+    )
+
+L = logging.getLogger(__name__)
+
+
+@dataclass
+class _Chunk:
+    header: RecordingHeader  # layout of `columns`
+    columns: dict[str, npt.NDArray[np.generic]]  # [chunk_frames, *shape] each
+    n_frames: int = 0
+    started: float = 0.0  # monotonic time of the first frame
+
+
+class TelemetryRecorder:
+    """Recorder of telemetry frames into a file.
+
+    Frames are decoded into columns of preallocated chunks, which are written to the file
+    by a background thread when full, or when `flush_interval` seconds passed since their
+    first frame, even when no more frames come. At most `max_chunks` chunks are allocated,
+    so memory use is bounded. When all of them wait for the disk, `write` blocks until one
+    is written (and counts a stall), so frames are never dropped.
+
+    Layout of frames is taken from `system_info` and `nodes` (`HWDriverClient.get_nodes`),
+    when given, and from the first frame. When nodes or joints which are not part of it appear
+    later, the layout is extended by them and a new header is written before further chunks
+    (see `clone_client.recording.format`), so no data are lost.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        path: str | Path,
+        system_info: Optional[SystemInfo] = None,
+        chunk_frames: int = 1024,
+        max_chunks: int = 16,
+        flush_interval: float = 1.0,
+        nodes: Optional[Mapping[str, Iterable[BusNode]]] = None,
+    ) -> None:
+        if chunk_frames <= 0 or max_chunks <= 0:
+            raise ValueError("Chunk size and number of chunks must be greater than zero")
+        self._path = Path(path)
+        self._system_info = system_info
+        self._nodes = nodes
+        self._chunk_frames = chunk_frames
+        self._max_chunks = max_chunks
+        self._flush_interval = flush_interval
+
+        self._decoder: Optional[TelemetryArraysDecoder] = None
+        self._header: Optional[RecordingHeader] = None
+        self._joint_rows: dict[Annotated[str, "joint name"], int] = {}
+
+        # chunks are passed between `write` and the writer thread under `_cond`
+        self._cond = threading.Condition()
+        self._chunk: Optional[_Chunk] = None
+        self._allocated_chunks = 0
+        self._free_chunks: list[_Chunk] = []
+        self._full_chunks: deque[_Chunk] = deque()
+        self._closed = False
+        self._writer_error: Optional[BaseException] = None
+        self._file = open(self._path, "wb")  # pylint: disable=consider-using-with
+        self._writer = threading.Thread(target=self._write_chunks, name="telemetry_recorder", daemon=True)
+        self._writer.start()
+
+        self._frames = 0
+        self._stalls = 0
+
+    @property
+    def path(self) -> Path:
+        """Path of the recording"""
+        return self._path
+
+    @property
+    def header(self) -> Optional[RecordingHeader]:
+        """Layout of the recording (the last one, when it was extended), None before the first frame"""
+        return self._header
+
+    @property
+    def frames(self) -> int:
+        """Number of frames recorded so far (including ones not yet written to the file)"""
+        return self._frames
+
+    @property
+    def stalls(self) -> int:
+        """How many times recording waited for chunks to be written to the file"""
+        return self._stalls
+
+    def _start(self, data: TelemetryData) -> None:
+        if self._system_info is not None:
+            self._decoder = TelemetryArraysDecoder.from_system_info(self._system_info, self._nodes)
+        elif self._nodes is not None:
+            self._decoder = TelemetryArraysDecoder(
+                len(data.sensor_data.pressures),
+                imu_node_ids=bus_node_ids(self._nodes, ProductId.Imu),
+                gauss_rider_node_ids=bus_node_ids(self._nodes, ProductId.GaussRider),
+            )
+        else:
+            self._decoder = TelemetryArraysDecoder(len(data.sensor_data.pressures))
+        arrays = self._decoder.decode(data)
+        joint_names = sorted(data.pose_estimation.pose_estimation)
+        self._joint_rows = {joint_name: row for row, joint_name in enumerate(joint_names)}
+        self._header = RecordingHeader(
+            n_muscles=len(arrays.pressures),
+            imu_node_ids=arrays.imu_node_ids.tolist(),
+            gauss_rider_node_ids=arrays.gauss_rider_node_ids.tolist(),
+            joint_names=joint_names,
+            system_info=self._system_info,
+        )
+
+    def _extend_layout(self, new_joint_names: list[str]) -> None:
+        """Extend the layout by nodes and joints which appeared in the last decoded frame,
+        chunks with the previous layout are written before the new header"""
+        assert self._decoder is not None and self._header is not None
+        if self._decoder.has_new_nodes:
+            arrays = self._decoder.extend_layout()
+        else:
+            assert self._decoder.arrays is not None
+            arrays = self._decoder.arrays
+        joint_names = sorted([*self._joint_rows, *new_joint_names])
+        header = RecordingHeader(
+            n_muscles=len(arrays.pressures),
+            imu_node_ids=arrays.imu_node_ids.tolist(),
+            gauss_rider_node_ids=arrays.gauss_rider_node_ids.tolist(),
+            joint_names=joint_names,
+            system_info=self._system_info,
+            created=self._header.created,
+        )
+        L.warning(
+            "Layout of telemetry recording %s is extended: IMU %s, GaussRiders %s, joints %s",
+            self._path,
+            header.imu_node_ids,
+            header.gauss_rider_node_ids,
+            header.joint_names,
+        )
+        with self._cond:
+            self._submit_chunk()
+            # free chunks have the previous layout, chunks being written are dropped by the writer
+            if self._chunk is not None:  # without frames, so not submitted
+                self._free_chunks.append(self._chunk)
+                self._chunk = None
+            self._allocated_chunks -= len(self._free_chunks)
+            self._free_chunks.clear()
+            self._header = header
+            self._joint_rows = {joint_name: row for row, joint_name in enumerate(joint_names)}
+
+    def _acquire_chunk(self) -> _Chunk:
+        # called with `_cond` held
+        if not self._free_chunks and self._allocated_chunks >= self._max_chunks:
+            self._stalls += 1
+            L.warning("Telemetry recording waits for chunks to be written to %s", self._path)
+            self._cond.wait_for(lambda: self._free_chunks or self._allocated_chunks < self._max_chunks)
+        if self._free_chunks:
+            return self._free_chunks.pop()
+        header = self._header
+        assert header is not None
+        self._allocated_chunks += 1
+        return _Chunk(
+            header,
+            {
+                column.name: np.empty((self._chunk_frames, *column.shape), dtype=column.dtype)
+                for column in header.columns
+            },
+        )
+
+    def _submit_chunk(self) -> None:
+        # called with `_cond` held
+        chunk = self._chunk
+        if chunk is not None and chunk.n_frames:
+            self._full_chunks.append(chunk)
+            self._chunk = None
+            self._cond.notify_all()
+
+    def _next_chunk(self) -> Optional[_Chunk]:
+        """Wait for a chunk to be written: a full one, or the current one when `flush_interval`
+        seconds passed since its first frame. None when the recorder is closed."""
+        with self._cond:
+            while not self._full_chunks:
+                if self._closed:
+                    return None
+                chunk = self._chunk
+                if chunk is None or not chunk.n_frames:
+                    self._cond.wait()
+                    continue
+                age = time.monotonic() - chunk.started
+                if age < self._flush_interval:
+                    self._cond.wait(self._flush_interval - age)
+                    continue
+                self._submit_chunk()
+            return self._full_chunks.popleft()
+
+    def _write_chunks(self) -> None:
+        written_header: Optional[RecordingHeader] = None
+        while (chunk := self._next_chunk()) is not None:
+            try:
+                if self._writer_error is None:
+                    layout = chunk.header
+                    if layout is not written_header:
+                        self._file.write(layout.to_bytes())
+                        written_header = layout
+                    n_frames = chunk.n_frames
+                    header = chunk_header(n_frames)
+                    self._file.write(header)
+                    position = len(header)
+                    for column, offset in zip(layout.columns, layout.column_offsets(n_frames)):
+                        self._file.write(b"\0" * (offset - position))
+                        data = chunk.columns[column.name][:n_frames]
+                        if data.nbytes:  # memoryview cannot cast empty arrays (e.g. without joints)
+                            self._file.write(memoryview(data).cast("B"))
+                        position = offset + data.nbytes
+                    self._file.write(b"\0" * (layout.chunk_nbytes(n_frames) - position))
+                    self._file.flush()
+            except BaseException as err:  # pylint: disable=broad-exception-caught
+                L.error("Writing telemetry recording %s failed: %s", self._path, err)
+                self._writer_error = err
+            finally:
+                chunk.n_frames = 0
+                with self._cond:
+                    if chunk.header is self._header:
+                        self._free_chunks.append(chunk)
+                    else:  # of a layout which was extended since
+                        self._allocated_chunks -= 1
+                    self._cond.notify_all()
+
+    def _check_writer(self) -> None:
+        if self._writer_error is not None:
+            raise RuntimeError(f"Writing telemetry recording {self._path} failed") from self._writer_error
+
+    def write(self, data: TelemetryData) -> None:
+        """Record a telemetry frame"""
+        if self._closed:
+            raise RuntimeError("Telemetry recorder is closed")
+        self._check_writer()
+        if self._decoder is None:
+            self._start(data)
+        assert self._decoder is not None
+        arrays = self._decoder.decode(data)
+        new_joint_names = [
+            joint_name
+            for joint_name in data.pose_estimation.pose_estimation
+            if joint_name not in self._joint_rows
+        ]
+        if self._decoder.has_new_nodes or new_joint_names:
+            self._extend_layout(new_joint_names)
+            arrays = self._decoder.decode(data)
+
+        with self._cond:
+            if self._chunk is None:
+                self._chunk = self._acquire_chunk()
+            chunk = self._chunk
+            if not chunk.n_frames:
+                chunk.started = time.monotonic()
+                self._cond.notify_all()  # the writer thread flushes the chunk after `flush_interval`
+            self._write_frame(chunk.columns, chunk.n_frames, arrays, data)
+            chunk.n_frames += 1
+            self._frames += 1
+            if chunk.n_frames == self._chunk_frames:
+                self._submit_chunk()
+
+    def _write_frame(
+        self,
+        columns: dict[str, npt.NDArray[np.generic]],
+        idx: int,
+        arrays: TelemetryArrays,
+        data: TelemetryData,
+    ) -> None:
+        columns["timestamps"][idx] = arrays.timestamp
+        columns["pressures"][idx] = arrays.pressures
+        columns["imu_quats"][idx] = arrays.imu_quats
+        columns["gauss_raw"][idx] = arrays.gauss_raw
+        columns["bfields"][idx] = arrays.bfields
+
+        pose_quats = columns["pose_quats"][idx]
+        rows = []
+        values = []
+        for joint_name, quat in data.pose_estimation.pose_estimation.items():
+            row = self._joint_rows.get(joint_name)
+            if row is not None:
+                rows.append(row)
+                values.append((quat.x, quat.y, quat.z, quat.w))
+        if len(rows) != len(self._joint_rows):
+            pose_quats.fill(np.nan)
+        if rows:
+            pose_quats[rows] = values
+
+    def flush(self) -> None:
+        """Hand the frames recorded so far to the writer thread"""
+        with self._cond:
+            self._submit_chunk()
+
+    def close(self) -> None:
+        """Write all recorded frames and close the file"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._submit_chunk()
+            self._cond.notify_all()
+        self._writer.join()
+        self._file.close()
+        self._check_writer()
+        L.info("Recorded %d telemetry frames into %s", self._frames, self._path)
+
+    def __enter__(self) -> "TelemetryRecorder":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    async def record(
+        self,
+        client: "StateStoreClient",
+        max_frames: Optional[int] = None,
+        duration: Optional[float] = None,
+    ) -> int:
+        """Record telemetry subscribed from `client` until `max_frames` frames are recorded
+        or `duration` seconds pass (forever, when neither is given). Returns the number of frames.
+        NOTE: writing a frame blocks the event loop when recording stalls (see `stalls`)."""
+        if self._system_info is None and self._decoder is None:
+            self._system_info = await client.get_system_info()
+        start = time.monotonic()
+        count = 0
+        async for data in client.subscribe_telemetry():
+            self.write(data)
+            count += 1
+            if max_frames is not None and count >= max_frames:
+                break
+            if duration is not None and time.monotonic() - start >= duration:
+                break
+        return count
+
+    def record_sync(
+        self,
+        client: "StateStoreClientSync",
+        max_frames: Optional[int] = None,
+        duration: Optional[float] = None,
+    ) -> int:
+        """Synchronous version of `record`"""
+        if self._system_info is None and self._decoder is None:
+            self._system_info = client.get_system_info()
+        start = time.monotonic()
+        count = 0
+        for data in client.subscribe_telemetry():
+            self.write(data)
+            count += 1
+            if max_frames is not None and count >= max_frames:
+                break
+            if duration is not None and time.monotonic() - start >= duration:
+                break
+        return count
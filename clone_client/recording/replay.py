@@ -0,0 +1,371 @@
+"""Replay of telemetry recordings (see `clone_client.recording.recorder`).
+
+`RecordingReader` memory-maps a recording and gives access to its chunks' columns as arrays,
+or iterates over its frames as fast as possible. `ReplayStateStore` is a `StateStoreClient`
+serving a recording instead of a Golem, with the original timing (optionally scaled)
+or unthrottled, so code consuming telemetry can be run and benchmarked without hardware.
+"""
+
+import asyncio
+import logging
+import math
+import mmap
+from pathlib import Path
+import time
+from types import TracebackType
+from typing import AsyncIterable, Iterable, Iterator, Mapping, Optional, Type, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+
+from clone_client.pose_estimation.pose_estimator import MagInterpolConfig
+from clone_client.pose_estimation.velocity_estimator import VelocityEstimator
+from clone_client.proto.data_types_pb2 import ErrorInfo
+from clone_client.proto.state_store_pb2 import SystemInfo, TelemetryData
+from clone_client.recording.format import (
+    column_arrays,
+    is_header,
+    parse_chunk_header,
+    RecordingHeader,
+)
+from clone_client.state_store.client import StateStoreClient
+from clone_client.state_store.config import StateStoreClientConfig
+from clone_client.state_store.telemetry_arrays import (
+    BusNode,
+    TelemetryArrays,
+    TelemetryArraysDecoder,
+)
+
+L = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+Columns = dict[str, npt.NDArray[np.generic]]
+
+
+class RecordingReader:
+    """Memory-mapped telemetry recording.
+
+    Chunks are indexed on opening, a truncated or corrupted tail (e.g. of a recording
+    that was interrupted) is ignored. Arrays returned by the reader are read-only views
+    of the file, valid until the reader is closed.
+
+    When the layout was extended during recording (nodes or joints appeared after the first
+    frame), `chunks` keep the layout they were recorded with (see `chunk_headers`), while
+    `column`, `arrays` and `telemetry` give all frames in the layout of the last header,
+    with values of nodes and joints missing in earlier chunks set to NaN (zero, for integers).
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self._path = Path(path)
+        with open(self._path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header, offset = RecordingHeader.from_bytes(self._mmap)
+            self._headers = [header]
+            self._chunks: list[Columns] = []
+            self._chunk_headers: list[RecordingHeader] = []
+            self._index_chunks(offset)
+            self._header = self._headers[-1]
+            for previous in self._headers[:-1]:
+                for column in previous.columns:
+                    previous.layout_rows(self._header, column.name)  # raises, when not extended
+        except BaseException:
+            self._close_mmap()
+            raise
+        self._n_frames = sum(len(chunk["timestamps"]) for chunk in self._chunks)
+
+    def _index_chunks(self, offset: int) -> None:
+        header = self._headers[-1]
+        size = len(self._mmap)
+        while offset < size:
+            try:
+                if is_header(self._mmap, offset):
+                    header, offset = RecordingHeader.from_bytes(self._mmap, offset)
+                    self._headers.append(header)
+                    continue
+                n_frames = parse_chunk_header(self._mmap, offset)
+            except (ValueError, IndexError) as err:  # struct.error is a ValueError
+                L.warning("Ignoring the tail of telemetry recording %s: %s", self._path, err)
+                break
+            end = offset + header.chunk_nbytes(n_frames)
+            if end > size:
+                L.warning("Ignoring truncated last chunk of telemetry recording %s", self._path)
+                break
+            self._chunks.append(column_arrays(header, self._mmap, offset, n_frames))
+            self._chunk_headers.append(header)
+            offset = end
+
+    @property
+    def path(self) -> Path:
+        """Path of the recording"""
+        return self._path
+
+    @property
+    def header(self) -> RecordingHeader:
+        """Layout of the recording (the last one, when it was extended during recording)"""
+        return self._header
+
+    @property
+    def headers(self) -> list[RecordingHeader]:
+        """All layouts of the recording, each one extending the previous ones"""
+        return self._headers
+
+    @property
+    def n_frames(self) -> int:
+        """Number of complete frames in the recording"""
+        return self._n_frames
+
+    def __len__(self) -> int:
+        return self._n_frames
+
+    @property
+    def chunks(self) -> list[Columns]:
+        """Columns of consecutive chunks, each one [frames of the chunk, *shape of the column]
+        in the layout of the chunk's header (see `chunk_headers`)"""
+        return self._chunks
+
+    @property
+    def chunk_headers(self) -> list[RecordingHeader]:
+        """Layouts of `chunks`"""
+        return self._chunk_headers
+
+    def _in_layout(
+        self, header: RecordingHeader, name: str, values: npt.NDArray[np.generic]
+    ) -> npt.NDArray[np.generic]:
+        """`values` of a column of a chunk with the layout of `header`, in the recording's layout"""
+        if header is self._header:
+            return values
+        rows = header.layout_rows(self._header, name)
+        if rows is None:
+            return values
+        column = next(column for column in self._header.columns if column.name == name)
+        fill = np.nan if np.dtype(column.dtype).kind == "f" else 0
+        out = np.full((len(values), *column.shape), fill, dtype=column.dtype)
+        out[:, rows] = values
+        return out
+
+    def column(self, name: str) -> npt.NDArray[np.generic]:
+        """Values of a column of all frames, [frames, *shape] (copied into a single array)"""
+        column = next((column for column in self._header.columns if column.name == name), None)
+        if column is None:
+            raise KeyError(f"No column {name} in telemetry recording {self._path}")
+        if not self._chunks:
+            return np.empty((0, *column.shape), dtype=column.dtype)
+        return np.concatenate(
+            [
+                self._in_layout(header, name, chunk[name])
+                for chunk, header in zip(self._chunks, self._chunk_headers)
+            ]
+        )
+
+    def empty_arrays(self) -> TelemetryArrays:
+        """Allocate `TelemetryArrays` with the layout of the recording"""
+        header = self._header
+        return TelemetryArrays.empty(header.n_muscles, header.imu_node_ids, header.gauss_rider_node_ids)
+
+    def arrays(self, out: Optional[TelemetryArrays] = None) -> Iterator[TelemetryArrays]:
+        """Iterate over frames copied into `out` (allocated, when not given).
+        NOTE: the same `TelemetryArrays` object is yielded each time, overwritten in place."""
+        if out is None:
+            out = self.empty_arrays()
+        for chunk, header in zip(self._chunks, self._chunk_headers):
+            timestamps = chunk["timestamps"]
+            pressures = chunk["pressures"]
+            imu_quats = self._in_layout(header, "imu_quats", chunk["imu_quats"])
+            gauss_raw = self._in_layout(header, "gauss_raw", chunk["gauss_raw"])
+            bfields = self._in_layout(header, "bfields", chunk["bfields"])
+            for idx in range(len(timestamps)):
+                out.timestamp = float(timestamps[idx])
+                np.copyto(out.pressures, pressures[idx])
+                np.copyto(out.imu_quats, imu_quats[idx])
+                np.copyto(out.gauss_raw, gauss_raw[idx])
+                np.copyto(out.bfields, bfields[idx])
+                yield out
+
+    def telemetry(self) -> Iterator[TelemetryData]:
+        """Iterate over frames rebuilt into `TelemetryData`.
+        Nodes, which were missing in a recorded frame (NaN values, or zero raw GaussRider data),
+        are left out, as are joints without server estimated rotation."""
+        for chunk, header in zip(self._chunks, self._chunk_headers):
+            for idx in range(len(chunk["timestamps"])):
+                yield self._telemetry_data(header, chunk, idx)
+
+    @staticmethod
+    def _telemetry_data(header: RecordingHeader, chunk: Columns, idx: int) -> TelemetryData:
+        data = TelemetryData()
+        data.time_since_start.FromNanoseconds(round(float(chunk["timestamps"][idx]) * 1000_000_000))
+        sensor_data = data.sensor_data
+
+        pressures = chunk["pressures"][idx]
+        missing = np.flatnonzero(np.isnan(pressures))
+        sensor_data.pressures.extend(pressures[: missing[0]].tolist() if len(missing) else pressures.tolist())
+
+        for node_id, quat in zip(header.imu_node_ids, chunk["imu_quats"][idx].tolist()):
+            if not math.isnan(quat[0]):
+                x, y, z, w = quat
+                sensor_data.imu.add(node_id=node_id, w=w, x=x, y=y, z=z)
+
+        for node_id, raw in zip(header.gauss_rider_node_ids, chunk["gauss_raw"][idx].tolist()):
+            if any(raw):
+                sensor = sensor_data.gauss_rider_data.add(node_id=node_id).sensor
+                for px in range(4):
+                    sensor.pixels.add(x=raw[3 * px], y=raw[3 * px + 1], z=raw[3 * px + 2])
+                sensor.temperature = raw[12]
+
+        for node_id, bfield in zip(
+            header.gauss_rider_node_ids, chunk["bfields"][idx].reshape(-1, 12).tolist()
+        ):
+            if not math.isnan(bfield[0]):
+                sensor_data.bfields[node_id].bfield.extend(bfield)
+
+        pose_estimation = data.pose_estimation.pose_estimation
+        for joint_name, quat in zip(header.joint_names, chunk["pose_quats"][idx].tolist()):
+            if not math.isnan(quat[0]):
+                x, y, z, w = quat
+                pose = pose_estimation[joint_name]
+                pose.w, pose.x, pose.y, pose.z = w, x, y, z
+
+        return data
+
+    def close(self) -> None:
+        """Unmap the recording, arrays obtained from the reader must not be used afterwards"""
+        self._chunks = []
+        self._chunk_headers = []
+        self._close_mmap()
+
+    def _close_mmap(self) -> None:
+        try:
+            self._mmap.close()
+        except BufferError:
+            # arrays still referenced elsewhere, the mapping is released when they are
+            L.debug("Telemetry recording %s is still in use, unmapped when released", self._path)
+
+    def __enter__(self) -> "RecordingReader":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class ReplayStateStore(StateStoreClient):
+    """State store client serving a telemetry recording instead of a Golem.
+
+    Frames are yielded with the recorded timing scaled by `1 / speed` (`speed=2.0` replays
+    twice as fast), or as fast as they are consumed, when `speed` is None. Each subscription
+    replays the recording from the beginning. System info (and so muscle names and the local
+    magnetic pose estimator, see `telemetry_extend`) is taken from the recording, when present.
+
+    NOTE: no gRPC channel is opened, `channel` and `stub` of the base class are not available.
+    """
+
+    def __init__(  # pylint: disable=super-init-not-called
+        self,
+        path: str | Path,
+        maginterpol_config: MagInterpolConfig = MagInterpolConfig(),
+        velocity_config: Optional[VelocityEstimator.Config] = None,
+        speed: Optional[float] = 1.0,
+    ) -> None:
+        if speed is not None and speed <= 0.0:
+            raise ValueError("Replay speed must be greater than zero")
+        self._reader = RecordingReader(path)
+        # all requests of the base class are served from the recording, so only its state is set up
+        self._name = "ReplayStateStore"
+        self._socket_address = str(self._reader.path)
+        self._init_state(StateStoreClientConfig(), maginterpol_config, velocity_config)
+        self.speed = speed
+        self._last_telemetry: Optional[TelemetryData] = None
+
+    @classmethod
+    async def new(  # type: ignore[override]  # pylint: disable=arguments-differ
+        cls,
+        path: str | Path,
+        maginterpol_config: MagInterpolConfig = MagInterpolConfig(),
+        velocity_config: Optional[VelocityEstimator.Config] = None,
+        speed: Optional[float] = 1.0,
+    ) -> "ReplayStateStore":
+        """Create a replay of a recording, with system info loaded"""
+        self = cls(path, maginterpol_config, velocity_config, speed)
+        await self.get_system_info()
+        return self
+
+    @property
+    def reader(self) -> RecordingReader:
+        """Reader of the replayed recording"""
+        return self._reader
+
+    async def channel_ready(self, timeout_s: int = 6) -> None:
+        """Replay is always ready"""
+
+    async def _replay(self, frames: Iterator[T]) -> AsyncIterable[T]:
+        start: Optional[tuple[float, float]] = None  # (monotonic time, recorded timestamp)
+        for timestamp, frame in zip(self._timestamps(), frames):
+            speed = self.speed
+            if speed is not None:
+                now = time.monotonic()
+                if start is None:
+                    start = (now, timestamp)
+                delay = start[0] + (timestamp - start[1]) / speed - now
+                if delay > 0.0:
+                    await asyncio.sleep(delay)
+            yield frame
+
+    def _timestamps(self) -> Iterator[float]:
+        for chunk in self._reader.chunks:
+            yield from chunk["timestamps"].tolist()
+
+    async def subscribe_telemetry(self) -> AsyncIterable[TelemetryData]:
+        """Replay recorded telemetry"""
+        async for data in self._replay(self._reader.telemetry()):
+            self._last_telemetry = data
+            yield data
+
+    async def subscribe_telemetry_arrays(
+        self, nodes: Optional[Mapping[str, Iterable[BusNode]]] = None
+    ) -> AsyncIterable[TelemetryArrays]:
+        """Replay recorded telemetry as arrays, without building `TelemetryData` messages.
+        Arrays have the layout of the recording, `nodes` are not used.
+        NOTE: the same `TelemetryArrays` object is yielded each time, overwritten in place."""
+        async for arrays in self._replay(self._reader.arrays()):
+            yield arrays
+
+    async def get_telemetry(self) -> TelemetryData:
+        """Get the last replayed frame (the first one of the recording, before replay starts)"""
+        if self._last_telemetry is None:
+            if not self._reader.n_frames:
+                raise RuntimeError(f"Telemetry recording {self._reader.path} has no frames")
+            self._last_telemetry = next(self._reader.telemetry())
+        return self._last_telemetry
+
+    async def get_system_info(self, reload: bool = False) -> SystemInfo:
+        """Get system info stored in the recording (empty, if it was recorded without one)"""
+        if reload or not self._system_info:
+            info = self._reader.header.system_info
+            self._system_info = SystemInfo() if info is None else info
+            self._update_mappings(self._system_info)
+        return self._system_info
+
+    async def ping(self) -> None:
+        """Replay is always responding"""
+
+    async def get_errors(self) -> Optional[list[ErrorInfo]]:
+        """Replay has no errors"""
+        return None
+
+    def telemetry_arrays_decoder(
+        self, info: Optional[SystemInfo] = None, nodes: Optional[Mapping[str, Iterable[BusNode]]] = None
+    ) -> TelemetryArraysDecoder:
+        """Create a decoder of `TelemetryData` into arrays, with the layout of the recording
+        (`info` and `nodes` are not used)"""
+        header = self._reader.header
+        return TelemetryArraysDecoder(header.n_muscles, header.imu_node_ids, header.gauss_rider_node_ids)
+
+    def close(self) -> None:
+        """Stop building of the pose estimator and close the recording"""
+        self.shutdown_pose_estimator_builder()
+        self._reader.close()
@@ -1,13 +1,15 @@
 """
 Communication benchmark between client and the robot.
+
+Sweeps the frequency of `stream_set_pressures` and stops at the first frequency the stream
+cannot keep up with. See `clone_client.bench` for the full, machine-readable benchmark suite.
 """
 
 import asyncio
 import os
 import socket
-import sys
 import time
-from typing import AsyncIterable, Sequence
+from typing import AsyncIterable, Optional, Sequence
 
 from clone_client.client import Client
 from clone_client.utils import async_precise_interval
@@ -22,14 +24,17 @@ async def main() -> None:
     async with Client(address=GOLEM_ADDRESS, server=GOLEM_HOSTNAME) as client:
         start_freq = FREQUENCY
         pressures = [-1] * client.state_store.number_of_muscles
+        max_freq: Optional[int] = None
 
         for freq_add in range(0, 200, 10):
             freq = start_freq + freq_add
             expected_time = int(((1 / freq) * (SAMPLES // 100)) / 1e-9)
             tick = async_precise_interval(1 / freq, 0.9)
+            too_slow = False
             print(f"Running at {freq} Hz")
 
             async def control_generator() -> AsyncIterable[Sequence[float]]:
+                nonlocal too_slow
                 for run in range(100):
 
                     start = time.time_ns()
@@ -44,7 +49,9 @@ async def main() -> None:
 
                     if r < 0.985:
                         print(f"SLOW, Stopping at {run} run and {sample} sample, frequency: {freq}")
-                        sys.exit(0)
+                        # ending the stream lets the server answer, exiting here would not
+                        too_slow = True
+                        return
 
                 print(f"OK, frequency: {freq}")
                 # Sleep to see if LED are gone which is another way to check if there is no queue on control BUS
@@ -55,5 +62,12 @@ async def main() -> None:
             except Exception as e:
                 print(f"Error: {e}")
 
+            if too_slow:
+                break
+            max_freq = freq
+
+        print(f"Highest sustained frequency: {max_freq} Hz" if max_freq else "No frequency was sustained")
+
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,16 @@
 # async.sync
 # This marks this file as to be automatically converted to sync version using async2sync.py
 
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
 import logging
-from typing import Annotated, AsyncIterable, Literal, Optional
+import multiprocessing
+from typing import AsyncIterable, Iterable, Literal, Mapping, Optional
 
 from google.protobuf.empty_pb2 import Empty  # pylint: disable=E0611
 import numpy as np
@@ -14,10 +22,13 @@ from clone_client.exceptions import IncorrectMuscleIndexError, IncorrectMuscleNa
 from clone_client.grpc_client import GRPCAsyncClient
 from clone_client.pose_estimation.pose_estimator import (
     MagInterpolConfig,
+    pose_estimator_from_config,
     PoseEstimatorMagInterpol,
 )
+from clone_client.pose_estimation.velocity_estimator import VelocityEstimator
 from clone_client.proto.data_types_pb2 import ErrorInfo, ErrorList
 from clone_client.proto.state_store_pb2 import (
+    PoseEstimationInfo,
     SystemInfo,
     SystemInfoResponse,
     TelemetryData,
@@ -25,67 +36,89 @@ from clone_client.proto.state_store_pb2 import (
 )
 from clone_client.proto.state_store_pb2_grpc import StateStoreReceiverGRPCStub
 from clone_client.state_store.config import StateStoreClientConfig
-from clone_client.utils import grpc_translated_async
+from clone_client.state_store.telemetry_arrays import (
+    BusNode,
+    TelemetryArrays,
+    TelemetryArraysDecoder,
+)
+from clone_client.utils import grpc_translated_async, wait_future_async
 
 L = logging.getLogger(__name__)
 
 
 class TelemetryDataExt:
     # pylint: disable=W0212
-    """NOTE: for deriving velocities this function uses and modifies
-    internal, class-level state (shared by all `TelemetryDataExt` instances).
+    """NOTE: velocities are derived by a `VelocityEstimator`, which keeps history of previous
+    frames. Unless an estimator is given explicitly, the default one of the client is used
+    (shared by all `TelemetryDataExt` instances created for that client without an estimator).
     NOTE: To get possibly best velocities approximation, this must be created
     with each telemetry value in turn, that is obtained from Golem.
     Best to use with a telemetry stream.
+
+    Joint poses and velocities are kept stacked (one row per joint, in order of `joint_names`),
+    per-joint dictionaries (`qpos`, `qvel`) are created only when accessed.
     """
 
-    def __init__(self, data: TelemetryData, client: "StateStoreClient") -> None:
+    def __init__(
+        self,
+        data: TelemetryData,
+        client: "StateStoreClient",
+        velocity_estimator: Optional[VelocityEstimator] = None,
+    ) -> None:
         # FIXME: short diff time in connection with no filtering (hence high wobbling of pose estimation)
         # brings to spurious high values of velocities
         # This one will be fixed with transferring calculation to the golem
 
         self._inner = data
         self._timestamp = data.time_since_start.ToNanoseconds() / 1000_000_000.0
-        server_pose_estimation = {
-            joint_name: R.from_quat([q.x, q.y, q.z, q.w])
-            for joint_name, q in data.pose_estimation.pose_estimation.items()
-        }
-        if client._pose_estimator_maginterp is not None:
-            mag_pose_estimation = client._pose_estimator_maginterp.get_rotations_dict(
-                data.sensor_data.bfields
-            )
-            self._new_pose_estimation = {**server_pose_estimation, **mag_pose_estimation}
-        else:
-            self._new_pose_estimation = server_pose_estimation
-
-        if client._last_pose_estimation is None:
-            self._on_initial_telemetry_data(client)
-            return
+        self._qpos: Optional[dict[str, R]] = None  # type: ignore[no-any-unimported]
+        self._qvel: Optional[dict[str, npt.NDArray[np.double]]] = None
+        estimator = client._velocity_estimator if velocity_estimator is None else velocity_estimator
 
-        if client._last_telemetry_timestamp == self._timestamp:  # if exactly the same frame
-            self._on_same_telemetry_data_again(client)
+        if estimator.last_timestamp == self._timestamp:  # if exactly the same frame
+            self._on_same_telemetry_data_again(estimator)
             return
 
-        self._velocities = {
-            joint_name: (rnew * client._last_pose_estimation[joint_name].inv()).as_rotvec()
-            / (self._timestamp - client._last_telemetry_timestamp)
-            for joint_name, rnew in self._new_pose_estimation.items()
-        }
+        self._joint_names, self._rotations = self._estimate_pose(data, client, self._timestamp)
+        self._velocities = estimator.update(self._timestamp, self._joint_names, self._rotations)
 
-        self._update_last_client_values(client)
+    @staticmethod
+    def _estimate_pose(
+        data: TelemetryData, client: "StateStoreClient", timestamp: float
+    ) -> tuple[list[str], R]:  # type: ignore[no-any-unimported]
+        server_pose_estimation = data.pose_estimation.pose_estimation
+        joint_names = list(server_pose_estimation.keys())
+        quats = [(q.x, q.y, q.z, q.w) for q in server_pose_estimation.values()]
 
-    def _update_last_client_values(self, client: "StateStoreClient") -> None:
-        client._last_telemetry_timestamp = self._timestamp
-        client._last_pose_estimation = self._new_pose_estimation
-        client._last_velocities = self._velocities
-
-    def _on_initial_telemetry_data(self, client: "StateStoreClient") -> None:
-        self._velocities = {joint_name: np.zeros(3) for joint_name in self._new_pose_estimation}
-        self._update_last_client_values(client)
-
-    def _on_same_telemetry_data_again(self, client: "StateStoreClient") -> None:
-        self._new_pose_estimation = client._last_pose_estimation  # type: ignore
-        self._velocities = client._last_velocities  # type: ignore
+        if client._pose_estimator_maginterp is not None:
+            mag_joint_names, mag_rotations = client._pose_estimator_maginterp.get_rotations_stacked(
+                data.sensor_data.bfields, timestamp
+            )
+            if mag_joint_names:
+                if not joint_names:
+                    return mag_joint_names, mag_rotations
+                # joints estimated locally override ones estimated by the server
+                joint_rows = {joint_name: row for row, joint_name in enumerate(joint_names)}
+                mag_rows = []
+                for joint_name in mag_joint_names:
+                    row = joint_rows.get(joint_name)
+                    if row is None:
+                        row = len(joint_names)
+                        joint_names.append(joint_name)
+                        quats.append((0.0, 0.0, 0.0, 1.0))
+                    mag_rows.append(row)
+                quats_arr = np.array(quats, dtype=np.double)
+                quats_arr[mag_rows] = mag_rotations.as_quat()
+                return joint_names, R.from_quat(quats_arr)
+
+        if not quats:
+            return joint_names, R.identity(0)
+        return joint_names, R.from_quat(quats)
+
+    def _on_same_telemetry_data_again(self, estimator: VelocityEstimator) -> None:
+        self._joint_names = estimator.last_joint_names
+        self._rotations = estimator.last_rotations
+        self._velocities = estimator.last_velocities
         L.debug(
             "Telemetry with the same timestamp as the last one encountered"
             "Probably due to usage of the same TelemetryData object twice.",
@@ -103,27 +136,61 @@ class TelemetryDataExt:
         """Get vector of pressures"""
         return np.array(self._inner.sensor_data.pressures)
 
+    @property
+    def joint_names(self) -> list[str]:
+        """Get names of joints, in order of rows of `qpos_stacked` and `qvel_stacked`"""
+        return self._joint_names
+
+    @property
+    def qpos_stacked(self) -> R:  # type: ignore[no-any-unimported]
+        """Get rotations of all joints as a single stacked rotation"""
+        return self._rotations
+
+    @property
+    def qvel_stacked(self) -> npt.NDArray[np.double]:
+        """Get array [joints, 3] of estimated joint velocities (as Vector3, rad/s)"""
+        return self._velocities
+
     @property
     def qpos(self) -> dict[str, R]:  # type: ignore[no-any-unimported]
         """Get mapping joint name -> joint rotation"""
-        return self._new_pose_estimation
+        if self._qpos is None:
+            self._qpos = {
+                joint_name: self._rotations[row] for row, joint_name in enumerate(self._joint_names)
+            }
+        return self._qpos
 
     @property
     def qvel(
         self,
     ) -> dict[str, np.ndarray[tuple[Literal[3]], np.dtype[np.double]]]:  # type: ignore[no-any-unimported]
         """Get vector of estimated joint velocities (as Vector3, rad/s)"""
-        return self._velocities  # type: ignore[return-value]
+        if self._qvel is None:
+            self._qvel = dict(zip(self._joint_names, self._velocities))
+        return self._qvel  # type: ignore[return-value]
 
 
 class StateStoreClient(GRPCAsyncClient):
     """Client for receiving data from the state store."""
 
     def __init__(
-        self, socket_address: str, config: StateStoreClientConfig, maginterpol_config: MagInterpolConfig
+        self,
+        socket_address: str,
+        config: StateStoreClientConfig,
+        maginterpol_config: MagInterpolConfig,
+        velocity_config: Optional[VelocityEstimator.Config] = None,
     ) -> None:
         super().__init__("StateStoreReceiver", socket_address)
         self.stub: StateStoreReceiverGRPCStub = StateStoreReceiverGRPCStub(self.channel)
+        self._init_state(config, maginterpol_config, velocity_config)
+
+    def _init_state(
+        self,
+        config: StateStoreClientConfig,
+        maginterpol_config: MagInterpolConfig,
+        velocity_config: Optional[VelocityEstimator.Config],
+    ) -> None:
+        """Set up state of the client other than its gRPC channel"""
         self._system_info: Optional[SystemInfo] = None
         self._config = config
         self._maginterpol_config = maginterpol_config
@@ -134,16 +201,22 @@ class StateStoreClient(GRPCAsyncClient):
         self._joints_axes_mapping: dict[str, list[str]] = {}
 
         self._pose_estimator_maginterp: Optional[PoseEstimatorMagInterpol] = None
-        self._last_pose_estimation: Optional[dict[Annotated[str, "joint name"], R]] = None  # type: ignore
-        self._last_telemetry_timestamp = 0.0
-        self._last_velocities: Optional[
-            dict[Annotated[str, "joint name"], np.ndarray[tuple[Literal[3]], np.dtype[np.double]]]
-        ] = None
+        # incremented with every (re)build, estimators built for older system info are discarded
+        self._pose_estimator_generation = 0
+        self._pose_estimator_future: Optional[Future[PoseEstimatorMagInterpol]] = None
+        self._pose_estimator_executor: Optional[Executor] = None
+        self._velocity_config = velocity_config or VelocityEstimator.Config()
+        self._velocity_estimator = VelocityEstimator(self._velocity_config)
 
     @classmethod
-    async def new(cls, socket_address: str, maginterpol_config: MagInterpolConfig) -> "StateStoreClient":
+    async def new(
+        cls,
+        socket_address: str,
+        maginterpol_config: MagInterpolConfig,
+        velocity_config: Optional[VelocityEstimator.Config] = None,
+    ) -> "StateStoreClient":
         """Create and initialize new `StateStoreClient` instance"""
-        self = cls(socket_address, StateStoreClientConfig(), maginterpol_config)
+        self = cls(socket_address, StateStoreClientConfig(), maginterpol_config, velocity_config)
         await self.channel_ready()
         return self
 
@@ -156,6 +229,21 @@ class StateStoreClient(GRPCAsyncClient):
             handle_response(response.response_data)
             yield response.data
 
+    async def subscribe_telemetry_arrays(
+        self, nodes: Optional[Mapping[str, Iterable[BusNode]]] = None
+    ) -> AsyncIterable[TelemetryArrays]:
+        """Subscribe to telemetry decoded into preallocated arrays, with layout taken from `SystemInfo`
+        and `nodes` discovered on buses (see `telemetry_arrays_decoder`).
+        NOTE: the same `TelemetryArrays` object is yielded each time, overwritten in place,
+        until nodes which are not part of the layout appear and new arrays including them are allocated."""
+        decoder = self.telemetry_arrays_decoder(await self.get_system_info(), nodes)
+        async for data in self.subscribe_telemetry():
+            arrays = decoder.decode(data)
+            if decoder.has_new_nodes:
+                decoder.extend_layout()
+                arrays = decoder.decode(data)
+            yield arrays
+
     @grpc_translated_async()
     async def get_telemetry(self) -> TelemetryData:
         """Get current telemetry data."""
@@ -201,11 +289,52 @@ class StateStoreClient(GRPCAsyncClient):
                 for axis_name, _ in joint.joint.axes.items():
                     self._joints_axes_mapping[joint_name].append(axis_name)
         if info.pose_estimation is not None and info.pose_estimation.HasField("maginterp"):
-            self._pose_estimator_maginterp = PoseEstimatorMagInterpol.from_maginterp_info(
-                info.pose_estimation,
-                filter_avg_samples=self._maginterpol_config.filter_avg_samples,
-                filter_avg_use=self._maginterpol_config.filter_avg_use,
+            self._build_pose_estimator(info.pose_estimation)
+
+    def _build_pose_estimator(self, info: PoseEstimationInfo) -> None:
+        self._pose_estimator_generation += 1
+        background_build = self._maginterpol_config.background_build
+        if background_build is None:
+            self._pose_estimator_maginterp = pose_estimator_from_config(info, self._maginterpol_config)
+            return
+
+        # until the new estimator is ready, server side pose estimation is used
+        self._pose_estimator_maginterp = None
+        if self._pose_estimator_executor is None:
+            self._pose_estimator_executor = self._new_pose_estimator_executor()
+        try:
+            future = self._pose_estimator_executor.submit(
+                pose_estimator_from_config, info, self._maginterpol_config
+            )
+        except BrokenExecutor:
+            # e.g. worker process of the previous build was killed
+            self._pose_estimator_executor = self._new_pose_estimator_executor()
+            future = self._pose_estimator_executor.submit(
+                pose_estimator_from_config, info, self._maginterpol_config
             )
+        self._pose_estimator_future = future
+        generation = self._pose_estimator_generation
+        future.add_done_callback(lambda done: self._on_pose_estimator_built(generation, done))
+
+    def _new_pose_estimator_executor(self) -> Executor:
+        if self._maginterpol_config.background_build == "process":
+            return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="pose_estimator")
+
+    def _on_pose_estimator_built(self, generation: int, future: Future[PoseEstimatorMagInterpol]) -> None:
+        if future.cancelled() or generation != self._pose_estimator_generation:
+            return
+        err = future.exception()
+        if err is not None:
+            L.error("Building pose estimator failed, server side pose estimation is used: %s", err)
+            return
+        self._pose_estimator_maginterp = future.result()
+        L.info("Pose estimator built in background is ready")
+
+    @property
+    def pose_estimator_ready(self) -> bool:
+        """Whether the local (magnetic) pose estimator is built and used for pose estimation"""
+        return self._pose_estimator_maginterp is not None
 
     @property
     def muscle_order(self) -> dict[int, str]:
@@ -238,14 +367,53 @@ class StateStoreClient(GRPCAsyncClient):
         """Get mapping from a joint name to names of its axes"""
         return self._joints_axes_mapping
 
-    def telemetry_extend(self, telemetry_data: TelemetryData) -> TelemetryDataExt:
+    def telemetry_arrays_decoder(
+        self, info: Optional[SystemInfo] = None, nodes: Optional[Mapping[str, Iterable[BusNode]]] = None
+    ) -> TelemetryArraysDecoder:
+        """Create a decoder of `TelemetryData` into arrays, for the given or currently cached `SystemInfo`
+        and nodes discovered on buses (`HWDriverClient.get_nodes`), when given"""
+        if info is None:
+            info = self._system_info
+        if info is None:
+            raise RuntimeError("System info must be obtained before creating telemetry arrays decoder")
+        return TelemetryArraysDecoder.from_system_info(info, nodes)
+
+    async def wait_for_pose_estimator(self) -> Optional[PoseEstimatorMagInterpol]:
+        """Wait until the pose estimator being built in background (if any) is finished.
+        Returns the estimator, or None when there is no magnetic map or building failed."""
+        future = self._pose_estimator_future
+        if future is not None and not future.done():
+            # errors are already reported by `_on_pose_estimator_built`
+            await wait_future_async(future)
+        return self._pose_estimator_maginterp
+
+    def shutdown_pose_estimator_builder(self) -> None:
+        """Stop building the pose estimator in background, see `MagInterpolConfig.background_build`"""
+        if self._pose_estimator_executor is not None:
+            self._pose_estimator_executor.shutdown(wait=False, cancel_futures=True)
+            self._pose_estimator_executor = None
+
+    def new_velocity_estimator(self) -> VelocityEstimator:
+        """Create a fresh `VelocityEstimator` with the configuration of this client"""
+        return VelocityEstimator(self._velocity_config)
+
+    def telemetry_extend(
+        self, telemetry_data: TelemetryData, velocity_estimator: Optional[VelocityEstimator] = None
+    ) -> TelemetryDataExt:
         """Wrap `TelemetryData` obtained from a Golem into an extension
-        object, which facilitates obtaining joint pose and velocity estimation"""
-        return TelemetryDataExt(telemetry_data, self)
+        object, which facilitates obtaining joint pose and velocity estimation.
+        When `velocity_estimator` is not given, the default estimator of the client is used."""
+        return TelemetryDataExt(telemetry_data, self, velocity_estimator)
 
     async def telemetry_stream_extend(
-        self, telemetry_stream: AsyncIterable[TelemetryData]
+        self,
+        telemetry_stream: AsyncIterable[TelemetryData],
+        velocity_estimator: Optional[VelocityEstimator] = None,
     ) -> AsyncIterable[TelemetryDataExt]:
-        """Wrap telemetry stream so that it returns `TelemetryDataExt`"""
+        """Wrap telemetry stream so that it returns `TelemetryDataExt`.
+        Each stream uses its own `VelocityEstimator` (a fresh one, unless given explicitly),
+        so multiple streams can be extended concurrently."""
+        if velocity_estimator is None:
+            velocity_estimator = self.new_velocity_estimator()
         async for tele in telemetry_stream:
-            yield TelemetryDataExt(tele, self)
+            yield TelemetryDataExt(tele, self, velocity_estimator)
@@ -0,0 +1,149 @@
+"""History of telemetry kept in preallocated NumPy rings.
+
+Every channel is stored in a buffer twice the capacity long and each frame is written
+at both `i` and `i + capacity`. Thanks to that any window of up to `capacity` most recent
+frames is a contiguous slice of the buffer, so it can be returned as a view without copying.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from clone_client.state_store.telemetry_arrays import TelemetryArrays
+
+
+@dataclass
+class TelemetryWindow:
+    """Window of consecutive telemetry frames, oldest first.
+
+    NOTE: arrays are views into `TelemetryRingBuffer` storage, they are valid only until
+    the ring wraps around, i.e. until another `capacity - len(window)` frames are pushed."""
+
+    timestamps: npt.NDArray[np.double]  # [n]
+    pressures: npt.NDArray[np.float32]  # [n, n_muscles]
+    imu_node_ids: npt.NDArray[np.uint32]  # [n_imu]
+    imu_quats: npt.NDArray[np.float32]  # [n, n_imu, 4]
+    gauss_rider_node_ids: npt.NDArray[np.uint32]  # [n_gr]
+    gauss_raw: npt.NDArray[np.int16]  # [n, n_gr, 13]
+    bfields: npt.NDArray[np.double]  # [n, n_gr, 4, 3]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+class TelemetryRingBuffer:
+    """Fixed size history of `TelemetryArrays` frames with copy-free access to recent windows.
+
+    Storage is allocated on the first pushed frame, basing on its layout. Frames pushed
+    afterwards must have the same layout, or one extended with new nodes (see
+    `TelemetryArraysDecoder.extend_layout`), to which kept frames are then moved."""
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be greater than zero")
+        self._capacity = capacity
+        self._count = 0  # total number of frames pushed
+        self._imu_node_ids: npt.NDArray[np.uint32]
+        self._gauss_rider_node_ids: npt.NDArray[np.uint32]
+        self._timestamps: npt.NDArray[np.double]
+        self._pressures: npt.NDArray[np.float32]
+        self._imu_quats: npt.NDArray[np.float32]
+        self._gauss_raw: npt.NDArray[np.int16]
+        self._bfields: npt.NDArray[np.double]
+        self._allocated = False
+
+    @property
+    def capacity(self) -> int:
+        """Maximal number of frames kept"""
+        return self._capacity
+
+    @property
+    def total_pushed(self) -> int:
+        """Number of frames pushed since creation (or the last `clear`)"""
+        return self._count
+
+    def __len__(self) -> int:
+        return min(self._count, self._capacity)
+
+    def _allocate(self, frame: TelemetryArrays) -> None:
+        size = 2 * self._capacity
+        self._imu_node_ids = frame.imu_node_ids.copy()
+        self._gauss_rider_node_ids = frame.gauss_rider_node_ids.copy()
+        self._timestamps = np.zeros(size, dtype=np.double)
+        self._pressures = np.zeros((size, *frame.pressures.shape), dtype=frame.pressures.dtype)
+        self._imu_quats = np.zeros((size, *frame.imu_quats.shape), dtype=frame.imu_quats.dtype)
+        self._gauss_raw = np.zeros((size, *frame.gauss_raw.shape), dtype=frame.gauss_raw.dtype)
+        self._bfields = np.zeros((size, *frame.bfields.shape), dtype=frame.bfields.dtype)
+        self._allocated = True
+
+    def _extend_layout(self, frame: TelemetryArrays) -> None:
+        imu_node_ids, imu_quats = self._imu_node_ids, self._imu_quats
+        gauss_rider_node_ids, gauss_raw, bfields = self._gauss_rider_node_ids, self._gauss_raw, self._bfields
+        pressures, timestamps = self._pressures, self._timestamps
+        self._allocate(frame)
+        self._timestamps[:] = timestamps
+        self._pressures[:] = pressures
+        # values of nodes missing in kept frames as in `TelemetryArrays`
+        self._imu_quats.fill(np.nan)
+        self._bfields.fill(np.nan)
+        _, old_rows, new_rows = np.intersect1d(imu_node_ids, self._imu_node_ids, return_indices=True)
+        self._imu_quats[:, new_rows] = imu_quats[:, old_rows]
+        _, old_rows, new_rows = np.intersect1d(
+            gauss_rider_node_ids, self._gauss_rider_node_ids, return_indices=True
+        )
+        self._gauss_raw[:, new_rows] = gauss_raw[:, old_rows]
+        self._bfields[:, new_rows] = bfields[:, old_rows]
+
+    def clear(self) -> None:
+        """Forget all frames, keeping the allocated storage"""
+        self._count = 0
+
+    def push(self, frame: TelemetryArrays) -> None:
+        """Copy a frame into the ring, overwriting the oldest one when full"""
+        if not self._allocated:
+            self._allocate(frame)
+        elif (
+            frame.imu_quats.shape != self._imu_quats.shape[1:]
+            or frame.gauss_raw.shape != self._gauss_raw.shape[1:]
+        ):
+            self._extend_layout(frame)
+        idx = self._count % self._capacity
+        mirror = idx + self._capacity
+        self._timestamps[idx] = self._timestamps[mirror] = frame.timestamp
+        self._pressures[idx] = self._pressures[mirror] = frame.pressures
+        self._imu_quats[idx] = self._imu_quats[mirror] = frame.imu_quats
+        self._gauss_raw[idx] = self._gauss_raw[mirror] = frame.gauss_raw
+        self._bfields[idx] = self._bfields[mirror] = frame.bfields
+        self._count += 1
+
+    def _window(self, n: int) -> TelemetryWindow:
+        # last written frame is at `end - 1`, and so is its mirror at `end - 1 + capacity`
+        end = (self._count - 1) % self._capacity + 1 + self._capacity
+        window = slice(end - n, end)
+        return TelemetryWindow(
+            timestamps=self._timestamps[window],
+            pressures=self._pressures[window],
+            imu_node_ids=self._imu_node_ids,
+            imu_quats=self._imu_quats[window],
+            gauss_rider_node_ids=self._gauss_rider_node_ids,
+            gauss_raw=self._gauss_raw[window],
+            bfields=self._bfields[window],
+        )
+
+    def last(self, n: Optional[int] = None) -> TelemetryWindow:
+        """Get a view of the `n` most recent frames (all kept frames when `n` is None).
+        Raises `ValueError` when the ring is empty."""
+        if self._count == 0:
+            raise ValueError("Ring buffer is empty")
+        size = len(self)
+        n = size if n is None else min(n, size)
+        return self._window(n)
+
+    def since(self, timestamp: float) -> TelemetryWindow:
+        """Get a view of the kept frames with timestamp not older than `timestamp`.
+        Frames are assumed to be pushed in order of their timestamps."""
+        window = self.last()
+        start = int(np.searchsorted(window.timestamps, timestamp, side="left"))
+        return self._window(len(window) - start)
@@ -0,0 +1,264 @@
+"""Decoding of `TelemetryData` frames into preallocated NumPy arrays.
+
+Walking `TelemetryData` protobufs field by field creates a lot of small Python objects
+on each frame, which is a noticeable cost at full telemetry rate. `TelemetryArraysDecoder`
+instead writes each frame into a fixed set of arrays, whose layout (which row corresponds
+to which node) is derived once from `SystemInfo` and nodes discovered on buses.
+Nodes which appear later are reported, and can be added to the layout with `extend_layout`.
+"""
+
+from dataclasses import dataclass
+import logging
+from typing import Annotated, Iterable, Mapping, Optional, Protocol
+
+import numpy as np
+import numpy.typing as npt
+
+from clone_client.hw_driver.client import ProductId
+from clone_client.proto.state_store_pb2 import SystemInfo, TelemetryData
+
+L = logging.getLogger(__name__)
+
+GAUSS_RIDER_RAW_LEN = 13  # 4 pixels * 3 axes + temperature
+
+
+class BusNode(Protocol):
+    """Node discovered on a bus, e.g. `BusDevice` of `HWDriverClient.get_nodes`"""
+
+    @property
+    def node_id(self) -> int:
+        """Id of the node"""
+
+    @property
+    def product_id(self) -> int:
+        """`ProductId` of the node"""
+
+
+def bus_node_ids(nodes: Mapping[str, Iterable[BusNode]], product_id: int) -> list[int]:
+    """Sorted ids of nodes of `product_id` discovered on buses (`HWDriverClient.get_nodes`)"""
+    return sorted(
+        {node.node_id for bus_nodes in nodes.values() for node in bus_nodes if node.product_id == product_id}
+    )
+
+
+@dataclass
+class TelemetryArrays:
+    """Single telemetry frame decoded into arrays.
+
+    Rows of per-node arrays follow `imu_node_ids` and `gauss_rider_node_ids` respectively.
+    Values of nodes missing in a frame are set to NaN (zeros for `gauss_raw`)."""
+
+    timestamp: float  # seconds since golem's start
+    pressures: npt.NDArray[np.float32]  # [n_muscles]
+    imu_node_ids: npt.NDArray[np.uint32]  # [n_imu]
+    imu_quats: npt.NDArray[np.float32]  # [n_imu, 4], scalar-last (x, y, z, w) as in scipy
+    gauss_rider_node_ids: npt.NDArray[np.uint32]  # [n_gr]
+    gauss_raw: npt.NDArray[np.int16]  # [n_gr, 13], pixels' x, y, z and temperature
+    bfields: npt.NDArray[np.double]  # [n_gr, 4, 3], in teslas
+
+    @classmethod
+    def empty(
+        cls, n_muscles: int, imu_node_ids: Iterable[int], gauss_rider_node_ids: Iterable[int]
+    ) -> "TelemetryArrays":
+        """Allocate arrays for a given layout"""
+        imu_ids = np.fromiter(imu_node_ids, dtype=np.uint32)
+        gr_ids = np.fromiter(gauss_rider_node_ids, dtype=np.uint32)
+        return cls(
+            timestamp=0.0,
+            pressures=np.full(n_muscles, np.nan, dtype=np.float32),
+            imu_node_ids=imu_ids,
+            imu_quats=np.full((len(imu_ids), 4), np.nan, dtype=np.float32),
+            gauss_rider_node_ids=gr_ids,
+            gauss_raw=np.zeros((len(gr_ids), GAUSS_RIDER_RAW_LEN), dtype=np.int16),
+            bfields=np.full((len(gr_ids), 4, 3), np.nan, dtype=np.double),
+        )
+
+    def copy(self) -> "TelemetryArrays":
+        """Deep copy of the frame, e.g. to keep it after the decoder overwrites its buffers"""
+        return TelemetryArrays(
+            timestamp=self.timestamp,
+            pressures=self.pressures.copy(),
+            imu_node_ids=self.imu_node_ids,
+            imu_quats=self.imu_quats.copy(),
+            gauss_rider_node_ids=self.gauss_rider_node_ids,
+            gauss_raw=self.gauss_raw.copy(),
+            bfields=self.bfields.copy(),
+        )
+
+
+class TelemetryArraysDecoder:
+    """Decoder writing consecutive `TelemetryData` frames into the same preallocated `TelemetryArrays`.
+
+    NOTE: `decode` returns the same `TelemetryArrays` object on every call, with its arrays
+    overwritten in place. Use `TelemetryArrays.copy` to keep a frame for longer.
+
+    IMU and GaussRider node ids which are not given explicitly are taken from the first decoded frame.
+    Data of nodes which appear later, but are not part of the layout, are not decoded: a warning
+    is logged once per node and `has_new_nodes` is set, until `extend_layout` adds them.
+    """
+
+    def __init__(
+        self,
+        n_muscles: int,
+        imu_node_ids: Optional[Iterable[int]] = None,
+        gauss_rider_node_ids: Optional[Iterable[int]] = None,
+    ) -> None:
+        self._n_muscles = n_muscles
+        self._imu_node_ids = None if imu_node_ids is None else list(imu_node_ids)
+        self._gauss_rider_node_ids = None if gauss_rider_node_ids is None else list(gauss_rider_node_ids)
+        self._arrays: Optional[TelemetryArrays] = None
+        self._imu_rows: dict[Annotated[int, "node id"], int] = {}
+        self._gauss_rider_rows: dict[Annotated[int, "node id"], int] = {}
+        self._new_imu_node_ids: set[int] = set()
+        self._new_gauss_rider_node_ids: set[int] = set()
+        if self._imu_node_ids is not None and self._gauss_rider_node_ids is not None:
+            self._allocate(self._imu_node_ids, self._gauss_rider_node_ids)
+
+    @classmethod
+    def from_system_info(
+        cls, info: SystemInfo, nodes: Optional[Mapping[str, Iterable[BusNode]]] = None
+    ) -> "TelemetryArraysDecoder":
+        """Create a decoder with layout of muscles and GaussRiders taken from `SystemInfo`,
+        and of IMUs and GaussRiders discovered on buses, when `nodes` (`HWDriverClient.get_nodes`)
+        are given. IMU layout is not part of `SystemInfo`, so without `nodes` it is taken
+        from the first frame, as are GaussRiders, when `SystemInfo` has no magnetic map."""
+        imu_node_ids: Optional[set[int]] = None
+        gauss_rider_node_ids: Optional[set[int]] = None
+        if nodes is not None:
+            imu_node_ids = set(bus_node_ids(nodes, ProductId.Imu))
+            gauss_rider_node_ids = set(bus_node_ids(nodes, ProductId.GaussRider))
+        if info.HasField("pose_estimation") and info.pose_estimation.HasField("maginterp"):
+            gauss_rider_node_ids = (gauss_rider_node_ids or set()).union(
+                joint.gauss_rider_id for joint in info.pose_estimation.maginterp.magmap.values()
+            )
+        return cls(
+            len(info.muscles),
+            imu_node_ids=None if imu_node_ids is None else sorted(imu_node_ids),
+            gauss_rider_node_ids=None if gauss_rider_node_ids is None else sorted(gauss_rider_node_ids),
+        )
+
+    @property
+    def arrays(self) -> Optional[TelemetryArrays]:
+        """Buffers decoded frames are written into, None before the layout is known"""
+        return self._arrays
+
+    @property
+    def has_new_nodes(self) -> bool:
+        """Whether decoded frames had nodes which are not part of the layout (see `extend_layout`)"""
+        return bool(self._new_imu_node_ids or self._new_gauss_rider_node_ids)
+
+    def extend_layout(self) -> TelemetryArrays:
+        """Add nodes which appeared in decoded frames to the layout and reallocate the buffers.
+        Returns the new buffers, the previous ones are not written anymore."""
+        if self._arrays is None:
+            raise RuntimeError("Layout of telemetry arrays is not known before the first frame")
+        imu_node_ids = sorted(self._new_imu_node_ids.union(self._arrays.imu_node_ids.tolist()))
+        gauss_rider_node_ids = sorted(
+            self._new_gauss_rider_node_ids.union(self._arrays.gauss_rider_node_ids.tolist())
+        )
+        self._new_imu_node_ids.clear()
+        self._new_gauss_rider_node_ids.clear()
+        self._imu_node_ids = imu_node_ids
+        self._gauss_rider_node_ids = gauss_rider_node_ids
+        self._allocate(imu_node_ids, gauss_rider_node_ids)
+        assert self._arrays is not None
+        return self._arrays
+
+    @staticmethod
+    def _new_node(new_node_ids: set[int], kind: str, node_id: int) -> None:
+        if node_id not in new_node_ids:
+            new_node_ids.add(node_id)
+            L.warning(
+                "%s %d is not part of the telemetry arrays layout, its data are not decoded", kind, node_id
+            )
+
+    def _allocate(self, imu_node_ids: list[int], gauss_rider_node_ids: list[int]) -> None:
+        self._arrays = TelemetryArrays.empty(self._n_muscles, imu_node_ids, gauss_rider_node_ids)
+        self._imu_rows = {node_id: row for row, node_id in enumerate(imu_node_ids)}
+        self._gauss_rider_rows = {node_id: row for row, node_id in enumerate(gauss_rider_node_ids)}
+        L.debug("Telemetry arrays layout: IMU %s, GaussRiders %s", imu_node_ids, gauss_rider_node_ids)
+
+    def decode(self, data: TelemetryData) -> TelemetryArrays:
+        """Decode a frame into the decoder's buffers and return them"""
+        sensor_data = data.sensor_data
+        arrays = self._arrays
+        if arrays is None:
+            self._allocate(
+                (
+                    sorted(imu.node_id for imu in sensor_data.imu)
+                    if self._imu_node_ids is None
+                    else self._imu_node_ids
+                ),
+                (
+                    sorted(gr.node_id for gr in sensor_data.gauss_rider_data)
+                    if self._gauss_rider_node_ids is None
+                    else self._gauss_rider_node_ids
+                ),
+            )
+            arrays = self._arrays
+            assert arrays is not None
+
+        arrays.timestamp = data.time_since_start.ToNanoseconds() / 1000_000_000.0
+
+        pressures = sensor_data.pressures
+        if len(pressures) == self._n_muscles:
+            arrays.pressures[:] = pressures
+        else:
+            arrays.pressures.fill(np.nan)
+            count = min(len(pressures), self._n_muscles)
+            arrays.pressures[:count] = pressures[:count]
+
+        self._decode_imu(data, arrays)
+        self._decode_gauss_riders(data, arrays)
+
+        return arrays
+
+    def _decode_imu(self, data: TelemetryData, arrays: TelemetryArrays) -> None:
+        rows = []
+        values = []
+        for imu in data.sensor_data.imu:
+            row = self._imu_rows.get(imu.node_id)
+            if row is None:
+                self._new_node(self._new_imu_node_ids, "IMU", imu.node_id)
+                continue
+            rows.append(row)
+            values.append((imu.x, imu.y, imu.z, imu.w))
+        if len(rows) != len(self._imu_rows):
+            arrays.imu_quats.fill(np.nan)
+        if rows:
+            arrays.imu_quats[rows] = values
+
+    def _decode_gauss_riders(self, data: TelemetryData, arrays: TelemetryArrays) -> None:
+        sensor_data = data.sensor_data
+        gr_rows = self._gauss_rider_rows
+
+        rows = []
+        raw_values: list[int] = []
+        for gr in sensor_data.gauss_rider_data:
+            row = gr_rows.get(gr.node_id)
+            if row is None:
+                self._new_node(self._new_gauss_rider_node_ids, "GaussRider", gr.node_id)
+                continue
+            sensor = gr.sensor
+            rows.append(row)
+            for px in sensor.pixels:
+                raw_values += (px.x, px.y, px.z)
+            raw_values.append(sensor.temperature)
+        if len(rows) != len(gr_rows):
+            arrays.gauss_raw.fill(0)
+        if rows:
+            arrays.gauss_raw[rows] = np.reshape(raw_values, (len(rows), GAUSS_RIDER_RAW_LEN))
+
+        rows = []
+        bfield_values: list[float] = []
+        for node_id, bfield in sensor_data.bfields.items():
+            row = gr_rows.get(node_id)
+            if row is None:
+                self._new_node(self._new_gauss_rider_node_ids, "GaussRider", node_id)
+                continue
+            rows.append(row)
+            bfield_values.extend(bfield.bfield)
+        if len(rows) != len(gr_rows):
+            arrays.bfields.fill(np.nan)
+        if rows:
+            arrays.bfields[rows] = np.reshape(bfield_values, (len(rows), 4, 3))
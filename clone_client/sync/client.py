@@ -22,6 +22,7 @@ from clone_client.discovery import Discovery
 from clone_client.exceptions import ClientError
 from clone_client.hw_driver.sync.client import HWDriverClient
 from clone_client.pose_estimation.pose_estimator import MagInterpolConfig
+from clone_client.pose_estimation.velocity_estimator import VelocityEstimator
 from clone_client.state_store.sync.client import StateStoreClient
 
 LOGGER = logging.getLogger(__name__)
@@ -43,6 +44,7 @@ class Client:
         """Additional parameters for client"""
 
         maginterp_config: MagInterpolConfig = field(default_factory=MagInterpolConfig)
+        velocity_config: VelocityEstimator.Config = field(default_factory=VelocityEstimator.Config)
 
     def __init__(
         self,
@@ -105,6 +107,7 @@ class Client:
             self._state_store = StateStoreClient.new(
                 self._create_socket_str(CONFIG.communication.state_store_service),
                 self._config.maginterp_config,
+                self._config.velocity_config,
             )
         if Client.TunnelsUsed.HW_DRIVER in self.tunnels_used:
             self._hw_driver = HWDriverClient.new(
@@ -122,6 +125,7 @@ class Client:
         if Client.TunnelsUsed.CONTROLLER in self.tunnels_used:
             self.controller.channel.__exit__(exc_type, value, traceback)
         if Client.TunnelsUsed.STATE in self.tunnels_used:
+            self.state_store.shutdown_pose_estimator_builder()
             self.state_store.channel.__exit__(exc_type, value, traceback)
         if Client.TunnelsUsed.HW_DRIVER in self.tunnels_used:
             self.hw_driver.channel.__exit__(exc_type, value, traceback)
@@ -1,9 +1,24 @@
 import asyncio
+from bisect import bisect_right
+from concurrent.futures import Future, wait
 from contextlib import asynccontextmanager, contextmanager
+import ctypes
+import ctypes.util
+from dataclasses import dataclass
 from functools import wraps
 import logging
+import math
+import os
+import select
 import sys
-from time import get_clock_info, perf_counter, perf_counter_ns, sleep
+from time import (
+    CLOCK_MONOTONIC,
+    get_clock_info,
+    monotonic_ns,
+    perf_counter,
+    perf_counter_ns,
+    sleep,
+)
 from typing import (
     Any,
     AsyncGenerator,
@@ -14,6 +29,7 @@ from typing import (
     List,
     Optional,
     Protocol,
+    Sequence,
     Type,
     TypeVar,
 )
@@ -74,6 +90,19 @@ def grpc_translated() -> (
     return decorator
 
 
+async def wait_future_async(future: "Future[Any]") -> None:
+    """Wait until a `concurrent.futures.Future` is done, without raising its error."""
+    waiter = asyncio.wrap_future(future)
+    await asyncio.wait([waiter])
+    if not waiter.cancelled():
+        waiter.exception()  # retrieve the error, so it is not reported as never retrieved
+
+
+def wait_future(future: "Future[Any]") -> None:
+    """Wait until a `concurrent.futures.Future` is done, without raising its error."""
+    wait([future])
+
+
 def url_rfc_to_grpc_py39(address: str) -> str:
     """
     Parses RFC1808 compliant URL (with leading slashes)
@@ -126,7 +155,169 @@ def strip_local(value: str) -> str:
     return value
 
 
-def _precise_interval_base(interval: float, precision: float = 0.2) -> Generator[int | None, None, None]:
+def _ladder_ns(limit_ns: int) -> List[int]:
+    """1-2-5 series of durations from 1 us up to `limit_ns`"""
+    ladder: List[int] = []
+    decade = 1000
+    while decade <= limit_ns:
+        ladder.extend(step * decade for step in (1, 2, 5) if step * decade <= limit_ns)
+        decade *= 10
+    return ladder
+
+
+@dataclass(frozen=True)
+class TickHistogram:
+    """Snapshot of a histogram of durations, in seconds.
+
+    `counts[i]` is the number of values in `[edges[i - 1], edges[i])`, `counts[0]` and `counts[-1]`
+    count values below the first and at or above the last edge."""
+
+    edges: Sequence[float]
+    counts: Sequence[int]
+    count: int
+    mean: float
+    std: float
+    min: float
+    max: float
+
+    def percentile(self, percent: float) -> float:
+        """Upper bound of the `percent`-th percentile, up to the resolution of bins"""
+        if self.count == 0:
+            return math.nan
+        target = self.count * percent / 100.0
+        cumulative = 0
+        for idx, bin_count in enumerate(self.counts):
+            cumulative += bin_count
+            if cumulative >= target and bin_count:
+                upper = self.edges[idx] if idx < len(self.edges) else self.max
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+
+class _Histogram:
+    """Histogram of durations in nanoseconds with fixed bins, cheap enough to update every tick"""
+
+    __slots__ = ("edges", "counts", "count", "total", "total_sq", "min", "max")
+
+    def __init__(self, edges: Sequence[int]) -> None:
+        self.edges = list(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = 0
+        self.max = 0
+
+    def add(self, value: int) -> None:
+        self.counts[bisect_right(self.edges, value)] += 1
+        if self.count == 0:
+            self.min = self.max = value
+        else:
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+
+    def snapshot(self) -> TickHistogram:
+        mean = self.total / self.count if self.count else math.nan
+        variance = self.total_sq / self.count - mean * mean if self.count else math.nan
+        return TickHistogram(
+            edges=tuple(edge / 1e9 for edge in self.edges),
+            counts=tuple(self.counts),
+            count=self.count,
+            mean=mean / 1e9,
+            std=math.sqrt(max(variance, 0.0)) / 1e9,
+            min=self.min / 1e9 if self.count else math.nan,
+            max=self.max / 1e9 if self.count else math.nan,
+        )
+
+
+@dataclass(frozen=True)
+class TickStats:
+    """Snapshot of statistics of a ticker, durations are in seconds.
+
+    - period: time between consecutive ticks
+    - lateness: delay of a tick after its scheduled time
+    - overrun: time by which the code run between ticks exceeded the interval
+    """
+
+    interval: float
+    ticks: int
+    overruns: int
+    period: TickHistogram
+    lateness: TickHistogram
+    overrun: TickHistogram
+
+
+class TickMonitor:
+    """Instrumentation of `precise_interval` and `async_precise_interval`.
+
+    Collects histograms of actual periods, lateness of wake-ups and overruns of a single ticker
+    and calls optional hooks on every tick (`on_tick(period, lateness)`) and every overrun
+    (`on_overrun(overrun)`), with durations in seconds. Hooks are called from the ticker,
+    so they should return quickly.
+
+    >>> monitor = TickMonitor()
+    >>> for _ in precise_interval(1 / 200, monitor=monitor):
+    ...     ...
+    >>> monitor.stats().lateness.percentile(99)
+    """
+
+    def __init__(
+        self,
+        on_tick: Optional[Callable[[float, float], None]] = None,
+        on_overrun: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        self.on_tick = on_tick
+        self.on_overrun = on_overrun
+        self.reset(0.0)
+
+    def reset(self, interval: float) -> None:
+        """Start monitoring a ticker of `interval` seconds, forgetting collected data.
+        Called by the ticker the monitor is passed to."""
+        interval_ns = int(interval * 1e9)
+        self._interval_ns = interval_ns
+        # bins of periods are densest around the nominal interval
+        deviations = _ladder_ns(max(interval_ns, 1000) * 10)
+        period_edges = {interval_ns} | {interval_ns + dev for dev in deviations}
+        period_edges |= {interval_ns - dev for dev in deviations if dev < interval_ns}
+        self._period = _Histogram(sorted(period_edges))
+        self._lateness = _Histogram([0] + _ladder_ns(10_000_000_000))
+        self._overrun = _Histogram(_ladder_ns(10_000_000_000))
+        self._ticks = 0
+
+    def record_tick(self, period_ns: Optional[int], lateness_ns: int) -> None:
+        """Record a tick, `period_ns` is None for the first one"""
+        self._ticks += 1
+        if period_ns is None:
+            return
+        self._period.add(period_ns)
+        self._lateness.add(lateness_ns)
+        if self.on_tick is not None:
+            self.on_tick(period_ns / 1e9, lateness_ns / 1e9)
+
+    def record_overrun(self, overrun_ns: int) -> None:
+        """Record the code run between ticks taking `overrun_ns` longer than the interval"""
+        self._overrun.add(overrun_ns)
+        if self.on_overrun is not None:
+            self.on_overrun(overrun_ns / 1e9)
+
+    def stats(self) -> TickStats:
+        """Snapshot of the collected statistics"""
+        return TickStats(
+            interval=self._interval_ns / 1e9,
+            ticks=self._ticks,
+            overruns=self._overrun.count,
+            period=self._period.snapshot(),
+            lateness=self._lateness.snapshot(),
+            overrun=self._overrun.snapshot(),
+        )
+
+
+def _precise_interval_base(
+    interval: float, precision: float = 0.2, monitor: Optional[TickMonitor] = None
+) -> Generator[int | None, None, None]:
     """
     Interval ticks for precise timings.
 
@@ -134,32 +325,45 @@ def _precise_interval_base(interval: float, precision: float = 0.2) -> Generator
     - interval: Duration between each tick in seconds.
     - precision: The precision of the tick, higher precision means more resources used.
                  Smaller intervals require more precision.
+    - monitor: Optional instrumentation collecting statistics of ticks.
     """
     if precision < 0 or precision > 1:
         raise ValueError("Precision must be between 0 and 1")
 
     if interval < 0:
+        LOGGER.warning("Negative interval specified (%f). Setting to 0.", interval)
         interval = 0
-        LOGGER.warning("Negative interval specified (%d). Setting to 0.", interval)
 
     interval_ns = int(interval * 1e9)
     resolution = get_clock_info("perf_counter").resolution
     min_tick_ns = int(resolution * 1e9)
     fraction = max(resolution, (1 - precision))
+    if monitor is not None:
+        monitor.reset(interval)
 
     try:
+        last_tick: Optional[int] = None
+        next_tick = 0
         while True:
-            next_tick = perf_counter_ns() + interval_ns
+            now = perf_counter_ns()
+            if monitor is not None:
+                monitor.record_tick(None if last_tick is None else now - last_tick, now - next_tick)
+            last_tick = now
+            next_tick = now + interval_ns
 
             yield None
 
             remaining = next_tick - perf_counter_ns()
             if remaining < 0:
-                remaining = 0
+                if monitor is not None:
+                    monitor.record_overrun(-remaining)
                 LOGGER.warning(
-                    "Tick takes longer than specified interval (%d). Please consider increasing it. ",
-                    remaining,
+                    "Tick takes longer than specified interval (%.3f ms over %.3f ms). "
+                    "Please consider increasing it.",
+                    -remaining / 1e6,
+                    interval_ns / 1e6,
                 )
+                remaining = 0
 
             if fraction > 0:
                 yield int(remaining * fraction)
@@ -209,8 +413,10 @@ def _busy_ticker_base(
         pass
 
 
-async def async_precise_interval(interval: float, precision: float = 0.2) -> AsyncGenerator[None, None]:
-    for sleep_time_ns in _precise_interval_base(interval, precision):
+async def async_precise_interval(
+    interval: float, precision: float = 0.2, monitor: Optional[TickMonitor] = None
+) -> AsyncGenerator[None, None]:
+    for sleep_time_ns in _precise_interval_base(interval, precision, monitor):
         if sleep_time_ns is not None:
             await asyncio.sleep(sleep_time_ns / 1e9)
         else:
@@ -229,8 +435,10 @@ async def async_busy_ticker(
             yield
 
 
-def precise_interval(interval: float, precision: float = 0.2) -> Generator[None, None, None]:
-    for sleep_time_ns in _precise_interval_base(interval, precision):
+def precise_interval(
+    interval: float, precision: float = 0.2, monitor: Optional[TickMonitor] = None
+) -> Generator[None, None, None]:
+    for sleep_time_ns in _precise_interval_base(interval, precision, monitor):
         if sleep_time_ns is not None:
             sleep(sleep_time_ns / 1e9)
         else:
@@ -245,3 +453,202 @@ def busy_ticker(dur: float, precision: float = 5, min_tick: float = 0.0005) -> G
             sleep(sleep_time_ns / 1e9)
         else:
             yield
+
+
+class _TimerFd:
+    """One-shot Linux timerfd on CLOCK_MONOTONIC, armed with absolute deadlines.
+
+    Uses `os.timerfd_*` (Python >= 3.13) or libc through ctypes."""
+
+    _TFD_NONBLOCK = 0o4000
+    _TFD_CLOEXEC = 0o2000000
+    _TFD_TIMER_ABSTIME = 1
+
+    class _Itimerspec(ctypes.Structure):  # pylint: disable=too-few-public-methods
+        _fields_ = [("it_interval", ctypes.c_long * 2), ("it_value", ctypes.c_long * 2)]
+
+    _libc: Optional[ctypes.CDLL] = None
+
+    def __init__(self) -> None:
+        if hasattr(os, "timerfd_create"):
+            self._fd = os.timerfd_create(  # type: ignore[attr-defined]
+                CLOCK_MONOTONIC, flags=os.TFD_NONBLOCK | os.TFD_CLOEXEC  # type: ignore[attr-defined]
+            )
+            return
+        libc = self._load_libc()
+        fd = libc.timerfd_create(CLOCK_MONOTONIC, self._TFD_NONBLOCK | self._TFD_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._fd = fd
+
+    @classmethod
+    def _load_libc(cls) -> ctypes.CDLL:
+        if cls._libc is None:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            libc.timerfd_create.argtypes = [ctypes.c_int, ctypes.c_int]
+            libc.timerfd_settime.argtypes = [
+                ctypes.c_int,
+                ctypes.c_int,
+                ctypes.POINTER(cls._Itimerspec),
+                ctypes.c_void_p,
+            ]
+            cls._libc = libc
+        return cls._libc
+
+    @classmethod
+    def create(cls) -> Optional["_TimerFd"]:
+        """Timer, or None when timerfd is not available on this platform"""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return cls()
+        except (OSError, AttributeError) as err:
+            LOGGER.debug("timerfd is not available (%s), falling back to sleeping", err)
+            return None
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def arm(self, deadline_ns: int) -> None:
+        """Expire once at `deadline_ns` of CLOCK_MONOTONIC"""
+        if hasattr(os, "timerfd_settime_ns"):
+            os.timerfd_settime_ns(  # type: ignore[attr-defined]
+                self._fd, flags=os.TFD_TIMER_ABSTIME, initial=deadline_ns  # type: ignore[attr-defined]
+            )
+            return
+        spec = self._Itimerspec()
+        spec.it_value[0], spec.it_value[1] = divmod(deadline_ns, 1_000_000_000)
+        if self._load_libc().timerfd_settime(self._fd, self._TFD_TIMER_ABSTIME, ctypes.byref(spec), None):
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def consume(self) -> bool:
+        """Whether the timer expired, clearing the expiration"""
+        try:
+            os.read(self._fd, 8)
+        except BlockingIOError:
+            return False
+        return True
+
+    def wait(self) -> None:
+        while not self.consume():
+            select.select([self._fd], [], [])
+
+    async def async_wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self.consume():
+            ready = loop.create_future()
+            loop.add_reader(self._fd, _set_future_done, ready)
+            try:
+                await ready
+            finally:
+                loop.remove_reader(self._fd)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def _set_future_done(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _deadline_interval_base(
+    interval: float, monitor: Optional[TickMonitor] = None
+) -> Generator[int | None, None, None]:
+    """
+    Interval ticks at absolute deadlines `start + k * interval` of CLOCK_MONOTONIC.
+
+    Yields None on ticks and deadlines (in nanoseconds) to wait for between them.
+    Late ticks do not shift following deadlines, deadlines missed entirely are skipped.
+    """
+    if interval <= 0:
+        raise ValueError("Interval must be positive")
+
+    interval_ns = int(interval * 1e9)
+    if monitor is not None:
+        monitor.reset(interval)
+
+    try:
+        deadline = monotonic_ns()
+        last_tick: Optional[int] = None
+        while True:
+            now = monotonic_ns()
+            if monitor is not None:
+                monitor.record_tick(None if last_tick is None else now - last_tick, now - deadline)
+            if now - deadline >= interval_ns:
+                deadline += (now - deadline) // interval_ns * interval_ns
+            last_tick = now
+
+            yield None
+
+            deadline += interval_ns
+            overrun = monotonic_ns() - deadline
+            if overrun > 0:
+                if monitor is not None:
+                    monitor.record_overrun(overrun)
+                LOGGER.warning(
+                    "Tick takes longer than specified interval (%.3f ms over %.3f ms). "
+                    "Please consider increasing it.",
+                    overrun / 1e6,
+                    interval_ns / 1e6,
+                )
+            else:
+                yield deadline
+
+    except GeneratorExit:
+        pass
+
+
+async def async_deadline_interval(
+    interval: float, monitor: Optional[TickMonitor] = None
+) -> AsyncGenerator[None, None]:
+    """
+    Ticks every `interval` seconds without cumulative drift, sleeping between ticks.
+
+    Waits on a Linux timerfd integrated into the event loop, elsewhere (or with event loops
+    not supporting `add_reader`) falls back to `asyncio.sleep`, which is precise to about 1 ms.
+    Use `async_precise_interval` with high precision where sub-millisecond jitter matters
+    more than CPU usage.
+    """
+    timer = _TimerFd.create()
+    try:
+        for deadline_ns in _deadline_interval_base(interval, monitor):
+            if deadline_ns is None:
+                yield
+                continue
+            if timer is not None:
+                timer.arm(deadline_ns)
+                try:
+                    await timer.async_wait()
+                    continue
+                except NotImplementedError:
+                    # event loop cannot watch file descriptors
+                    timer.close()
+                    timer = None
+            await asyncio.sleep(max(0, deadline_ns - monotonic_ns()) / 1e9)
+    finally:
+        if timer is not None:
+            timer.close()
+
+
+def deadline_interval(interval: float, monitor: Optional[TickMonitor] = None) -> Generator[None, None, None]:
+    """
+    Ticks every `interval` seconds without cumulative drift, sleeping between ticks.
+
+    Waits on a Linux timerfd, elsewhere falls back to `time.sleep`.
+    """
+    timer = _TimerFd.create()
+    try:
+        for deadline_ns in _deadline_interval_base(interval, monitor):
+            if deadline_ns is None:
+                yield
+            elif timer is not None:
+                timer.arm(deadline_ns)
+                timer.wait()
+            else:
+                sleep(max(0, deadline_ns - monotonic_ns()) / 1e9)
+    finally:
+        if timer is not None:
+            timer.close()